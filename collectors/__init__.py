@@ -1,8 +1,22 @@
-from .fbk_data_collectors import MunicipalityDataCollector, ProvinceDataCollector
-from .municipality_collector import MunicipalityCollector
-from .province_collector import ProvinceCollector
-from .region_risk_collector import RegionRiskCollector
-from .weather_collectors import WeatherStationCollector, WeatherDataCollector
-from .holiday_collector import HolidayCollector
-from .vaccines_collectors import VaccinesDeliveryDataCollector, VaccinesAdministrationDataCollector
-from .stringency_index_collector import StringencyIndexCollector
+# Collectors are imported on first access, so that importing a submodule of collectors (e.g. validation_utils from the
+# DAOs) does not load all of them, with their HTTP clients and the API tokens they require
+COLLECTORS = {
+    "MunicipalityDataCollector": "fbk_data_collectors",
+    "ProvinceDataCollector": "fbk_data_collectors",
+    "MunicipalityCollector": "municipality_collector",
+    "ProvinceCollector": "province_collector",
+    "RegionRiskCollector": "region_risk_collector",
+    "WeatherStationCollector": "weather_collectors",
+    "WeatherDataCollector": "weather_collectors",
+    "HolidayCollector": "holiday_collector",
+    "VaccinesDeliveryDataCollector": "vaccines_collectors",
+    "VaccinesAdministrationDataCollector": "vaccines_collectors",
+    "StringencyIndexCollector": "stringency_index_collector",
+}
+
+
+def __getattr__(name):
+    if name in COLLECTORS:
+        from importlib import import_module
+        return getattr(import_module(f".{COLLECTORS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
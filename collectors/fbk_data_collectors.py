@@ -5,7 +5,8 @@ import datetime
 
 from .validation_utils import validate_dates
 from .github_utils import get_commits_table, get_data_version
-from data.models import *
+from .http_client import http_client
+from data.batches import MunicipalityDataBatch, ProvinceDataBatch
 
 
 class MunicipalityDataCollector:
@@ -41,7 +42,7 @@ class MunicipalityDataCollector:
             .sort_values(["date", "code"])
         return df
 
-    def search(self, date_from=None, date_to=None) -> List[MunicipalityData]:
+    def search(self, date_from=None, date_to=None) -> MunicipalityDataBatch:
         """
         Gets covid 19 data for municipalities in the Province of Trento within a date range.
 
@@ -86,7 +87,7 @@ class MunicipalityDataCollector:
         # data cleaning
         data_version_df = self.clean_data(data_version_df)
 
-        data = MunicipalityData.from_df(data_version_df)
+        data = MunicipalityDataBatch.from_df(data_version_df)
         return data
 
 
@@ -121,7 +122,7 @@ class ProvinceDataCollector:
 
         return df
 
-    def search(self, date_from=None, date_to=None) -> List[ProvinceData]:
+    def search(self, date_from=None, date_to=None) -> ProvinceDataBatch:
         """
         Collects covid 19 data for the Province of Trento within a date range.
 
@@ -133,7 +134,7 @@ class ProvinceDataCollector:
         from_date, to_date = validate_dates(date_from, date_to)
 
         url = f"https://raw.githubusercontent.com/{self.repo}/master/{self.path}"
-        df = pd.read_csv(url)
+        df = http_client.read_csv(url)
 
         # Data cleaning
         df["giorno"] = pd.to_datetime(df["giorno"], format="%d/%m/%Y")
@@ -143,6 +144,6 @@ class ProvinceDataCollector:
         # Add province name
         df["name"] = "PAT"
 
-        # Export. Models data as List[ProvinceData]
-        data = ProvinceData.from_df(df)
+        # Export. Models data as ProvinceDataBatch
+        data = ProvinceDataBatch.from_df(df)
         return data
@@ -1,7 +1,7 @@
-import requests
 import pandas as pd
 
 from configuration import github_config
+from .http_client import http_client
 
 
 def get_commits_table(repo: str, path: str, page: int) -> pd.DataFrame:
@@ -14,7 +14,8 @@ def get_commits_table(repo: str, path: str, page: int) -> pd.DataFrame:
     :return: pd.DataFrame with date and commit ids
     """
     assert github_config.TOKEN is not None, "Github token was not provided"
-    res = requests.get(f"https://api.github.com/repos/{repo}/commits?state=closed&access_token={github_config.TOKEN} \
+    # Conditional request: unchanged pages cost a 304 response, which does not count towards the API rate limit
+    res = http_client.get(f"https://api.github.com/repos/{repo}/commits?state=closed&access_token={github_config.TOKEN} \
     &path={path}&per_page=100&page={page}")
     assert res.status_code == 200, f"Got status code {res.status_code} from GitHub API when requesting commits table"
 
@@ -42,6 +43,7 @@ def get_data_version(repo: str, path: str, commit_id: str):
     :param commit_id: one commit id
     :return:
     """
-    data_df = pd.read_csv(
-        f"https://raw.githubusercontent.com/{repo}/{commit_id}/{path}")
+    # The content of a commit does not change: it is not revalidated
+    data_df = http_client.read_csv(
+        f"https://raw.githubusercontent.com/{repo}/{commit_id}/{path}", conditional=False)
     return data_df
@@ -1,10 +1,10 @@
 from typing import Optional, List
-import requests
 from pandas import Timestamp
 
-from data.models import Holiday
+from data.batches import HolidayBatch
 from configuration.googleapis_config import GOOGLE_APIKEY
 from .validation_utils import validate_dates
+from .http_client import http_client
 
 
 class HolidayCollector:
@@ -22,7 +22,7 @@ class HolidayCollector:
         url = f"https://www.googleapis.com/calendar/v3/calendars/en.italian%23holiday%40group.v.calendar.google.com/events?key={GOOGLE_APIKEY}" + \
               f"&timeMin={date_from.isoformat() + 'T00:00:00Z'}&timeMax={date_to.isoformat() + 'T00:00:00Z'}"
 
-        return requests.get(url).json()['items']
+        return http_client.get(url, conditional=False).json()['items']
 
     def clean_data(self, data: List[dict]) -> List[dict]:
         """
@@ -37,17 +37,17 @@ class HolidayCollector:
 
         return sorted(lst, key=lambda k: k['start'])
 
-    def search(self, date_from=None, date_to=None) -> List[Holiday]:
+    def search(self, date_from=None, date_to=None) -> HolidayBatch:
         """
         Collects data about Italian Holidays within a range of date.
         :param date_from: start date string. If None, uses February, 23rd 2021, i.e. date of first measurement.
         :param date_to: end date string. If None, uses today date.
-        :return: data modelled as List[Holiday].
+        :return: data modelled as HolidayBatch.
         """
         # dates validation
         date_from, date_to = validate_dates(date_from, date_to)
 
         data = self.get_data(date_from, date_to)
         data = self.clean_data(data)
-        data = Holiday.from_repr(data)
+        data = HolidayBatch.from_repr(data)
         return data
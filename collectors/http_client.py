@@ -0,0 +1,186 @@
+import io
+import os
+import json
+import pickle
+import hashlib
+import threading
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from configuration import http_config
+
+
+class HttpResponse:
+    # Response of HttpClient.get: the body of a 304 (Not Modified) response is the cached one, with the status code of
+    # the cached response (not_modified is set)
+
+    def __init__(self, url: str, status_code: int, content: bytes, headers: dict, not_modified: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.not_modified = not_modified
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(requests.utils.get_encoding_from_headers(self.headers) or "utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class HttpClient:
+    # HTTP client shared by the collectors: a single requests session keeps connections alive (pool_size connections
+    # for each host, so that concurrent threads do not open new ones) and asks for compressed responses. Responses
+    # carrying an ETag or a Last-Modified header are cached in path: the next request of the same URL is conditional
+    # (If-None-Match / If-Modified-Since), so that an unchanged source costs a 304 response instead of the whole body.
+    # Bytes received over the wire (compressed) and served from the cache are counted in stats.
+    # The cache is bounded by max_bytes: when a write exceeds it, the least recently used responses are removed (their
+    # next request is downloaded again). The folder can also be deleted at any time.
+
+    def __init__(self, path: str = None, pool_size: int = 10, timeout: float = 60, max_bytes: int = 256 * 2 ** 20):
+        # path: folder of the cache of conditional requests (None: requests are never conditional)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._cache_bytes = None  # size of the cache folder, read at the first write
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "bytes_received": 0, "bytes_decoded": 0, "bytes_cached": 0}
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["Accept-Encoding"] = "gzip, deflate"
+                self._session = session
+        return self._session
+
+    def count(self, **counts):
+        with self._lock:
+            for k, v in counts.items():
+                self.stats[k] += v
+
+    def file_path(self, url: str) -> str:
+        # URLs may contain API keys: only their digest is stored
+        return os.path.join(self.path, hashlib.sha1(url.encode()).hexdigest() + ".pkl")
+
+    def read_file(self, url: str):
+        # Cached (validators, status code, headers, body) of url, None if not cached
+        if self.path is None:
+            return None
+        path = self.file_path(url)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            # The modification time orders the entries from the least recently used (see prune)
+            os.utime(path)
+            return entry
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def cache_files(self) -> list:
+        # (modification time, size, path) of the cached responses, least recently used first
+        files = []
+        for name in os.listdir(self.path):
+            if name.endswith(".pkl"):
+                try:
+                    stat = os.stat(os.path.join(self.path, name))
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, os.path.join(self.path, name)))
+        return sorted(files)
+
+    def prune(self, max_bytes: int = None):
+        # Remove the least recently used responses until the cache is below max_bytes (default self.max_bytes)
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        files = self.cache_files()
+        size = sum(s for _, s, _ in files)
+        for _, file_size, path in files:
+            if size <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= file_size
+        with self._lock:
+            self._cache_bytes = size
+
+    def write_file(self, url: str, entry: tuple):
+        os.makedirs(self.path, exist_ok=True)
+        path = self.file_path(url)
+        # Written atomically: concurrent readers see either the previous or the new entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entry, f)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        # The size of the cache is tracked from the writes of the process (other processes are seen at each prune)
+        with self._lock:
+            if self._cache_bytes is not None:
+                self._cache_bytes += size
+            cache_bytes = self._cache_bytes
+        if cache_bytes is None or cache_bytes > self.max_bytes:
+            self.prune()
+
+    def get(self, url: str, conditional: bool = True, timeout: float = None) -> HttpResponse:
+        # GET url. If conditional, the cached response is revalidated instead of downloaded again (responses of URLs
+        # requested once, e.g. with a date range, should not be cached: conditional=False)
+        conditional = conditional and self.path is not None
+        cached = self.read_file(url) if conditional else None
+        headers = {}
+        if cached is not None:
+            validators = cached[0]
+            if validators.get("ETag") is not None:
+                headers["If-None-Match"] = validators["ETag"]
+            if validators.get("Last-Modified") is not None:
+                headers["If-Modified-Since"] = validators["Last-Modified"]
+
+        res = self.session.get(url, headers=headers, timeout=timeout if timeout is not None else self.timeout)
+        content = res.content
+        # Bytes pulled over the wire (before decompression)
+        received = res.raw.tell() if res.raw is not None else 0
+        received = received or len(content)
+        self.count(requests=1, bytes_received=received)
+
+        if res.status_code == 304 and cached is not None:
+            _, status_code, cached_headers, content = cached
+            self.count(not_modified=1, bytes_cached=len(content))
+            return HttpResponse(url, status_code, content, cached_headers, not_modified=True)
+
+        self.count(bytes_decoded=len(content))
+        validators = dict((h, res.headers.get(h)) for h in ["ETag", "Last-Modified"])
+        if conditional and res.status_code == 200 and any(v is not None for v in validators.values()):
+            self.write_file(url, (validators, res.status_code, dict(res.headers), content))
+        return HttpResponse(url, res.status_code, content, dict(res.headers))
+
+    def get_content(self, url: str, conditional: bool = True, timeout: float = None) -> bytes:
+        # Body of a successful response (errors raise requests.HTTPError)
+        res = self.get(url, conditional=conditional, timeout=timeout)
+        if res.status_code >= 400:
+            raise requests.HTTPError(f"Got status code {res.status_code} from {url}")
+        return res.content
+
+    def read_csv(self, url: str, conditional: bool = True, **kwargs) -> pd.DataFrame:
+        return pd.read_csv(io.BytesIO(self.get_content(url, conditional=conditional)), **kwargs)
+
+    def read_json(self, url: str, conditional: bool = True, **kwargs) -> pd.DataFrame:
+        return pd.read_json(io.BytesIO(self.get_content(url, conditional=conditional)), **kwargs)
+
+    def read_html(self, url: str, conditional: bool = True, timeout: float = None, **kwargs) -> list:
+        return pd.read_html(io.BytesIO(self.get_content(url, conditional=conditional, timeout=timeout)), **kwargs)
+
+
+# Client of the process, configured by the environment variables HTTP_CACHE_PATH, HTTP_CACHE_MAX_MB, HTTP_POOL_SIZE
+# and HTTP_TIMEOUT
+http_client = HttpClient(path=http_config.HTTP_CACHE_PATH, pool_size=http_config.HTTP_POOL_SIZE,
+                         timeout=http_config.HTTP_TIMEOUT, max_bytes=int(http_config.HTTP_CACHE_MAX_MB * 2 ** 20))
@@ -1,5 +1,6 @@
 import pandas as pd
-from data.models import *
+from data.batches import MunicipalityBatch
+from .http_client import http_client
 
 
 class MunicipalityCollector:
@@ -18,7 +19,7 @@ class MunicipalityCollector:
         :return: pd.DataFrame.
         """
         url = f"https://raw.githubusercontent.com/{self.repo}/master/{path}"
-        return pd.read_csv(url)
+        return http_client.read_csv(url)
 
     def clean_data(self, df_codes: pd.DataFrame, df_pop: pd.DataFrame) -> pd.DataFrame:
         """
@@ -38,14 +39,14 @@ class MunicipalityCollector:
         df_codes['province'] = "PAT"
         return pd.merge(df_codes, df_pop, on='code')
 
-    def search(self) -> List[Municipality]:
+    def search(self) -> MunicipalityBatch:
         """
         Collects demographic data about municipalities in Trentino.
 
-        :return: a List[Municipality] object.
+        :return: a MunicipalityBatch object.
         """
         df_pop = self.get_data(self.path_pop)
         df_codes = self.get_data(self.path_codes)
         df = self.clean_data(df_codes, df_pop)
 
-        return Municipality.from_df(df)
+        return MunicipalityBatch.from_df(df)
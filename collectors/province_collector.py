@@ -1,5 +1,6 @@
 import pandas as pd
-from data.models import *
+from data.batches import ProvinceBatch
+from .http_client import http_client
 
 
 class ProvinceCollector:
@@ -16,9 +17,9 @@ class ProvinceCollector:
         :return: pd.DataFrame.
         """
         url = f"https://raw.githubusercontent.com/{self.repo}/master/{self.path}"
-        return pd.read_csv(url)
+        return http_client.read_csv(url)
 
-    def search(self) -> List[Province]:
+    def search(self) -> ProvinceBatch:
         """
         Collects data about municipality and sums by their population.
 
@@ -26,4 +27,4 @@ class ProvinceCollector:
         """
         data = self.get_data()
         df = pd.DataFrame({"name": ["PAT"], "code": [22], "population": [data['abitanti'].sum()]})
-        return Province.from_df(df)
+        return ProvinceBatch.from_df(df)
@@ -0,0 +1,28 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    # Polite rate limiting of the requests to each host, shared by the threads of a collector: requests to the same
+    # host start at least 1 / requests_per_second seconds apart, whatever the number of threads sending them.
+    # Requests to different hosts are not delayed by each other.
+
+    def __init__(self, requests_per_second: float):
+        assert requests_per_second > 0, "requests_per_second must be positive"
+        self.interval = 1 / requests_per_second
+        self._next = {}  # host -> earliest start of its next request (time.monotonic)
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> float:
+        # Block until a request to the host of url can start. Returns the seconds waited.
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            # The slot is reserved before sleeping, so that waiting threads are served in order
+            self._next[host] = start + self.interval
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
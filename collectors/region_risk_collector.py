@@ -1,8 +1,9 @@
-from typing import Optional, List
+from typing import Optional
 import pandas as pd
 
-from data.models import RegionRisk
+from data.batches import RegionRiskBatch
 from .validation_utils import validate_dates
+from .http_client import http_client
 
 
 class RegionRiskCollector:
@@ -17,7 +18,7 @@ class RegionRiskCollector:
         :return: pd.DataFrame containing 4 levels of risk by dates.
         """
         url = 'https://raw.githubusercontent.com/imcatta/restrizioni_regionali_covid/main/dataset.json'
-        return pd.read_json(url)
+        return http_client.read_json(url)
 
     def clean_data(self, df: pd.DataFrame, date_from: str, date_to: str) -> pd.DataFrame:
         """
@@ -43,15 +44,15 @@ class RegionRiskCollector:
         df['date'] = df['date'].apply(lambda d: pd.Timestamp(d))
         return df
 
-    def search(self, date_from=None, date_to=None) -> List[RegionRisk]:
+    def search(self, date_from=None, date_to=None) -> RegionRiskBatch:
         """
         Collects data about Province of Trento risk of infection within a range of dates.
         :param date_from: start date string. If None, uses February, 23rd 2021, i.e. date of first measurement.
         :param date_to: end date string. If None, uses today date.
-        :return: List[RegionRisk] object.
+        :return: RegionRiskBatch object.
         """
         date_from, date_to = validate_dates(date_from, date_to)
         df = self.get_data()
         df = self.clean_data(df, date_from, date_to)
 
-        return RegionRisk.from_df(df)
+        return RegionRiskBatch.from_df(df)
@@ -1,11 +1,11 @@
 import time
-from typing import Optional, List
+from typing import Optional
 import pandas as pd
 from pandas import Timestamp
-import requests
 
-from data.models import StringencyIndex
+from data.batches import StringencyIndexBatch
 from .validation_utils import validate_dates
+from .http_client import http_client
 
 
 class StringencyIndexCollector:
@@ -34,7 +34,8 @@ class StringencyIndexCollector:
         n_retries = 0
         data = None
         while n_retries < self.max_retries:
-            res = requests.get(url)
+            # The date range changes at each run: the response is not cached
+            res = http_client.get(url, conditional=False)
             if res.status_code == 200:
                 data = res.json()
                 break
@@ -57,15 +58,15 @@ class StringencyIndexCollector:
             return [{"date": pd.to_datetime(d, format="%Y-%m-%d"), "value": data["data"][d]["ITA"]["stringency"]} for d in
                     data["data"]]
 
-    def search(self, date_from=None, date_to=None) -> List[StringencyIndex]:
+    def search(self, date_from=None, date_to=None) -> StringencyIndexBatch:
         """
         Collects Italian Stringency index within a date range.
         :param date_from: start date string. If None, uses February, 23rd 2021, i.e. date of first measurement.
         :param date_to: end date string. If None, uses today date.
-        :return: data modelled as List[StringencyIndex].
+        :return: data modelled as StringencyIndexBatch.
         """
         date_from, date_to = validate_dates(date_from, date_to)
         data = self.get_data(date_from, date_to)
         data = self.clean_data(data)
 
-        return StringencyIndex.from_repr(data)
+        return StringencyIndexBatch.from_repr(data)
@@ -3,7 +3,8 @@ import datetime
 import pandas as pd
 
 from .validation_utils import validate_dates
-from data.models import *
+from .http_client import http_client
+from data.batches import VaccinesDeliveryDataBatch, VaccinesAdministrationDataBatch
 
 
 class VaccinesDataCollector:
@@ -40,7 +41,7 @@ class VaccinesDataCollector:
         from_date, to_date = validate_dates(date_from, date_to)
 
         url = f"https://raw.githubusercontent.com/{self.repo}/master/{self.path}"
-        df = pd.read_csv(url)
+        df = http_client.read_csv(url)
         df[self.date] = pd.to_datetime(df[self.date], format="%Y-%m-%d")
         assert len(df) > 0, "Vaccines delivery search returned no data"
         return self.clean_data(df, from_date, to_date)
@@ -54,16 +55,16 @@ class VaccinesDeliveryDataCollector(VaccinesDataCollector):
                          "data_consegna",
                          batch_size=batch_size)
 
-    def search(self, date_from=None, date_to=None) -> List[VaccinesDeliveryData]:
+    def search(self, date_from=None, date_to=None) -> VaccinesDeliveryDataBatch:
         """
         Collects data about vaccines delivery.
         :param date_from: start date string.
         :param date_to: end date string.
-        :return: List[VaccinesDeliveryData]
+        :return: VaccinesDeliveryDataBatch
         """
         vax = self.search_vax(date_from, date_to)
         vax = vax.rename(columns={"numero_dosi": "n_doses", "data_consegna": "delivery_date"})
-        data = VaccinesDeliveryData.from_df(vax)
+        data = VaccinesDeliveryDataBatch.from_df(vax)
         return data
 
 
@@ -75,16 +76,16 @@ class VaccinesAdministrationDataCollector(VaccinesDataCollector):
                          "data_somministrazione",
                          batch_size=batch_size)
 
-    def search(self, date_from=None, date_to=None) -> List[VaccinesAdministrationData]:
+    def search(self, date_from=None, date_to=None) -> VaccinesAdministrationDataBatch:
         """
         Collects data about vaccines administrations.
         :param date_from: start date string.
         :param date_to: end date string.
-        :return: List[VaccinesDeliveryData]
+        :return: VaccinesAdministrationDataBatch
         """
         vax = self.search_vax(date_from, date_to)
         vax = vax.rename(columns={"data_somministrazione": "administration_date", "fascia_anagrafica": "age_group",
                                    "sesso_maschile": "male", "sesso_femminile": "female", "prima_dose": "first_dose",
                                    "seconda_dose": "second_dose"})
-        data = VaccinesAdministrationData.from_df(vax)
+        data = VaccinesAdministrationDataBatch.from_df(vax)
         return data
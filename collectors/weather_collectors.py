@@ -1,13 +1,17 @@
 from time import sleep
-from urllib.error import URLError
-from typing import List
 
 import pandas as pd
 import requests
 
 from . import validation_utils
-from data.models import WeatherStation, WeatherData, Municipality
+from data.models import Municipality
+from data.batches import WeatherStationBatch, WeatherDataBatch
 from .timeout import exit_after
+from .rate_limit import HostRateLimiter
+from .http_client import http_client
+
+# Historical data service of Meteotrentino (can be pointed to a local stand-in serving recorded pages, e.g. for tests)
+WEATHER_DATA_URL = "http://storico.meteotrentino.it/cgi/webhyd.pl"
 
 
 class WeatherStationCollector:
@@ -37,7 +41,7 @@ class WeatherStationCollector:
 
         # Source 3: Get weather station table from meteotrentino.it and filter active stations
         weather_stations_table_url = "https://content.meteotrentino.it/dati-meteo/stazioni/dati-Stazioni-Json.aspx"
-        res = requests.get(weather_stations_table_url)
+        res = http_client.get(weather_stations_table_url)
         wstations_all = pd.DataFrame(res.json()["records"])
         wstations_active = wstations_all[wstations_all["fine"] == '']
         wstations_geodf = gpd.GeoDataFrame(wstations_active.drop(columns=["est", "nord", "fine", "inizio"]),
@@ -100,18 +104,22 @@ class WeatherStationCollector:
         ws = self._expand_with_sensor_data(ws)
 
         # Export
-        ws = WeatherStation.from_df(ws)
+        ws = WeatherStationBatch.from_df(ws)
         return ws
 
 
 @exit_after(15)
 def get_weather_data_from_api(url):
-    return pd.read_html(url)
+    # Pages are requested for a date range once: they are not cached
+    return http_client.read_html(url, conditional=False, timeout=15)
 
 
 class WeatherDataCollector:
 
-    def __init__(self):
+    def __init__(self, base_url: str = WEATHER_DATA_URL, rate_limiter: HostRateLimiter = None):
+        # rate_limiter: shared by the threads fetching stations concurrently (None: requests are not delayed)
+        self.base_url = base_url
+        self.rate_limiter = rate_limiter
         self.max_attempts = 5
         self.retry_initial_interval = 1  # seconds
         self.retry_interval_increment = 3  # seconds
@@ -121,8 +129,7 @@ class WeatherDataCollector:
         date_from = pd.Timestamp(date_from).strftime("%d/%m/%Y")
         date_to = pd.Timestamp(date_to).strftime("%d/%m/%Y")
 
-        endpoint = "storico.meteotrentino.it/cgi/webhyd.pl"
-        url = f"http://{endpoint}?co={station_id}&v=10.00_10.00,400.00_400.00,430.00_430.00,515.00_515.00," \
+        url = f"{self.base_url}?co={station_id}&v=10.00_10.00,400.00_400.00,430.00_430.00,515.00_515.00," \
               f"550.00_550.00,750.00_750.00&vn=Pioggia%20(millimetri)%20,Temperatura%20aria%20(gradi%20Celsius)%20," \
               f"Umidita%27%20aria%20(percentuale)%20,Velocita%27%20vento%20media%20(metri/secondo)%20," \
               f"Pressione%20atmosferica%20(Ettopascal)%20,Radiazione%20solare%20totale%20(" \
@@ -156,13 +163,15 @@ class WeatherDataCollector:
         tables_list = None
 
         while n_attempts < self.max_attempts:
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait(url)
             try:
                 try:
                     tables_list = get_weather_data_from_api(url)
                     break
                 except KeyboardInterrupt:
                     raise TimeoutError
-            except (URLError, TimeoutError):
+            except (requests.RequestException, TimeoutError):
                 print(f"Failed connection attempt n. {n_attempts + 1}. Retrying in {sleep_duration} s")
                 sleep(sleep_duration)
                 n_attempts += 1
@@ -179,8 +188,8 @@ class WeatherDataCollector:
             # Return empty dataframe
             return pd.DataFrame()
 
-    def search(self, station_id: str, date_from=None, date_to=None) -> List[WeatherData]:
+    def search(self, station_id: str, date_from=None, date_to=None) -> WeatherDataBatch:
         date_from, date_to = validation_utils.validate_dates(date_from, date_to)
         wdata = self._scrape_weather_data(station_id, date_from, date_to)
-        wdata = WeatherData.from_df(wdata)
+        wdata = WeatherDataBatch.from_df(wdata)
         return wdata
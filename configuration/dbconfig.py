@@ -5,19 +5,36 @@ MYSQL_HOST = os.environ.get("MYSQL_HOST")
 MYSQL_USER = os.environ.get("MYSQL_USER")
 MYSQL_PW = os.environ.get("MYSQL_PW")
 MYSQL_SCHEMA = os.environ.get("MYSQL_SCHEMA")
+# Optional: maximum number of pooled MySQL connections per process
+MYSQL_POOL_SIZE = int(os.environ["MYSQL_POOL_SIZE"]) if os.environ.get("MYSQL_POOL_SIZE") else None
 
 MONGODB_USER = os.environ.get("MONGODB_USER")
 MONGODB_PW = os.environ.get("MONGODB_PW")
 MONGODB_CLUSTER = os.environ.get("MONGODB_CLUSTER")
 MONGODB_DEFAULT_DB = os.environ.get("MONGODB_DEFAULT_DB")
+# Optional: maximum number of pooled MongoDB connections per server and process
+MONGODB_POOL_SIZE = int(os.environ["MONGODB_POOL_SIZE"]) if os.environ.get("MONGODB_POOL_SIZE") else None
 
-__missing_ev_count = 0
-for ev in [MYSQL_HOST, MYSQL_USER, MYSQL_PW, MYSQL_SCHEMA, MONGODB_USER, MONGODB_PW, MONGODB_CLUSTER,
-           MONGODB_DEFAULT_DB]:
-    if ev is None:
-        __missing_ev_count += 1
+# Optional: folder of the "local" storage (embedded Parquet files), by default local_storage in the project folder
+LOCAL_STORAGE_PATH = os.environ.get("LOCAL_STORAGE_PATH") or \
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "local_storage")
 
-if __missing_ev_count > 0:
-    print(f"[Error] Missing {__missing_ev_count} DB credentials environment variables;"
-          f"make sure to set all required environment variables.")
-    exit(-1)
+# Optional: cache of reference data (provinces, municipalities, weather stations), see data/cache.py.
+# Seconds after which cached data expire (default one day, 0 disables the cache) and folder of the cache shared by the
+# processes (default cache in the local storage folder, empty to keep the cache in memory only)
+REFERENCE_CACHE_TTL = float(os.environ["REFERENCE_CACHE_TTL"]) if os.environ.get("REFERENCE_CACHE_TTL") else 86400
+REFERENCE_CACHE_PATH = os.environ.get("REFERENCE_CACHE_PATH", os.path.join(LOCAL_STORAGE_PATH, "cache")) or None
+
+
+def check_credentials():
+    # Called before connecting to MySQL or MongoDB: the "local" storage does not need any credentials
+    missing_ev_count = 0
+    for ev in [MYSQL_HOST, MYSQL_USER, MYSQL_PW, MYSQL_SCHEMA, MONGODB_USER, MONGODB_PW, MONGODB_CLUSTER,
+               MONGODB_DEFAULT_DB]:
+        if ev is None:
+            missing_ev_count += 1
+
+    if missing_ev_count > 0:
+        print(f"[Error] Missing {missing_ev_count} DB credentials environment variables;"
+              f"make sure to set all required environment variables.")
+        exit(-1)
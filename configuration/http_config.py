@@ -0,0 +1,11 @@
+import os
+from .dbconfig import LOCAL_STORAGE_PATH
+
+# Optional: shared HTTP client of the collectors (see collectors/http_client.py).
+# Folder of the cache of the responses revalidated with conditional requests (default http_cache in the local storage
+# folder, empty to disable conditional requests) and its size limit in MB (least recently used responses are removed
+# beyond it), connections kept alive for each host, and request timeout in seconds
+HTTP_CACHE_PATH = os.environ.get("HTTP_CACHE_PATH", os.path.join(LOCAL_STORAGE_PATH, "http_cache")) or None
+HTTP_CACHE_MAX_MB = float(os.environ["HTTP_CACHE_MAX_MB"]) if os.environ.get("HTTP_CACHE_MAX_MB") else 256
+HTTP_POOL_SIZE = int(os.environ["HTTP_POOL_SIZE"]) if os.environ.get("HTTP_POOL_SIZE") else 10
+HTTP_TIMEOUT = float(os.environ["HTTP_TIMEOUT"]) if os.environ.get("HTTP_TIMEOUT") else 60
@@ -0,0 +1,255 @@
+from __future__ import absolute_import, annotations
+
+import inspect
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .models import Municipality, MunicipalityData, Province, ProvinceData, RegionRisk, Holiday, WeatherStation, \
+    MunicipalityWeatherStationLink, WeatherData, DailyWeather, WeightedWeather, VaccinesAdministrationData, \
+    VaccinesDeliveryData, StringencyIndex, CuratedData, Forecast
+
+
+def as_column(values, dtype: str) -> np.ndarray:
+    # Values of a column as a NumPy array of the declared dtype. Series and arrays that already have the declared
+    # dtype are not copied. Integer columns with missing values become float64 (NaN).
+    if isinstance(values, (pd.Series, np.ndarray)) and values.dtype == dtype:
+        return values.to_numpy() if isinstance(values, pd.Series) else values
+    if dtype == "object" and not isinstance(values, pd.Series):
+        return np.asarray(values, dtype=object)
+    if isinstance(values, pd.Series):
+        series = values
+    else:
+        series = pd.Series(list(values)) if len(values) > 0 else pd.Series([], dtype=object)
+    if dtype.startswith("datetime64"):
+        return pd.to_datetime(series).to_numpy()
+    if dtype == "object":
+        return series.to_numpy(dtype=object)
+    if dtype == "bool":
+        return series.to_numpy(dtype=bool)
+    numeric = pd.to_numeric(series)
+    if dtype == "int64":
+        try:
+            return numeric.astype(np.int64, copy=False).to_numpy()
+        except (ValueError, TypeError):
+            return numeric.astype(np.float64).to_numpy()
+    return numeric.astype(dtype, copy=False).to_numpy()
+
+
+def python_values(column: np.ndarray) -> list:
+    # Values of a column as Python objects (datetime, int, float, bool, str), with None for missing values
+    if column.dtype.kind == "M":
+        index = pd.DatetimeIndex(column)
+        out = index.to_pydatetime().astype(object)
+        out[index.isna()] = None
+    elif column.dtype.kind == "f":
+        out = column.astype(object)
+        out[np.isnan(column)] = None
+    elif column.dtype.kind == "O":
+        out = column.copy()
+        out[pd.isna(column)] = None
+    else:
+        return column.tolist()
+    return out.tolist()
+
+
+class RecordView:
+    # Read-only view of one record of a batch, with the same attributes as the instances of the model class.
+    # Subclasses (one per batch class) define a property for each attribute.
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: RecordBatch, index: int):
+        self._batch = batch
+        self._index = index
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{a}={getattr(self, a)!r}' for a in self._batch.attributes)})"
+
+
+def _scalar(column: np.ndarray, index: int):
+    # Value of a column at index, converted as in the model instances (Timestamp for dates, None for missing values)
+    value = column[index]
+    kind = column.dtype.kind
+    if kind == "M":
+        return pd.Timestamp(value)
+    if kind == "f":
+        return None if np.isnan(value) else float(value)
+    if kind in "iub":
+        return value.item()
+    return value
+
+
+class RecordBatch:
+    # Columnar collection of records of an entity: one NumPy array for each column of model.DTYPES (same names and
+    # order as the DataFrame returned by model.to_df). It replaces lists of model instances: iterating or indexing a
+    # batch returns lightweight views with the attributes of the model.
+    model = None
+    attributes = None  # names of the model attributes, in the order of model.DTYPES
+    _view_class = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Model attributes are the arguments of its constructor, which follow the order of its DTYPES
+        cls.attributes = list(inspect.signature(cls.model.__init__).parameters)[1:]
+        assert len(cls.attributes) == len(cls.model.DTYPES), f"{cls.model.__name__}: attributes do not match DTYPES"
+        properties = dict((a, property(lambda self, c=c: _scalar(self._batch.columns[c], self._index)))
+                          for a, c in zip(cls.attributes, cls.model.DTYPES))
+        cls._view_class = type(cls.model.__name__ + "View", (RecordView,), {"__slots__": (), **properties})
+
+    def __init__(self, columns: dict):
+        assert list(columns) == list(self.model.DTYPES), "Columns do not match the model"
+        lengths = set(len(c) for c in columns.values())
+        assert len(lengths) <= 1, "Columns have different lengths"
+        self.columns = columns
+
+    @classmethod
+    def empty(cls) -> RecordBatch:
+        return cls.from_columns([[] for _ in cls.model.DTYPES])
+
+    @classmethod
+    def from_columns(cls, columns: list) -> RecordBatch:
+        # columns: one sequence of values for each column, in the order of model.DTYPES
+        assert len(columns) == len(cls.model.DTYPES), "Number of columns does not match the model"
+        return cls(dict((name, as_column(values, dtype))
+                        for (name, dtype), values in zip(cls.model.DTYPES.items(), columns)))
+
+    @classmethod
+    def from_rows(cls, rows: list) -> RecordBatch:
+        # rows: tuples of values in the order of model.DTYPES (e.g. query results)
+        if len(rows) == 0:
+            return cls.empty()
+        return cls.from_columns(list(zip(*rows)))
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> RecordBatch:
+        # df has (at least) the columns of model.to_df
+        if len(df) == 0:
+            return cls.empty()
+        return cls(dict((name, as_column(df[name], dtype)) for name, dtype in cls.model.DTYPES.items()))
+
+    @classmethod
+    def from_repr(cls, lst_dict: list) -> RecordBatch:
+        # Missing keys (e.g. fields added to the schema after a document was saved) are missing values
+        return cls.from_columns([[d.get(name) for d in lst_dict] for name in cls.model.DTYPES])
+
+    @classmethod
+    def from_records(cls, records: list) -> RecordBatch:
+        # records: instances of the model (or views)
+        return cls.from_columns([[getattr(r, a) for r in records] for a in cls.attributes])
+
+    @classmethod
+    def coerce(cls, data) -> RecordBatch:
+        # Batch from a batch, a model instance or a list of model instances
+        if isinstance(data, cls):
+            return data
+        if isinstance(data, cls.model):
+            data = [data]
+        assert isinstance(data, list), f"Expected {cls.__name__}, {cls.model.__name__} or a list"
+        return cls.from_records(data)
+
+    @classmethod
+    def concat(cls, batches: List[RecordBatch]) -> RecordBatch:
+        if len(batches) == 0:
+            return cls.empty()
+        return cls(dict((name, np.concatenate([b.columns[name] for b in batches])) for name in cls.model.DTYPES))
+
+    def to_df(self, compact=False) -> pd.DataFrame:
+        # compact: cast the columns to the compact dtypes of the schema (copy)
+        df = pd.DataFrame(self.columns, columns=list(self.model.DTYPES), copy=False)
+        return self.model.SCHEMA.compact(df) if compact else df
+
+    def to_repr(self) -> list:
+        # Records as dictionaries of Python values with the keys of model.to_repr (e.g. MongoDB documents)
+        return [dict(zip(self.model.DTYPES, row)) for row in self.rows()]
+
+    def to_records(self) -> list:
+        return [self.model(*[getattr(v, a) for a in self.attributes]) for v in self]
+
+    def rows(self) -> List[tuple]:
+        # Records as tuples of Python values in the order of model.DTYPES, e.g. for parameterized inserts
+        return list(zip(*[python_values(self.columns[name]) for name in self.model.DTYPES]))
+
+    def __len__(self):
+        columns = list(self.columns.values())
+        return len(columns[0]) if len(columns) > 0 else 0
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError("Batch index out of range")
+            return self._view_class(self, int(key))
+        return type(self)(dict((name, column[key]) for name, column in self.columns.items()))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._view_class(self, i)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self)} records)"
+
+
+class MunicipalityBatch(RecordBatch):
+    model = Municipality
+
+
+class MunicipalityDataBatch(RecordBatch):
+    model = MunicipalityData
+
+
+class ProvinceBatch(RecordBatch):
+    model = Province
+
+
+class ProvinceDataBatch(RecordBatch):
+    model = ProvinceData
+
+
+class RegionRiskBatch(RecordBatch):
+    model = RegionRisk
+
+
+class HolidayBatch(RecordBatch):
+    model = Holiday
+
+
+class WeatherStationBatch(RecordBatch):
+    model = WeatherStation
+
+
+class MunicipalityWeatherStationLinkBatch(RecordBatch):
+    model = MunicipalityWeatherStationLink
+
+
+class WeatherDataBatch(RecordBatch):
+    model = WeatherData
+
+
+class DailyWeatherBatch(RecordBatch):
+    model = DailyWeather
+
+
+class WeightedWeatherBatch(RecordBatch):
+    model = WeightedWeather
+
+
+class VaccinesAdministrationDataBatch(RecordBatch):
+    model = VaccinesAdministrationData
+
+
+class VaccinesDeliveryDataBatch(RecordBatch):
+    model = VaccinesDeliveryData
+
+
+class StringencyIndexBatch(RecordBatch):
+    model = StringencyIndex
+
+
+class CuratedDataBatch(RecordBatch):
+    model = CuratedData
+
+
+class ForecastBatch(RecordBatch):
+    model = Forecast
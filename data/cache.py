@@ -0,0 +1,118 @@
+import os
+import glob
+import time
+import pickle
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+
+from configuration import dbconfig
+
+DEFAULT_MAXSIZE = 128  # entries kept in memory
+DISK_SUFFIX = ".pkl"
+
+
+class ReferenceCache:
+    # Read-through cache of reference data (provinces, municipalities, weather stations), which change only when the
+    # setup pipelines save them. Entries are kept in an in-process LRU and, if path is set, in pickle files shared by
+    # the processes (so that a pipeline run finds the data loaded by the previous one). Entries expire after ttl
+    # seconds, and are invalidated by the DAOs when the tables they were read from are saved.
+    # Cached values are shared: callers must not modify them.
+
+    def __init__(self, ttl: float = None, path: str = None, maxsize: int = DEFAULT_MAXSIZE):
+        # ttl: seconds (None: entries never expire, 0: cache disabled); path: folder of the disk cache (None: in-memory
+        # cache only)
+        self.ttl = ttl
+        self.path = path
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (tables, expiry, value)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl is None or self.ttl > 0
+
+    def expiry(self) -> float:
+        return time.time() + self.ttl if self.ttl is not None else float("inf")
+
+    def file_path(self, tables: tuple, key: tuple) -> str:
+        # Table names in the file name, so that entries are invalidated without reading them
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.path, "+".join(tables) + "__" + digest + DISK_SUFFIX)
+
+    def get(self, tables: tuple, key: tuple, loader):
+        # Value of key, read from the tables by loader() if it is not cached or it has expired
+        if not self.enabled:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        entry = self.read_file(tables, key)
+        if entry is None:
+            entry = (tables, self.expiry(), loader())
+            self.write_file(tables, key, entry)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry[2]
+
+    def read_file(self, tables: tuple, key: tuple):
+        if self.path is None:
+            return None
+        path = self.file_path(tables, key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry if stored_key == key and entry[1] > time.time() else None
+
+    def write_file(self, tables: tuple, key: tuple, entry: tuple):
+        if self.path is None:
+            return
+        path = self.file_path(tables, key)
+        os.makedirs(self.path, exist_ok=True)
+        # Written atomically: concurrent readers see either no file or the whole entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((key, entry), f)
+        os.replace(tmp_path, path)
+
+    def invalidate(self, *tables: str):
+        # Drop the entries read from any of the tables (all the entries if no table is given)
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if len(tables) == 0 or set(e[0]) & set(tables)]:
+                del self._entries[key]
+
+        if self.path is not None:
+            for path in glob.glob(os.path.join(self.path, "*" + DISK_SUFFIX)):
+                entry_tables = os.path.basename(path).split("__")[0].split("+")
+                if len(tables) == 0 or set(entry_tables) & set(tables):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+
+# Cache of the process, configured by the environment variables REFERENCE_CACHE_TTL and REFERENCE_CACHE_PATH
+reference_cache = ReferenceCache(ttl=dbconfig.REFERENCE_CACHE_TTL, path=dbconfig.REFERENCE_CACHE_PATH)
+
+
+def cached_reference(*tables: str):
+    # Decorator of DAO methods reading from tables: results are cached by method and arguments (the DAO instance is
+    # not part of the key, so all the instances share them)
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (type(self).__name__, method.__name__, args, tuple(sorted(kwargs.items())))
+            return reference_cache.get(tables, key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
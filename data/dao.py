@@ -1,14 +1,160 @@
+import os
+import glob
+import json
+import pickle
+import hashlib
+import threading
+import time
 import numpy as np
+import pandas as pd
 from pandas import Timestamp
 from abc import ABC, abstractmethod
+from typing import Iterator
+from uuid import uuid4
 
 from collectors.validation_utils import validate_dates
 from configuration import dbconfig
 from .models import *
-from .mysql_wrapper import MySqlDB
-from .mongo_wrapper import MongoDB
+from .schema import Schema, WEATHER_QUANTITIES
+from .batches import *
+from .mysql_wrapper import MySqlDB, DEFAULT_CHUNK_SIZE
+from .mongo_wrapper import MongoDB, DEFAULT_BATCH_SIZE
+from .local_storage import ParquetStore
+from .cache import reference_cache, cached_reference
+
+# default: MySQL and MongoDB Atlas; local: embedded Parquet files (see local_storage.py)
+ALLOWED_STORAGE = ["default", "local"]
+
+
+def date_range_query(schema: Schema, date_from=None, date_to=None) -> str:
+    # Select the columns of the schema, in schema order, of the records whose date column is in the date range
+    date_from, date_to = validate_dates(date_from, date_to)
+    str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
+    str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
+    return schema.select_sql(where=f'{schema.date_column} between "{str_date_from}" and "{str_date_to}"')
+
+
+def read_records(sql, model) -> list:
+    # Result of sql as a list of instances of model (built from the row values, in the order of model.SCHEMA)
+    db = MySqlDB()
+    with db.connect():
+        result = db.read(sql)
+    return [model(*i) for i in result]
+
+
+def insert_rows(sql, values, upsert_keys=None) -> dict:
+    # Insert rows (list of tuples) in a single transaction, through multi-row statements sized to the server packet.
+    # If upsert_keys is given, rows whose key already exists are updated (see MySqlDB.bulk_insert).
+    # Returns the insertion status (inserted rows, or upserted and affected rows, statements, elapsed seconds and rows
+    # per second).
+    db = MySqlDB()
+    with db.connect():
+        status = db.bulk_insert(sql, values, upsert_keys=upsert_keys)
+    processed = sum(status.get(k, 0) for k in ["inserted", "updated", "unchanged", "upserted"])
+    assert processed == len(values), 'MySql insertion error: inserted less entities than provided'
+    return status
+
+
+def frame_from_columns(columns, dtypes: dict) -> pd.DataFrame:
+    # Build a DataFrame from a list of columns (sequences of values) named and typed according to dtypes, without
+    # creating model instances or dictionaries for each row
+    assert len(columns) == len(dtypes), "Number of columns does not match the declared dtypes"
+    data = dict((name, as_column(values, dtype)) for (name, dtype), values in zip(dtypes.items(), columns))
+    return pd.DataFrame(data, columns=list(dtypes))
+
+
+def read_df(sql, model) -> pd.DataFrame:
+    # Result of sql as a DataFrame with the columns of model.to_df
+    db = MySqlDB()
+    with db.connect():
+        columns = db.read_columns(sql)
+    return frame_from_columns(columns, model.DTYPES)
+
+
+def iter_df(sql, model, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Stream the result of sql and yield DataFrames of at most chunk_size rows with the columns of model.to_df
+    db = MySqlDB()
+    with db.connect():
+        for rows in db.stream(sql, chunk_size=chunk_size):
+            yield frame_from_columns(list(zip(*rows)), model.DTYPES)
+
+
+def records_to_df(records: list, model) -> pd.DataFrame:
+    # DataFrame with the columns of model.to_df from a list of documents (dictionaries)
+    return frame_from_columns([[r.get(c) for r in records] for c in model.DTYPES], model.DTYPES)
+
+
+def iter_documents_df(client: MongoDB, collection: str, query: dict, model, orderby=None,
+                      batch_size=DEFAULT_BATCH_SIZE):
+    # Stream the documents matching query and yield DataFrames of at most batch_size rows with the columns of
+    # model.to_df. Only the fields of the schema are transferred.
+    for documents in client.iter_batches(dbconfig.MONGODB_DEFAULT_DB, collection, query,
+                                         projection=model.SCHEMA.projection(), orderby=orderby,
+                                         batch_size=batch_size):
+        yield records_to_df(documents, model)
+
+
+def read_documents_df(client: MongoDB, collection: str, query: dict, model, orderby=None,
+                      batch_size=DEFAULT_BATCH_SIZE) -> pd.DataFrame:
+    # Documents matching query as a DataFrame with the columns of model.to_df. Each batch of the cursor is converted
+    # to typed columns before the next one is read, so at most batch_size documents are held in memory at a time.
+    chunks = dict((name, []) for name in model.DTYPES)
+    for documents in client.iter_batches(dbconfig.MONGODB_DEFAULT_DB, collection, query,
+                                         projection=model.SCHEMA.projection(), orderby=orderby,
+                                         batch_size=batch_size):
+        for name, dtype in model.DTYPES.items():
+            chunks[name].append(as_column([d.get(name) for d in documents], dtype))
+    if len(chunks[next(iter(chunks))]) == 0:
+        return frame_from_columns([[] for _ in model.DTYPES], model.DTYPES)
+    # Integer columns with missing values in some batches only are promoted to float64 by the concatenation
+    return pd.DataFrame(dict((name, np.concatenate(c)) for name, c in chunks.items()), columns=list(model.DTYPES))
+
+
+def iter_rows(sql, model, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Stream the result of sql and yield lists of at most chunk_size instances of model (built from the row values)
+    db = MySqlDB()
+    with db.connect():
+        for rows in db.stream(sql, chunk_size=chunk_size):
+            yield [model(*i) for i in rows]
+
+
+class LocalDao:
+    # Base of the DAOs of the "local" storage, which keep the records of model in a ParquetStore. Reads return the
+    # same types as the MySQL and MongoDB DAOs; date ranges are validated in the same way.
+    model = None
+    batch_class = None
+
+    def __init__(self, path: str = None):
+        self.store = ParquetStore(path)
+
+    def save(self, data, upsert=False):
+        data = self.batch_class.coerce(data)
+        if len(data) > 0:
+            return self.store.write(self.model.SCHEMA, data.to_df(), upsert=upsert)
+
+    def read_all(self) -> list:
+        return self.batch_class.from_df(self.read_all_df()).to_records()
+
+    def read_all_df(self) -> pd.DataFrame:
+        return self.store.read(self.model.SCHEMA)
+
+    def get_most_recent_timestamp(self, filters: list = None) -> pd.Timestamp:
+        return self.store.max_date(self.model.SCHEMA, filters=filters)
+
+    def get_by_date(self, date_from=None, date_to=None) -> list:
+        return self.batch_class.from_df(self.get_by_date_df(date_from, date_to)).to_records()
+
+    def iter_by_date(self, date_from=None, date_to=None, chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[list]:
+        for df in self.iter_by_date_df(date_from, date_to, chunk_size=chunk_size):
+            yield self.batch_class.from_df(df).to_records()
 
-ALLOWED_STORAGE = ["default"]
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        date_from, date_to = validate_dates(date_from, date_to)
+        return self.store.read(self.model.SCHEMA, date_from, date_to)
+
+    def iter_by_date_df(self, date_from=None, date_to=None, chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        date_from, date_to = validate_dates(date_from, date_to)
+        yield from self.store.iter_read(self.model.SCHEMA, date_from, date_to, chunk_size=chunk_size)
 
 
 class ProvinceDao(ABC):
@@ -16,7 +162,7 @@ class ProvinceDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, prov: List[Province]):
+    def save(self, prov: Province or List[Province] or ProvinceBatch, upsert=False):
         pass
 
     @abstractmethod
@@ -25,19 +171,17 @@ class ProvinceDao(ABC):
 
 
 class ProvinceMySqlDao(ProvinceDao):
+    UNIQUE_KEY = Province.SCHEMA.unique_key
 
-    def save(self, prov: List[Province]):
-        assert isinstance(prov, list)
+    def save(self, prov: Province or List[Province] or ProvinceBatch, upsert=False):
+        prov = ProvinceBatch.coerce(prov)
         if len(prov) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into Province (name, code, population) values (%s, %s, %s)"
-                values = [(p.name, p.code, p.population) for p in prov]
-                if len(prov) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(prov) > 1)
-                assert inserted == len(prov), 'MySql insertion error: inserted less entities than provided'
+            sql = Province.SCHEMA.insert_sql()
+            status = insert_rows(sql, prov.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
+            reference_cache.invalidate(Province.SCHEMA.name)
+            return status
 
+    @cached_reference(Province.SCHEMA.name)
     def get_population(self, name: str) -> int:
         db = MySqlDB()
         sql = f'select population from Province where name = "{name}"'
@@ -46,12 +190,22 @@ class ProvinceMySqlDao(ProvinceDao):
         return result[0][0] if len(result) > 0 else None
 
 
+class ProvinceLocalDao(LocalDao, ProvinceDao):
+    model = Province
+    batch_class = ProvinceBatch
+    UNIQUE_KEY = Province.SCHEMA.unique_key
+
+    def get_population(self, name: str) -> int:
+        df = self.store.read(Province.SCHEMA, columns=["population"], filters=[("name", "=", name)])
+        return int(df["population"].iloc[0]) if len(df) > 0 else None
+
+
 class ProvinceDataDao(ABC):
     def __init__(self):
         pass
 
     @abstractmethod
-    def save(self, data: ProvinceData or List[ProvinceData]):
+    def save(self, data: ProvinceData or List[ProvinceData] or ProvinceDataBatch, upsert=False):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
         pass
@@ -66,29 +220,32 @@ class ProvinceDataDao(ABC):
         # Read in date range
         pass
 
+    @abstractmethod
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[ProvinceData]]:
+        # Read in date range, yielding lists of at most chunk_size instances
+        pass
+
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as ProvinceData.to_df)
+        pass
+
+    @abstractmethod
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        # Read in date range, yielding DataFrames of at most chunk_size rows
+        pass
+
 
 class ProvinceDataMySqlDao(ProvinceDataDao):
+    UNIQUE_KEY = ProvinceData.SCHEMA.unique_key
 
-    def save(self, data: ProvinceData or List[ProvinceData]):
-        if isinstance(data, ProvinceData):
-            data = [data]
-        assert isinstance(data, list)
+    def save(self, data: ProvinceData or List[ProvinceData] or ProvinceDataBatch, upsert=False):
+        data = ProvinceDataBatch.coerce(data)
         if len(data) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into ProvinceData (date, name, cases, new_cases, active, recovered, deaths, quarantined, " \
-                      + "hospitalized_infectious_diseases, hospitalized_high_intensity, hospitalized_intensive_care, " \
-                      + "discharged,  active_rsa, active_nursing_homes, active_int_struct, active_rsa_total) values " \
-                      + f"(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
-                values = [(p.date.to_pydatetime(), p.name, p.cases, p.new_cases, p.active, p.recovered, p.deaths,
-                           p.quarantined, p.hospitalized_infectious_diseases, p.hospitalized_high_intensity,
-                           p.hospitalized_intensive_care, p.discharged, p.active_rsa,
-                           p.active_nursing_homes, p.active_int_struct, p.active_rsa_total) for p in
-                          data]
-                if len(data) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(data) > 1)
-                assert inserted == len(data), 'MySql insertion error: inserted less entities than provided'
+            sql = ProvinceData.SCHEMA.insert_sql()
+            return insert_rows(sql, data.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
 
     def get_most_recent_timestamp(self) -> pd.Timestamp:
         # In principle, the query returns [name, date], which is transformed into a dictionary {name: date}
@@ -106,18 +263,30 @@ class ProvinceDataMySqlDao(ProvinceDataDao):
         return response["PAT"] if "PAT" in response else None
 
     def get_by_date(self, date_from=None, date_to=None) -> List[ProvinceData]:
-        date_from, date_to = validate_dates(date_from, date_to)
-        str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
-        str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
-        db = MySqlDB()
-        sql = f'select * from ProvinceData where date between "{str_date_from}" and "{str_date_to}"'
-        with db.connect():
-            result = db.read(sql)
-        return [ProvinceData(i[0], i[1], i[2],
-                             i[3], i[4], i[5],
-                             i[6], i[7], i[8],
-                             i[9], i[10], i[11],
-                             i[12], i[13], i[14], i[15]) for i in result]
+        return read_records(date_range_query(ProvinceData.SCHEMA, date_from, date_to), ProvinceData)
+
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[ProvinceData]]:
+        sql = date_range_query(ProvinceData.SCHEMA, date_from, date_to)
+        yield from iter_rows(sql, ProvinceData, chunk_size=chunk_size)
+
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        return read_df(date_range_query(ProvinceData.SCHEMA, date_from, date_to), ProvinceData)
+
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        sql = date_range_query(ProvinceData.SCHEMA, date_from, date_to)
+        yield from iter_df(sql, ProvinceData, chunk_size=chunk_size)
+
+
+class ProvinceDataLocalDao(LocalDao, ProvinceDataDao):
+    model = ProvinceData
+    batch_class = ProvinceDataBatch
+    UNIQUE_KEY = ProvinceData.SCHEMA.unique_key
+
+    def get_most_recent_timestamp(self) -> pd.Timestamp:
+        # Only the Timestamp for "PAT" is returned (None if there are no records)
+        return super().get_most_recent_timestamp(filters=[("name", "=", "PAT")])
 
 
 class MunicipalityDao(ABC):
@@ -125,34 +294,41 @@ class MunicipalityDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, mun: List[Municipality]):
+    def save(self, mun: Municipality or List[Municipality] or MunicipalityBatch, upsert=False):
         pass
 
     @abstractmethod
     def read_all(self) -> List[Municipality]:
         pass
 
+    @abstractmethod
+    def read_all_df(self) -> pd.DataFrame:
+        pass
+
 
 class MunicipalityMySqlDao(MunicipalityDao):
+    UNIQUE_KEY = Municipality.SCHEMA.unique_key
 
-    def save(self, mun: List[Municipality]):
+    def save(self, mun: Municipality or List[Municipality] or MunicipalityBatch, upsert=False):
+        mun = MunicipalityBatch.coerce(mun)
         if len(mun) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into Municipality (code, name, province, lat, lon, population) values (%s, %s, %s, %s, %s, %s)"
-                values = [(m.code, m.name, m.province, m.lat, m.lon, m.population) for m in mun]
-                if len(mun) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(mun) > 1)
-                assert inserted == len(mun), 'MySql insertion error: inserted less entities than provided'
+            sql = Municipality.SCHEMA.insert_sql()
+            status = insert_rows(sql, mun.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
+            reference_cache.invalidate(Municipality.SCHEMA.name)
+            return status
 
+    @cached_reference(Municipality.SCHEMA.name)
     def read_all(self) -> List[Municipality]:
-        db = MySqlDB()
-        sql = 'select * from Municipality'
-        with db.connect():
-            result = db.read(sql)
-        return [Municipality(i[0], i[1], i[2],
-                             i[3], i[4], i[5]) for i in result]
+        return read_records(Municipality.SCHEMA.select_sql(), Municipality)
+
+    def read_all_df(self) -> pd.DataFrame:
+        return read_df(Municipality.SCHEMA.select_sql(), Municipality)
+
+
+class MunicipalityLocalDao(LocalDao, MunicipalityDao):
+    model = Municipality
+    batch_class = MunicipalityBatch
+    UNIQUE_KEY = Municipality.SCHEMA.unique_key
 
 
 class MunicipalityDataDao(ABC):
@@ -160,7 +336,7 @@ class MunicipalityDataDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, data: MunicipalityData or List[MunicipalityData]):
+    def save(self, data: MunicipalityData or List[MunicipalityData] or MunicipalityDataBatch, upsert=False):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
         pass
@@ -175,23 +351,32 @@ class MunicipalityDataDao(ABC):
         # Read in date range
         pass
 
+    @abstractmethod
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[MunicipalityData]]:
+        # Read in date range, yielding lists of at most chunk_size instances
+        pass
+
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as MunicipalityData.to_df)
+        pass
+
+    @abstractmethod
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        # Read in date range, yielding DataFrames of at most chunk_size rows
+        pass
+
 
 class MunicipalityDataMySqlDao(MunicipalityDataDao):
+    UNIQUE_KEY = MunicipalityData.SCHEMA.unique_key
 
-    def save(self, data: MunicipalityData or List[MunicipalityData]):
-        if isinstance(data, MunicipalityData):
-            data = [data]
-        assert isinstance(data, list)
+    def save(self, data: MunicipalityData or List[MunicipalityData] or MunicipalityDataBatch, upsert=False):
+        data = MunicipalityDataBatch.coerce(data)
         if len(data) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into MunicipalityData (date, code, cases, recovered, deaths, discharged) values " \
-                      + f"(%s, %s, %s, %s, %s, %s)"
-                values = [(m.date.to_pydatetime(), m.code, m.cases, m.recovered, m.deaths, m.discharged) for m in data]
-                if len(data) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(data) > 1)
-                assert inserted == len(data), 'MySql insertion error: inserted less entities than provided'
+            sql = MunicipalityData.SCHEMA.insert_sql()
+            return insert_rows(sql, data.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
 
     def get_most_recent_timestamp(self) -> pd.Timestamp:
         # In principle, the query returns [code, date], which is transformed into a dictionary {code: date}
@@ -209,15 +394,26 @@ class MunicipalityDataMySqlDao(MunicipalityDataDao):
         return list(result.values())[0] if len(result) > 0 else None
 
     def get_by_date(self, date_from=None, date_to=None) -> List[MunicipalityData]:
-        date_from, date_to = validate_dates(date_from, date_to)
-        str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
-        str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
-        db = MySqlDB()
-        sql = f'select * from MunicipalityData where date between "{str_date_from}" and "{str_date_to}"'
-        with db.connect():
-            result = db.read(sql)
-        return [MunicipalityData(i[0], i[1], i[2],
-                                 i[3], i[4], i[5]) for i in result]
+        return read_records(date_range_query(MunicipalityData.SCHEMA, date_from, date_to), MunicipalityData)
+
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[MunicipalityData]]:
+        sql = date_range_query(MunicipalityData.SCHEMA, date_from, date_to)
+        yield from iter_rows(sql, MunicipalityData, chunk_size=chunk_size)
+
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        return read_df(date_range_query(MunicipalityData.SCHEMA, date_from, date_to), MunicipalityData)
+
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        sql = date_range_query(MunicipalityData.SCHEMA, date_from, date_to)
+        yield from iter_df(sql, MunicipalityData, chunk_size=chunk_size)
+
+
+class MunicipalityDataLocalDao(LocalDao, MunicipalityDataDao):
+    model = MunicipalityData
+    batch_class = MunicipalityDataBatch
+    UNIQUE_KEY = MunicipalityData.SCHEMA.unique_key
 
 
 class RegionRiskDao(ABC):
@@ -225,7 +421,7 @@ class RegionRiskDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, data: RegionRisk or List[RegionRisk]):
+    def save(self, data: RegionRisk or List[RegionRisk] or RegionRiskBatch, upsert=False):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
         pass
@@ -240,24 +436,34 @@ class RegionRiskDao(ABC):
         # Read in date range
         pass
 
+    @abstractmethod
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[RegionRisk]]:
+        # Read in date range, yielding lists of at most chunk_size instances
+        pass
+
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as RegionRisk.to_df)
+        pass
+
+    @abstractmethod
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        # Read in date range, yielding DataFrames of at most chunk_size rows
+        pass
+
 
 class RegionRiskMySqlDao(RegionRiskDao):
+    UNIQUE_KEY = RegionRisk.SCHEMA.unique_key
 
-    def save(self, data: RegionRisk or List[RegionRisk]):
+    def save(self, data: RegionRisk or List[RegionRisk] or RegionRiskBatch, upsert=False):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
-        if isinstance(data, RegionRisk):
-            data = [data]
-        assert isinstance(data, list)
+        data = RegionRiskBatch.coerce(data)
         if len(data) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into RegionRisk (date, region, risk) values (%s, %s, %s)"
-                values = [(d.date.to_pydatetime(), d.region, d.risk) for d in data]
-                if len(data) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(data) > 1)
-                assert inserted == len(data), 'MySql insertion error: inserted less entities than provided'
+            sql = RegionRisk.SCHEMA.insert_sql()
+            return insert_rows(sql, data.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
 
     def get_most_recent_timestamp(self) -> pd.Timestamp:
         # In principle, the query returns [name, date], which is transformed into a dictionary {name: date}
@@ -275,14 +481,30 @@ class RegionRiskMySqlDao(RegionRiskDao):
         return response["PAT"] if "PAT" in response else None
 
     def get_by_date(self, date_from=None, date_to=None) -> List[RegionRisk]:
-        date_from, date_to = validate_dates(date_from, date_to)
-        str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
-        str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
-        db = MySqlDB()
-        sql = f'select * from RegionRisk where date between "{str_date_from}" and "{str_date_to}"'
-        with db.connect():
-            result = db.read(sql)
-        return [RegionRisk(i[0], i[1], i[2]) for i in result]
+        return read_records(date_range_query(RegionRisk.SCHEMA, date_from, date_to), RegionRisk)
+
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[RegionRisk]]:
+        sql = date_range_query(RegionRisk.SCHEMA, date_from, date_to)
+        yield from iter_rows(sql, RegionRisk, chunk_size=chunk_size)
+
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        return read_df(date_range_query(RegionRisk.SCHEMA, date_from, date_to), RegionRisk)
+
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        sql = date_range_query(RegionRisk.SCHEMA, date_from, date_to)
+        yield from iter_df(sql, RegionRisk, chunk_size=chunk_size)
+
+
+class RegionRiskLocalDao(LocalDao, RegionRiskDao):
+    model = RegionRisk
+    batch_class = RegionRiskBatch
+    UNIQUE_KEY = RegionRisk.SCHEMA.unique_key
+
+    def get_most_recent_timestamp(self) -> pd.Timestamp:
+        # Only the Timestamp for "PAT" is returned (None if there are no records)
+        return super().get_most_recent_timestamp(filters=[("region", "=", "PAT")])
 
 
 class HolidayDao(ABC):
@@ -290,7 +512,7 @@ class HolidayDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, data: Holiday or List[Holiday]):
+    def save(self, data: Holiday or List[Holiday] or HolidayBatch, upsert=False):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
         pass
@@ -305,24 +527,34 @@ class HolidayDao(ABC):
         # Read in date range
         pass
 
+    @abstractmethod
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[Holiday]]:
+        # Read in date range, yielding lists of at most chunk_size instances
+        pass
+
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as Holiday.to_df)
+        pass
+
+    @abstractmethod
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        # Read in date range, yielding DataFrames of at most chunk_size rows
+        pass
+
 
 class HolidayMySqlDao(HolidayDao):
+    UNIQUE_KEY = Holiday.SCHEMA.unique_key
 
-    def save(self, data: Holiday or List[Holiday]):
+    def save(self, data: Holiday or List[Holiday] or HolidayBatch, upsert=False):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
-        if isinstance(data, Holiday):
-            data = [data]
-        assert isinstance(data, list)
+        data = HolidayBatch.coerce(data)
         if len(data) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into Holiday (holiday, start, end) values (%s, %s, %s)"
-                values = [(d.holiday, d.start.to_pydatetime(), d.end.to_pydatetime()) for d in data]
-                if len(data) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(data) > 1)
-                assert inserted == len(data), 'MySql insertion error: inserted less entities than provided'
+            sql = Holiday.SCHEMA.insert_sql()
+            return insert_rows(sql, data.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
 
     def get_most_recent_timestamp(self) -> pd.Timestamp:
         db = MySqlDB()
@@ -332,14 +564,26 @@ class HolidayMySqlDao(HolidayDao):
         return Timestamp(result[0][0]) if result[0][0] is not None else None
 
     def get_by_date(self, date_from=None, date_to=None) -> List[Holiday]:
-        date_from, date_to = validate_dates(date_from, date_to)
-        str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
-        str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
-        db = MySqlDB()
-        sql = f'select * from Holiday where start between "{str_date_from}" and "{str_date_to}"'
-        with db.connect():
-            result = db.read(sql)
-        return [Holiday(i[0], i[1], i[2]) for i in result]
+        return read_records(date_range_query(Holiday.SCHEMA, date_from, date_to), Holiday)
+
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[Holiday]]:
+        sql = date_range_query(Holiday.SCHEMA, date_from, date_to)
+        yield from iter_rows(sql, Holiday, chunk_size=chunk_size)
+
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        return read_df(date_range_query(Holiday.SCHEMA, date_from, date_to), Holiday)
+
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        sql = date_range_query(Holiday.SCHEMA, date_from, date_to)
+        yield from iter_df(sql, Holiday, chunk_size=chunk_size)
+
+
+class HolidayLocalDao(LocalDao, HolidayDao):
+    model = Holiday
+    batch_class = HolidayBatch
+    UNIQUE_KEY = Holiday.SCHEMA.unique_key
 
 
 class VaccinesDeliveryDataDao(ABC):
@@ -347,7 +591,7 @@ class VaccinesDeliveryDataDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, data: VaccinesDeliveryData or List[VaccinesDeliveryData]):
+    def save(self, data: VaccinesDeliveryData or List[VaccinesDeliveryData] or VaccinesDeliveryDataBatch):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
         pass
@@ -362,22 +606,31 @@ class VaccinesDeliveryDataDao(ABC):
         # Read in date range
         pass
 
+    @abstractmethod
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[VaccinesDeliveryData]]:
+        # Read in date range, yielding lists of at most chunk_size instances
+        pass
+
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as VaccinesDeliveryData.to_df)
+        pass
+
+    @abstractmethod
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        # Read in date range, yielding DataFrames of at most chunk_size rows
+        pass
+
 
 class VaccinesDeliveryDataMySqlDao(VaccinesDeliveryDataDao):
 
-    def save(self, data: VaccinesDeliveryData or List[VaccinesDeliveryData]):
-        if isinstance(data, VaccinesDeliveryData):
-            data = [data]
-        assert isinstance(data, list)
+    def save(self, data: VaccinesDeliveryData or List[VaccinesDeliveryData] or VaccinesDeliveryDataBatch):
+        data = VaccinesDeliveryDataBatch.coerce(data)
         if len(data) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into VaccinesDeliveryData (date, region, supplier, n_doses) values (%s, %s, %s, %s)"
-                values = [(d.date.to_pydatetime(), d.region, d.supplier, d.n_doses) for d in data]
-                if len(data) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(data) > 1)
-                assert inserted == len(data), 'MySql insertion error: inserted less entities than provided'
+            sql = VaccinesDeliveryData.SCHEMA.insert_sql()
+            return insert_rows(sql, data.rows())
 
     def get_most_recent_timestamp(self) -> pd.Timestamp:
 
@@ -396,14 +649,33 @@ class VaccinesDeliveryDataMySqlDao(VaccinesDeliveryDataDao):
         return response["PAT"] if "PAT" in response else None
 
     def get_by_date(self, date_from=None, date_to=None) -> List[VaccinesDeliveryData]:
-        date_from, date_to = validate_dates(date_from, date_to)
-        str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
-        str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
-        db = MySqlDB()
-        sql = f'select * from VaccinesDeliveryData where date between "{str_date_from}" and "{str_date_to}"'
-        with db.connect():
-            result = db.read(sql)
-        return [VaccinesDeliveryData(i[0], i[1], i[2], i[3]) for i in result]
+        return read_records(date_range_query(VaccinesDeliveryData.SCHEMA, date_from, date_to), VaccinesDeliveryData)
+
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[VaccinesDeliveryData]]:
+        sql = date_range_query(VaccinesDeliveryData.SCHEMA, date_from, date_to)
+        yield from iter_rows(sql, VaccinesDeliveryData, chunk_size=chunk_size)
+
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        return read_df(date_range_query(VaccinesDeliveryData.SCHEMA, date_from, date_to), VaccinesDeliveryData)
+
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        sql = date_range_query(VaccinesDeliveryData.SCHEMA, date_from, date_to)
+        yield from iter_df(sql, VaccinesDeliveryData, chunk_size=chunk_size)
+
+
+class VaccinesDeliveryDataLocalDao(LocalDao, VaccinesDeliveryDataDao):
+    # No unique key: records are appended, as in the MySQL table
+    model = VaccinesDeliveryData
+    batch_class = VaccinesDeliveryDataBatch
+
+    def save(self, data: VaccinesDeliveryData or List[VaccinesDeliveryData] or VaccinesDeliveryDataBatch):
+        return super().save(data)
+
+    def get_most_recent_timestamp(self) -> pd.Timestamp:
+        # Only the Timestamp for "PAT" is returned (None if there are no records)
+        return super().get_most_recent_timestamp(filters=[("region", "=", "PAT")])
 
 
 class VaccinesAdministrationDataDao(ABC):
@@ -411,7 +683,8 @@ class VaccinesAdministrationDataDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, data: VaccinesAdministrationData or List[VaccinesAdministrationData]):
+    def save(self, data: VaccinesAdministrationData or List[VaccinesAdministrationData]
+             or VaccinesAdministrationDataBatch, upsert=False):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
         pass
@@ -426,24 +699,33 @@ class VaccinesAdministrationDataDao(ABC):
         # Read in date range
         pass
 
+    @abstractmethod
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[VaccinesAdministrationData]]:
+        # Read in date range, yielding lists of at most chunk_size instances
+        pass
+
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as VaccinesAdministrationData.to_df)
+        pass
+
+    @abstractmethod
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        # Read in date range, yielding DataFrames of at most chunk_size rows
+        pass
+
 
 class VaccinesAdministrationDataMySqlDao(VaccinesAdministrationDataDao):
+    UNIQUE_KEY = VaccinesAdministrationData.SCHEMA.unique_key
 
-    def save(self, data: VaccinesAdministrationData or List[VaccinesAdministrationData]):
-        if isinstance(data, VaccinesAdministrationData):
-            data = [data]
-        assert isinstance(data, list)
+    def save(self, data: VaccinesAdministrationData or List[VaccinesAdministrationData]
+             or VaccinesAdministrationDataBatch, upsert=False):
+        data = VaccinesAdministrationDataBatch.coerce(data)
         if len(data) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into VaccinesAdministrationData (date, region, supplier, age_group, male,  female, " \
-                      + "first_dose, second_dose) values (%s, %s, %s, %s, %s, %s, %s, %s)"
-                values = [(d.date.to_pydatetime(), d.region, d.supplier, d.age_group, d.male, d.female, d.first_dose,
-                           d.second_dose) for d in data]
-                if len(data) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(data) > 1)
-                assert inserted == len(data), 'MySql insertion error: inserted less entities than provided'
+            sql = VaccinesAdministrationData.SCHEMA.insert_sql()
+            return insert_rows(sql, data.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
 
     def get_most_recent_timestamp(self) -> pd.Timestamp:
         # In principle, the query returns [region, date], which is transformed into a dictionary {name: date}
@@ -461,15 +743,32 @@ class VaccinesAdministrationDataMySqlDao(VaccinesAdministrationDataDao):
         return response["PAT"] if "PAT" in response else None
 
     def get_by_date(self, date_from=None, date_to=None) -> List[VaccinesAdministrationData]:
-        date_from, date_to = validate_dates(date_from, date_to)
-        str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
-        str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
-        db = MySqlDB()
-        sql = f'select * from VaccinesAdministrationData where date between "{str_date_from}" and "{str_date_to}"'
-        with db.connect():
-            result = db.read(sql)
-        return [VaccinesAdministrationData(i[0], i[1], i[2], i[3], i[4],
-                                           i[5], i[6], i[7]) for i in result]
+        sql = date_range_query(VaccinesAdministrationData.SCHEMA, date_from, date_to)
+        return read_records(sql, VaccinesAdministrationData)
+
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[VaccinesAdministrationData]]:
+        sql = date_range_query(VaccinesAdministrationData.SCHEMA, date_from, date_to)
+        yield from iter_rows(sql, VaccinesAdministrationData, chunk_size=chunk_size)
+
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        sql = date_range_query(VaccinesAdministrationData.SCHEMA, date_from, date_to)
+        return read_df(sql, VaccinesAdministrationData)
+
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        sql = date_range_query(VaccinesAdministrationData.SCHEMA, date_from, date_to)
+        yield from iter_df(sql, VaccinesAdministrationData, chunk_size=chunk_size)
+
+
+class VaccinesAdministrationDataLocalDao(LocalDao, VaccinesAdministrationDataDao):
+    model = VaccinesAdministrationData
+    batch_class = VaccinesAdministrationDataBatch
+    UNIQUE_KEY = VaccinesAdministrationData.SCHEMA.unique_key
+
+    def get_most_recent_timestamp(self) -> pd.Timestamp:
+        # Only the Timestamp for "PAT" is returned (None if there are no records)
+        return super().get_most_recent_timestamp(filters=[("region", "=", "PAT")])
 
 
 class WeatherStationDao(ABC):
@@ -478,7 +777,7 @@ class WeatherStationDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, s: WeatherStation or List[WeatherStation]):
+    def save(self, s: WeatherStation or List[WeatherStation] or WeatherStationBatch, upsert=False):
         # Inserts station or list of stations
         pass
 
@@ -490,36 +789,36 @@ class WeatherStationDao(ABC):
 
 
 class WeatherStationMySqlDao(WeatherStationDao):
-    def save(self, s: WeatherStation or List[WeatherStation]):
-        if isinstance(s, WeatherStation):
-            s = [s]
-        assert isinstance(s, list)
+    UNIQUE_KEY = WeatherStation.SCHEMA.unique_key
+    def save(self, s: WeatherStation or List[WeatherStation] or WeatherStationBatch, upsert=False):
+        s = WeatherStationBatch.coerce(s)
         if len(s) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into WeatherStation (station_id, name, lat, lon, elev, n_sensors, " \
-                      + "precipitation_available, temperature_available, humidity_available, " \
-                      + "wind_speed_available, atmospheric_pressure_available, solar_rad_available) " \
-                      + "values (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
-                values = [(d.station_id, d.name, d.lat, d.lon, d.elev, d.n_sensors,
-                           d.precipitation_available, d.temperature_available, d.humidity_available,
-                           d.wind_speed_available, d.atmospheric_pressure_available, d.solar_rad_available) for d in s]
-                if len(s) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(s) > 1)
-                assert inserted == len(s), 'MySql insertion error: inserted less entities than provided'
+            sql = WeatherStation.SCHEMA.insert_sql()
+            status = insert_rows(sql, s.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
+            reference_cache.invalidate(WeatherStation.SCHEMA.name)
+            return status
 
+    @cached_reference(WeatherStation.SCHEMA.name, MunicipalityWeatherStationLink.SCHEMA.name)
     def read_linked_stations(self) -> List[WeatherStation]:
         # Return a list of stations currently linked to municipalities
         # Actually joins WeatherStation and MunicipalityWeatherStationLink
 
-        db = MySqlDB()
-        sql = "select * from WeatherStation WS inner join MunicipalityWeatherStationLink MWSL " \
+        columns = ", ".join(f"WS.{c}" for c in WeatherStation.SCHEMA.names)
+        sql = f"select {columns} from WeatherStation WS inner join MunicipalityWeatherStationLink MWSL " \
               + "on WS.station_id = MWSL.station_id"
-        with db.connect():
-            result = db.read(sql)
-        return [WeatherStation(i[0], i[1], i[2], i[3], i[4],
-                               i[5], i[6], i[7], i[8], i[9], i[10], i[11], i[12]) for i in result]
+        return read_records(sql, WeatherStation)
+
+
+class WeatherStationLocalDao(LocalDao, WeatherStationDao):
+    model = WeatherStation
+    batch_class = WeatherStationBatch
+    UNIQUE_KEY = WeatherStation.SCHEMA.unique_key
+
+    def read_linked_stations(self) -> List[WeatherStation]:
+        # Inner join of WeatherStation and MunicipalityWeatherStationLink on station_id
+        links = self.store.read(MunicipalityWeatherStationLink.SCHEMA, columns=["station_id"])
+        stations = self.read_all_df().merge(links, on="station_id", how="inner")
+        return WeatherStationBatch.from_df(stations).to_records()
 
 
 class MunicipalityWeatherStationLinkDao(ABC):
@@ -528,26 +827,37 @@ class MunicipalityWeatherStationLinkDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, l: MunicipalityWeatherStationLink or List[MunicipalityWeatherStationLink]):
+    def save(self, l: MunicipalityWeatherStationLink or List[MunicipalityWeatherStationLink]
+             or MunicipalityWeatherStationLinkBatch, upsert=False):
         # Insert link or list of links
         pass
 
+    @abstractmethod
+    def read_all_df(self) -> pd.DataFrame:
+        # Return all the links as a DataFrame (columns of MunicipalityWeatherStationLink.to_df)
+        pass
+
 
 class MunicipalityWeatherStationLinkMySqlDao(MunicipalityWeatherStationLinkDao):
-    def save(self, l: MunicipalityWeatherStationLink or List[MunicipalityWeatherStationLink]):
-        if isinstance(l, MunicipalityWeatherStationLink):
-            l = [l]
-        assert isinstance(l, list)
+    UNIQUE_KEY = MunicipalityWeatherStationLink.SCHEMA.unique_key
+    def save(self, l: MunicipalityWeatherStationLink or List[MunicipalityWeatherStationLink]
+             or MunicipalityWeatherStationLinkBatch, upsert=False):
+        l = MunicipalityWeatherStationLinkBatch.coerce(l)
         if len(l) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into MunicipalityWeatherStationLink (municipality_code, station_id) " \
-                      + "values (%s, %s)"
-                values = [(d.municipality_code, d.station_id) for d in l]
-                if len(l) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(l) > 1)
-                assert inserted == len(l), 'MySql insertion error: inserted less entities than provided'
+            sql = MunicipalityWeatherStationLink.SCHEMA.insert_sql()
+            status = insert_rows(sql, l.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
+            reference_cache.invalidate(MunicipalityWeatherStationLink.SCHEMA.name)
+            return status
+
+    @cached_reference(MunicipalityWeatherStationLink.SCHEMA.name)
+    def read_all_df(self) -> pd.DataFrame:
+        return read_df(MunicipalityWeatherStationLink.SCHEMA.select_sql(), MunicipalityWeatherStationLink)
+
+
+class MunicipalityWeatherStationLinkLocalDao(LocalDao, MunicipalityWeatherStationLinkDao):
+    model = MunicipalityWeatherStationLink
+    batch_class = MunicipalityWeatherStationLinkBatch
+    UNIQUE_KEY = MunicipalityWeatherStationLink.SCHEMA.unique_key
 
 
 class WeatherDataDao(ABC):
@@ -556,7 +866,7 @@ class WeatherDataDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, d: WeatherData or List[WeatherData]):
+    def save(self, d: WeatherData or List[WeatherData] or WeatherDataBatch, upsert=False):
         # Inserts data
         pass
 
@@ -566,30 +876,45 @@ class WeatherDataDao(ABC):
         pass
 
     @abstractmethod
-    def get_average_values(self, date_from=None, date_to=None) -> List[WeatherData]:
-        # Return average temperature from currently linked stations
+    def get_most_recent_timestamps(self) -> dict:
+        # Most recent timestamp of data for each station, as {station_id: Timestamp} (stations without data are missing)
+        pass
+
+    @abstractmethod
+    def get_by_date(self, date_from=None, date_to=None) -> List[WeatherData]:
+        # Read data of all stations in date range
+        pass
+
+    @abstractmethod
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[WeatherData]]:
+        # Read data of all stations in date range, yielding lists of at most chunk_size instances
+        pass
+
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read data of all stations in date range as a DataFrame (same columns as WeatherData.to_df)
+        pass
+
+    @abstractmethod
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        # Read data of all stations in date range, yielding DataFrames of at most chunk_size rows
+        pass
+
+    @abstractmethod
+    def get_average_values(self, date_from=None, date_to=None) -> List[DailyWeather]:
+        # Return average values from currently linked stations (see DailyWeatherDao)
         pass
 
 
 class WeatherDataMySqlDao(WeatherDataDao):
-    def save(self, data: WeatherData or List[WeatherData]):
-        if isinstance(data, WeatherData):
-            data = [data]
-        assert isinstance(data, list)
+    UNIQUE_KEY = WeatherData.SCHEMA.unique_key
+    def save(self, data: WeatherData or List[WeatherData] or WeatherDataBatch, upsert=False):
+        data = WeatherDataBatch.coerce(data)
         if len(data) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into WeatherData (station_id, date, " \
-                      + "precipitation_total, temperature_mean, humidity_mean, " \
-                      + "wind_speed_mean, atmospheric_pressure_mean, solar_rad_total) " \
-                      + "values (%s, %s, %s, %s, %s, %s, %s, %s)"
-                values = [(d.station_id, d.date.to_pydatetime(), d.precipitation_total,
-                           d.temperature_mean, d.humidity_mean, d.wind_speed_mean,
-                           d.atmospheric_pressure_mean, d.solar_rad_total) for d in data]
-                if len(data) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(data) > 1)
-                assert inserted == len(data), 'MySql insertion error: inserted less entities than provided'
+            sql = WeatherData.SCHEMA.insert_sql()
+            return insert_rows(sql, data.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
 
     def get_most_recent_timestamp(self, station_id: str) -> Timestamp:
         db = MySqlDB()
@@ -598,36 +923,223 @@ class WeatherDataMySqlDao(WeatherDataDao):
             result = db.read(sql)
         return Timestamp(result[0][0]) if result[0][0] is not None else None
 
-    def get_average_values(self, date_from=None, date_to=None) -> List[WeatherData]:
-        # Return average temperature from currently linked stations
+    def get_most_recent_timestamps(self) -> dict:
+        # A single query, resolved on the (station_id, date) unique key
+        db = MySqlDB()
+        sql = "select station_id, max(date) from WeatherData group by station_id"
+        with db.connect():
+            result = db.read(sql)
+        return dict((t[0], Timestamp(t[1])) for t in result)
+
+    def get_by_date(self, date_from=None, date_to=None) -> List[WeatherData]:
+        return read_records(date_range_query(WeatherData.SCHEMA, date_from, date_to), WeatherData)
+
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[WeatherData]]:
+        sql = date_range_query(WeatherData.SCHEMA, date_from, date_to)
+        yield from iter_rows(sql, WeatherData, chunk_size=chunk_size)
+
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        return read_df(date_range_query(WeatherData.SCHEMA, date_from, date_to), WeatherData)
+
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        sql = date_range_query(WeatherData.SCHEMA, date_from, date_to)
+        yield from iter_df(sql, WeatherData, chunk_size=chunk_size)
+
+    def get_average_values(self, date_from=None, date_to=None) -> List[DailyWeather]:
+        # Read from the daily aggregate, maintained by the weather data updater (issue #26)
+        return DailyWeatherMySqlDao().get_by_date(date_from, date_to)
+
+
+class WeatherDataLocalDao(LocalDao, WeatherDataDao):
+    model = WeatherData
+    batch_class = WeatherDataBatch
+    UNIQUE_KEY = WeatherData.SCHEMA.unique_key
+
+    def get_most_recent_timestamp(self, station_id: str) -> Timestamp:
+        return super().get_most_recent_timestamp(filters=[("station_id", "=", station_id)])
+
+    def get_most_recent_timestamps(self) -> dict:
+        return self.store.max_dates(WeatherData.SCHEMA, group="station_id")
+
+    def get_average_values(self, date_from=None, date_to=None) -> List[DailyWeather]:
+        return DailyWeatherLocalDao(self.store.path).get_by_date(date_from, date_to)
+
+
+class DailyWeatherDao(ABC):
+    # Materialized daily aggregate of WeatherData over the stations linked to municipalities, so that readers (e.g.
+    # data curation) run a range query on one row per day instead of aggregating the whole WeatherData table
+
+    def __init__(self):
+        pass
+
+    @abstractmethod
+    def refresh(self, date_from=None):
+        # Recompute the aggregate of the days from date_from (all the days if None) from WeatherData, e.g. after new
+        # data have been saved (from their first date) or links have changed (all the days)
+        pass
+
+    @abstractmethod
+    def get_most_recent_timestamp(self) -> pd.Timestamp:
+        # Return latest date (as pd.Timestamp)
+        pass
 
-        # issue #26
+    @abstractmethod
+    def get_by_date(self, date_from=None, date_to=None) -> List[DailyWeather]:
+        # Read in date range
+        pass
 
-        # date_from, date_to = validate_dates(date_from, date_to)
-        # str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
-        # str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
-        # db = MySqlDB()
-        # sql = f'select date, avg(precipitation_total), avg(temperature_mean), avg(humidity_mean), avg(wind_speed_mean), ' \
-        #       f'avg(atmospheric_pressure_mean), avg(solar_rad_total) ' \
-        #       f'from WeatherData where station_id in (select station_id from MunicipalityWeatherStationLink) ' \
-        #       f"and date between "
-        # {str_date_from}
-        # " and "
-        # {str_date_to}
-        # " group by date'
-        # with db.connect():
-        #     result = db.read(sql)
-        # return [StringencyIndex(i[0], i[1]) for i in result]
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as DailyWeather.to_df)
         pass
 
 
+class DailyWeatherMySqlDao(DailyWeatherDao):
+
+    def refresh(self, date_from=None):
+        # The days are aggregated by the server with a single insert ... select (resolved on the date index of
+        # WeatherData) and replace the previous rows in the same transaction
+        where = f'where WD.date >= "{Timestamp(date_from).strftime("%Y-%m-%d")}"' if date_from is not None else ""
+        aggregates = ", ".join(f"avg(WD.{q}), count(WD.{q})" for q in WEATHER_QUANTITIES)
+        sql = f"insert into DailyWeather ({', '.join(DailyWeather.SCHEMA.names)}) " \
+              f"select WD.date, count(*), {aggregates} from WeatherData WD " \
+              f"inner join (select distinct station_id from MunicipalityWeatherStationLink) L " \
+              f"on WD.station_id = L.station_id {where} group by WD.date"
+        db = MySqlDB()
+        with db.connect():
+            db.execute_query(f"delete from DailyWeather {where.replace('WD.', '')}")
+            db.execute_query(sql)
+            return {"inserted": db.cursor.rowcount}
+
+    def get_most_recent_timestamp(self) -> pd.Timestamp:
+        db = MySqlDB()
+        with db.connect():
+            result = db.read("select max(date) from DailyWeather")
+        return Timestamp(result[0][0]) if result[0][0] is not None else None
+
+    def get_by_date(self, date_from=None, date_to=None) -> List[DailyWeather]:
+        return read_records(date_range_query(DailyWeather.SCHEMA, date_from, date_to), DailyWeather)
+
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        return read_df(date_range_query(DailyWeather.SCHEMA, date_from, date_to), DailyWeather)
+
+
+class DailyWeatherLocalDao(LocalDao, DailyWeatherDao):
+    model = DailyWeather
+    batch_class = DailyWeatherBatch
+
+    def refresh(self, date_from=None):
+        # Data of the linked stations only (the aggregate of a day is recomputed from all its records)
+        links = self.store.read(MunicipalityWeatherStationLink.SCHEMA, columns=["station_id"]).drop_duplicates()
+        df = self.store.read(WeatherData.SCHEMA, date_from=date_from).merge(links, on="station_id", how="inner")
+        fields = dict((q, WeatherData.SCHEMA.field(q)) for q in WEATHER_QUANTITIES)
+        grouped = df.groupby("date", sort=True)
+        columns = {"n_stations": grouped.size()}
+        for q, field in fields.items():
+            columns[q] = grouped[field].mean()
+            columns[f"{q}_count"] = grouped[field].count()
+        aggregate = pd.DataFrame(columns).reset_index(drop=False)
+
+        if date_from is None:
+            self.store.clear(DailyWeather.SCHEMA)
+        else:
+            previous = self.store.read(DailyWeather.SCHEMA, date_from=date_from, columns=["date"])
+            self.store.delete(DailyWeather.SCHEMA, "date", list(previous["date"]))
+        return self.save(self.batch_class.from_df(aggregate))
+
+
+class WeightedWeatherDao(ABC):
+    # Materialized population-weighted weather of each province and day (see station_weights.StationWeights), so that
+    # readers (e.g. data curation) run a range query instead of reading the records of all the stations
+
+    def __init__(self):
+        pass
+
+    @abstractmethod
+    def refresh(self, weights, date_from=None):
+        # Recompute the days from date_from (all the days if None) from WeatherData with weights (StationWeights),
+        # e.g. after new data have been saved (from their first date) or weights have changed (all the days)
+        pass
+
+    @abstractmethod
+    def get_most_recent_timestamp(self) -> pd.Timestamp:
+        # Return latest date (as pd.Timestamp)
+        pass
+
+    @abstractmethod
+    def get_by_date(self, province, date_from=None, date_to=None) -> List[WeightedWeather]:
+        # Read in date range
+        pass
+
+    @abstractmethod
+    def get_by_date_df(self, province, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as WeightedWeather.to_df)
+        pass
+
+
+class WeightedWeatherMySqlDao(WeightedWeatherDao):
+
+    def refresh(self, weights, date_from=None):
+        # The records of the days from date_from are weighted in memory and replace the previous rows of those days in
+        # a single transaction
+        df = read_df(date_range_query(WeatherData.SCHEMA, date_from), WeatherData)
+        data = WeightedWeatherBatch.from_df(weights.load().table(df))
+        where = f'where date >= "{Timestamp(date_from).strftime("%Y-%m-%d")}"' if date_from is not None else ""
+        db = MySqlDB()
+        with db.connect():
+            db.execute_query(f"delete from WeightedWeather {where}")
+            return db.bulk_insert(WeightedWeather.SCHEMA.insert_sql(), data.rows())
+
+    def get_most_recent_timestamp(self) -> pd.Timestamp:
+        db = MySqlDB()
+        with db.connect():
+            result = db.read("select max(date) from WeightedWeather")
+        return Timestamp(result[0][0]) if result[0][0] is not None else None
+
+    def query(self, province, date_from=None, date_to=None) -> str:
+        date_from, date_to = validate_dates(date_from, date_to)
+        return WeightedWeather.SCHEMA.select_sql(
+            where=f'province = "{province}" and date between "{Timestamp(date_from).strftime("%Y-%m-%d")}" '
+                  f'and "{Timestamp(date_to).strftime("%Y-%m-%d")}"')
+
+    def get_by_date(self, province, date_from=None, date_to=None) -> List[WeightedWeather]:
+        return read_records(self.query(province, date_from, date_to), WeightedWeather)
+
+    def get_by_date_df(self, province, date_from=None, date_to=None) -> pd.DataFrame:
+        return read_df(self.query(province, date_from, date_to), WeightedWeather)
+
+
+class WeightedWeatherLocalDao(LocalDao, WeightedWeatherDao):
+    model = WeightedWeather
+    batch_class = WeightedWeatherBatch
+
+    def refresh(self, weights, date_from=None):
+        df = self.store.read(WeatherData.SCHEMA, date_from=date_from)
+        data = WeightedWeatherBatch.from_df(weights.load().table(df))
+        if date_from is None:
+            self.store.clear(WeightedWeather.SCHEMA)
+        else:
+            previous = self.store.read(WeightedWeather.SCHEMA, date_from=date_from, columns=["date"])
+            self.store.delete(WeightedWeather.SCHEMA, "date", list(previous["date"].unique()))
+        return self.save(data)
+
+    def get_by_date(self, province, date_from=None, date_to=None) -> List[WeightedWeather]:
+        return WeightedWeatherBatch.from_df(self.get_by_date_df(province, date_from, date_to)).to_records()
+
+    def get_by_date_df(self, province, date_from=None, date_to=None) -> pd.DataFrame:
+        date_from, date_to = validate_dates(date_from, date_to)
+        return self.store.read(WeightedWeather.SCHEMA, date_from, date_to, filters=[("province", "=", province)])
+
+
 class StringencyIndexDao(ABC):
 
     def __init__(self):
         pass
 
     @abstractmethod
-    def save(self, data: StringencyIndex or List[StringencyIndex]):
+    def save(self, data: StringencyIndex or List[StringencyIndex] or StringencyIndexBatch, upsert=False):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
         pass
@@ -642,24 +1154,34 @@ class StringencyIndexDao(ABC):
         # Read in date range
         pass
 
+    @abstractmethod
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[StringencyIndex]]:
+        # Read in date range, yielding lists of at most chunk_size instances
+        pass
+
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as StringencyIndex.to_df)
+        pass
+
+    @abstractmethod
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        # Read in date range, yielding DataFrames of at most chunk_size rows
+        pass
+
 
 class StringencyIndexMySqlDao(StringencyIndexDao):
+    UNIQUE_KEY = StringencyIndex.SCHEMA.unique_key
 
-    def save(self, data: StringencyIndex or List[StringencyIndex]):
+    def save(self, data: StringencyIndex or List[StringencyIndex] or StringencyIndexBatch, upsert=False):
         # Insert data: single instance or list of instances
         # Inserts new data if not exists
-        if isinstance(data, StringencyIndex):
-            data = [data]
-        assert isinstance(data, list)
+        data = StringencyIndexBatch.coerce(data)
         if len(data) > 0:
-            db = MySqlDB()
-            with db.connect():
-                sql = "insert into StringencyIndex (date, value) values (%s, %s)"
-                values = [(d.date.to_pydatetime(), d.value) for d in data]
-                if len(data) == 1:
-                    values = values[0]
-                inserted = db.insert(sql=sql, values=values, many=len(data) > 1)
-                assert inserted == len(data), 'MySql insertion error: inserted less entities than provided'
+            sql = StringencyIndex.SCHEMA.insert_sql()
+            return insert_rows(sql, data.rows(), upsert_keys=self.UNIQUE_KEY if upsert else None)
 
     def get_most_recent_timestamp(self) -> pd.Timestamp:
         db = MySqlDB()
@@ -669,14 +1191,95 @@ class StringencyIndexMySqlDao(StringencyIndexDao):
         return Timestamp(result[0][0]) if result[0][0] is not None else None
 
     def get_by_date(self, date_from=None, date_to=None) -> List[StringencyIndex]:
-        date_from, date_to = validate_dates(date_from, date_to)
-        str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
-        str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
+        return read_records(date_range_query(StringencyIndex.SCHEMA, date_from, date_to), StringencyIndex)
+
+    def iter_by_date(self, date_from=None, date_to=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[List[StringencyIndex]]:
+        sql = date_range_query(StringencyIndex.SCHEMA, date_from, date_to)
+        yield from iter_rows(sql, StringencyIndex, chunk_size=chunk_size)
+
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        return read_df(date_range_query(StringencyIndex.SCHEMA, date_from, date_to), StringencyIndex)
+
+    def iter_by_date_df(self, date_from=None, date_to=None,
+                        chunk_size=DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        sql = date_range_query(StringencyIndex.SCHEMA, date_from, date_to)
+        yield from iter_df(sql, StringencyIndex, chunk_size=chunk_size)
+
+
+class StringencyIndexLocalDao(LocalDao, StringencyIndexDao):
+    model = StringencyIndex
+    batch_class = StringencyIndexBatch
+    UNIQUE_KEY = StringencyIndex.SCHEMA.unique_key
+
+
+class WatermarkDao(ABC):
+    # Watermarks (most recent dates) of the entities collected by the updaters, read for all the entities at once
+    # (e.g. at the start of the data update pipeline) instead of one query per updater and station.
+    # Entities and the column their watermarks are grouped by (None: one watermark for the entity)
+    GROUPS = {
+        ProvinceData.SCHEMA.name: "name",
+        MunicipalityData.SCHEMA.name: None,
+        RegionRisk.SCHEMA.name: "region",
+        Holiday.SCHEMA.name: None,
+        VaccinesAdministrationData.SCHEMA.name: "region",
+        VaccinesDeliveryData.SCHEMA.name: "region",
+        StringencyIndex.SCHEMA.name: None,
+        WeatherData.SCHEMA.name: "station_id",
+    }
+    SCHEMAS = dict((s.name, s) for s in [ProvinceData.SCHEMA, MunicipalityData.SCHEMA, RegionRisk.SCHEMA,
+                                         Holiday.SCHEMA, VaccinesAdministrationData.SCHEMA,
+                                         VaccinesDeliveryData.SCHEMA, StringencyIndex.SCHEMA, WeatherData.SCHEMA])
+
+    def __init__(self):
+        pass
+
+    @abstractmethod
+    def get_watermarks(self, entities: Optional[List[str]] = None) -> dict:
+        # {entity: {group value: Timestamp}} for the entities (all the entities of GROUPS by default). Ungrouped
+        # entities have the key None; groups (and entities) without records have no watermark.
+        pass
+
+
+class WatermarkMySqlDao(WatermarkDao):
+
+    def get_watermarks(self, entities: Optional[List[str]] = None) -> dict:
+        # One round trip: a union of one grouped max(date) query per entity, each resolved on the date indexes
+        entities = entities if entities is not None else list(self.GROUPS)
+        queries = []
+        for entity in entities:
+            assert entity in self.GROUPS, f"No watermark for entity {entity}"
+            schema, group = self.SCHEMAS[entity], self.GROUPS[entity]
+            if group is None:
+                queries.append(f"select '{entity}', null, max({schema.date_column}) from {schema.table}")
+            else:
+                queries.append(f"select '{entity}', {group}, max({schema.date_column}) from {schema.table} "
+                               f"group by {group}")
+
+        watermarks = dict((entity, {}) for entity in entities)
+        if len(queries) == 0:
+            return watermarks
         db = MySqlDB()
-        sql = f'select * from StringencyIndex where date between "{str_date_from}" and "{str_date_to}"'
         with db.connect():
-            result = db.read(sql)
-        return [StringencyIndex(i[0], i[1]) for i in result]
+            result = db.read(" union all ".join(queries))
+        for entity, key, date in result:
+            if date is not None:
+                watermarks[entity][key] = Timestamp(date)
+        return watermarks
+
+
+class WatermarkLocalDao(WatermarkDao):
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.store = ParquetStore(path)
+
+    def get_watermarks(self, entities: Optional[List[str]] = None) -> dict:
+        entities = entities if entities is not None else list(self.GROUPS)
+        for entity in entities:
+            assert entity in self.GROUPS, f"No watermark for entity {entity}"
+        return dict((entity, self.store.max_dates(self.SCHEMAS[entity], group=self.GROUPS[entity]))
+                    for entity in entities)
 
 
 class CuratedDataDao(ABC):
@@ -685,7 +1288,7 @@ class CuratedDataDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, data: List[CuratedData]):
+    def save(self, data: CuratedData or List[CuratedData] or CuratedDataBatch, upsert=False):
         # Insert list of instances
         # Inserts new data if not exists
         pass
@@ -700,6 +1303,17 @@ class CuratedDataDao(ABC):
         # Read in date range
         pass
 
+    @abstractmethod
+    def get_by_date_df(self, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as CuratedData.to_df)
+        pass
+
+    @abstractmethod
+    def get_version(self) -> tuple:
+        # (latest date, number of records, writes): changes whenever records are added or the data are reprocessed.
+        # writes changes at each save and clear, so that records replaced in place change the version too
+        pass
+
     @abstractmethod
     def clear(self):
         # Delete all records
@@ -707,39 +1321,112 @@ class CuratedDataDao(ABC):
 
 
 class CuratedDataMongoDao(CuratedDataDao):
+    # Number of saves and clears of each collection, in documents {"_id": <collection>, "writes": <count>}
+    VERSIONS_COLLECTION = "DataVersion"
 
     def __init__(self):
         super().__init__()
         self.client = MongoDB()
-        self.collection = "curated"
+        self.collection = CuratedData.SCHEMA.collection
+
+    def count_write(self):
+        self.client.update(dbconfig.MONGODB_DEFAULT_DB, self.VERSIONS_COLLECTION, {"_id": self.collection},
+                           {"$inc": {"writes": 1}}, only_one=True, upsert=True)
 
-    def save(self, data: List[CuratedData]):
-        assert isinstance(data, list)
+    def save(self, data: CuratedData or List[CuratedData] or CuratedDataBatch, upsert=False):
+        data = CuratedDataBatch.coerce(data)
         if len(data) > 0:
-            status = self.client.insert(dbconfig.MONGODB_DEFAULT_DB, self.collection, CuratedData.to_repr(data))
-            assert status["inserted"] == len(data), "Not all records have been inserted"
+            if upsert:
+                # Records with the same date are replaced
+                status = self.client.upsert(dbconfig.MONGODB_DEFAULT_DB, self.collection, data.to_repr(),
+                                            key=["date"])
+                processed = status["inserted"] + status["updated"] + status["unchanged"]
+                assert processed == len(data), "Not all records have been inserted"
+            else:
+                status = self.client.insert(dbconfig.MONGODB_DEFAULT_DB, self.collection, data.to_repr())
+                assert status["inserted"] == len(data), "Not all records have been inserted"
+            self.count_write()
+            return status
 
     def get_most_recent_record(self) -> List[CuratedData]:
-        res = self.client.find(dbconfig.MONGODB_DEFAULT_DB, self.collection, {}, orderby=("date", -1), limit=10)
-        if len(res) > 0:
-            record = res[0]
-            del record["_id"]
-            data = CuratedData.from_repr([record])
-            return data
-        else:
-            return []
+        res = self.client.find(dbconfig.MONGODB_DEFAULT_DB, self.collection, {},
+                               projection=CuratedData.SCHEMA.projection(), orderby=("date", -1), limit=1)
+        return CuratedData.from_repr(res)
 
     def get_by_date(self, date_from=None, date_to=None) -> List[CuratedData]:
         date_from, date_to = validate_dates(date_from, date_to)
-        str_date_from = Timestamp(date_from).strftime("%Y-%m-%d")
-        str_date_to = Timestamp(date_to).strftime("%Y-%m-%d")
-        records = self.client.find(dbconfig.MONGODB_DEFAULT_DB, self.collection,
-                                   {"date": {"$gte": Timestamp(date_from), "$lte": Timestamp(date_to)}}, limit=None)
-        data = CuratedData.from_repr(records)
+        data = []
+        for records in self.client.iter_batches(dbconfig.MONGODB_DEFAULT_DB, self.collection,
+                                                {"date": {"$gte": Timestamp(date_from), "$lte": Timestamp(date_to)}},
+                                                projection=CuratedData.SCHEMA.projection(), orderby=("date", 1)):
+            data.extend(CuratedData.from_repr(records))
         return data
 
+    def get_by_date_df(self, date_from=None, date_to=None, batch_size=DEFAULT_BATCH_SIZE) -> pd.DataFrame:
+        date_from, date_to = validate_dates(date_from, date_to)
+        return read_documents_df(self.client, self.collection,
+                                 {"date": {"$gte": Timestamp(date_from), "$lte": Timestamp(date_to)}}, CuratedData,
+                                 orderby=("date", 1), batch_size=batch_size)
+
+    def get_version(self) -> tuple:
+        # Three indexed queries: the count of the collection, the most recent date and the write counter
+        latest = self.client.find(dbconfig.MONGODB_DEFAULT_DB, self.collection, {}, projection={"_id": 0, "date": 1},
+                                  orderby=("date", -1), limit=1)
+        count = self.client.count_documents(dbconfig.MONGODB_DEFAULT_DB, self.collection, {})
+        writes = self.client.find(dbconfig.MONGODB_DEFAULT_DB, self.VERSIONS_COLLECTION, {"_id": self.collection},
+                                  limit=1)
+        return (Timestamp(latest[0]["date"]) if len(latest) > 0 else None), count, \
+            (writes[0]["writes"] if len(writes) > 0 else 0)
+
     def clear(self):
         self.client.delete(dbconfig.MONGODB_DEFAULT_DB, self.collection, {}, delete_all=True)
+        self.count_write()
+
+
+class CuratedDataLocalDao(LocalDao, CuratedDataDao):
+    model = CuratedData
+    batch_class = CuratedDataBatch
+
+    def get_most_recent_record(self) -> List[CuratedData]:
+        latest = self.store.max_date(CuratedData.SCHEMA)
+        if latest is None:
+            return []
+        return self.get_by_date(latest, latest)
+
+    def writes_path(self) -> str:
+        # Time of the last save or clear (in nanoseconds), which stands for the write counter of the MongoDB DAO
+        return os.path.join(self.store.path, f"{CuratedData.SCHEMA.name}.writes")
+
+    def count_write(self):
+        path = self.writes_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp_path, path)
+
+    def save(self, data, upsert=False):
+        status = super().save(data, upsert=upsert)
+        if status is not None:
+            self.count_write()
+        return status
+
+    def get_version(self) -> tuple:
+        try:
+            with open(self.writes_path()) as f:
+                writes = int(f.read())
+        except (OSError, ValueError):
+            writes = 0
+        return self.store.max_date(CuratedData.SCHEMA), self.store.count(CuratedData.SCHEMA), writes
+
+    def clear(self):
+        self.store.clear(CuratedData.SCHEMA)
+        self.count_write()
+
+
+def regressors_key(regressors: list) -> str:
+    # Normalized key of a set of regressors: the same for any order of the regressors (empty string if there are none)
+    return ",".join(sorted(set(regressors)))
 
 
 class HyperparameterTuningResultDao(ABC):
@@ -754,53 +1441,262 @@ class HyperparameterTuningResultDao(ABC):
         pass
 
     @abstractmethod
-    def get_most_recent_record(self, output_variable: str) -> HyperparameterTuningResult:
+    def get_most_recent_record(self, output_variable: str, regressors: Optional[List] = [],
+                               top_k: Optional[int] = 1) -> List[HyperparameterTuningResult]:
+        # Most recent tuning result for the output variable and the set of regressors, with the top_k results only
+        # (all results if top_k is None)
+        pass
+
+    @abstractmethod
+    def create_run(self, log: dict, configuration: dict) -> str:
+        # Start a tuning run whose results are saved while the search is running. Returns the id of the run.
+        pass
+
+    @abstractmethod
+    def save_scores(self, run_id: str, results: list):
+        # Save a batch of scored (not yet ranked) configurations of a run
+        pass
+
+    @abstractmethod
+    def complete_run(self, run_id: str, results: list, log: Optional[dict] = None):
+        # Store the ranking of the results (sorted best first) and mark the run as complete
         pass
 
 
 class HyperparameterTuningResultMongoDao(HyperparameterTuningResultDao):
+    # A tuning run is stored as a small header document (log, configuration, keys) in the hyperparameters collection
+    # and one document per scored configuration in the scores collection, so that the size of a run is not bounded by
+    # the document size limit and readers fetch the top_k results only.
+    # Headers are keyed by output variable and normalized set of regressors, so that the most recent run of a model is
+    # found by an index scan instead of reading all the documents. Score documents are indexed by run and rank.
+    INDEX = [("output_variable", 1), ("regressors_key", 1), ("log.timestamp", -1)]
+    SCORES_INDEX = [("run_id", 1), ("rank", 1)]
+    WRITE_BATCH_SIZE = 1000  # documents per bulk write
+    _indexed = False  # indexes created (and documents saved without keys migrated) in this process
 
     def __init__(self):
         super().__init__()
         self.client = MongoDB()
         self.collection = "hyperparameters"
+        self.scores_collection = "hyperparameter_scores"
+
+    @staticmethod
+    def key_fields(configuration: dict) -> dict:
+        return {"output_variable": configuration["outputs"][0],
+                "regressors_key": regressors_key(configuration["regressors"])}
+
+    @staticmethod
+    def score_document(run_id: str, result: dict, rank: Optional[int] = None) -> dict:
+        # Out-of-fold predictions are stored only once packed (see ml.model_selection.keep_predictions)
+        d = dict((k, v) for k, v in result.items()
+                 if k != "oof_predictions" or isinstance(v, bytes))
+        d.update({"_id": f"{run_id}:{result['index']}", "run_id": run_id})
+        if rank is not None:
+            d["rank"] = rank
+        return d
+
+    def ensure_indexes(self):
+        if HyperparameterTuningResultMongoDao._indexed:
+            return
+        # Add the key fields to documents saved before they were introduced (reading their configuration only)
+        legacy = self.client.find(dbconfig.MONGODB_DEFAULT_DB, self.collection, {"regressors_key": {"$exists": False}},
+                                  projection={"configuration": 1}, limit=None)
+        for d in legacy:
+            self.client.update(dbconfig.MONGODB_DEFAULT_DB, self.collection, {"_id": d["_id"]},
+                               {"$set": self.key_fields(d["configuration"])}, only_one=True)
+        self.client.create_index(dbconfig.MONGODB_DEFAULT_DB, self.collection, self.INDEX)
+        self.client.create_index(dbconfig.MONGODB_DEFAULT_DB, self.scores_collection, self.SCORES_INDEX)
+        HyperparameterTuningResultMongoDao._indexed = True
+
+    def create_run(self, log: dict, configuration: dict) -> str:
+        self.ensure_indexes()
+        run_id = uuid4().hex
+        header = dict(_id=run_id, log=log, configuration=configuration, complete=False, n_results=0,
+                      **self.key_fields(configuration))
+        status = self.client.insert(dbconfig.MONGODB_DEFAULT_DB, self.collection, header)
+        assert status["inserted"] == 1, "The tuning run has not been inserted"
+        return run_id
+
+    def save_scores(self, run_id: str, results: list, ranked: bool = False):
+        # ranked: results are sorted best first (the rank of each document is its position)
+        documents = [self.score_document(run_id, r, i if ranked else None) for i, r in enumerate(results)]
+        for start in range(0, len(documents), self.WRITE_BATCH_SIZE):
+            batch = documents[start:start + self.WRITE_BATCH_SIZE]
+            status = self.client.insert(dbconfig.MONGODB_DEFAULT_DB, self.scores_collection, batch)
+            assert status["inserted"] == len(batch), "Not all scores have been inserted"
+
+    def complete_run(self, run_id: str, results: list, log: Optional[dict] = None):
+        # Scores saved during the search are updated with their rank (and the measure they are ranked by, which can
+        # differ from the one scored, see ml.model_selection.rank_results) and the packed out-of-fold predictions
+        updates = []
+        for i, r in enumerate(results):
+            d = self.score_document(run_id, r, i)
+            updates.append(({"_id": d.pop("_id")}, {"$set": d}))
+        for start in range(0, len(updates), self.WRITE_BATCH_SIZE):
+            self.client.bulk_update(dbconfig.MONGODB_DEFAULT_DB, self.scores_collection,
+                                    updates[start:start + self.WRITE_BATCH_SIZE])
+        newvalues = {"complete": True, "n_results": len(results)}
+        if log is not None:
+            newvalues["log"] = log
+        self.client.update(dbconfig.MONGODB_DEFAULT_DB, self.collection, {"_id": run_id}, {"$set": newvalues},
+                           only_one=True)
 
     def save(self, data: HyperparameterTuningResult or List[HyperparameterTuningResult]):
+        # Complete runs at once (header and ranked scores). The run is marked as complete only after all its scores
+        # have been inserted, so that readers never get a run with part of its results (runs interrupted while saving
+        # stay incomplete and are skipped)
         if isinstance(data, HyperparameterTuningResult):
             data = [data]
         assert isinstance(data, list), "Input to save function is not a list"
-        if len(data) > 0:
-            status = self.client.insert(dbconfig.MONGODB_DEFAULT_DB, self.collection,
-                                        HyperparameterTuningResult.to_repr(data))
-            assert status["inserted"] == len(data), "Not all records have been inserted"
-
-    def get_most_recent_record(self, output_variable: str, regressors: Optional[List] = []) -> List[
-        HyperparameterTuningResult]:
-        # Get all records for variable and with non-empty regressors list (i.e. exog model)
-        res = self.client.find(dbconfig.MONGODB_DEFAULT_DB, self.collection,
-                               {},
-                               limit=None)
-
-        if len(res) == 0:
-            return []
-
-        # Find results for variable
-        filter1 = filter(lambda x: x["configuration"]["outputs"][0] == output_variable, res)
-
-        # Filter exog model
-        filter2 = filter(lambda x: set(x["configuration"]["regressors"]) == set(regressors), filter1)
-
-        res = list(filter2)
+        for htr in data:
+            run_id = self.create_run(htr.log, htr.configuration)
+            self.save_scores(run_id, [dict(r, index=r.get("index", i)) for i, r in enumerate(htr.results)],
+                             ranked=True)
+            self.client.update(dbconfig.MONGODB_DEFAULT_DB, self.collection, {"_id": run_id},
+                               {"$set": {"complete": True, "n_results": len(htr.results)}}, only_one=True)
+
+    def get_most_recent_record(self, output_variable: str, regressors: Optional[List] = [],
+                               top_k: Optional[int] = 1) -> List[HyperparameterTuningResult]:
+        self.ensure_indexes()
+        # Filter, sort and limit are served by the indexes; only the first top_k results are transferred.
+        # Runs still in progress are skipped.
+        query = {"output_variable": output_variable, "regressors_key": regressors_key(regressors),
+                 "complete": {"$ne": False}}
+        # Documents saved before the split embed the results
+        projection = {"log": 1, "configuration": 1, "results": 1 if top_k is None else {"$slice": top_k}}
+        res = self.client.find(dbconfig.MONGODB_DEFAULT_DB, self.collection, query, projection=projection,
+                               orderby=("log.timestamp", -1), limit=1)
+        for d in res:
+            run_id = d.pop("_id")
+            if "results" not in d:
+                rank = {"$exists": True} if top_k is None else {"$lt": top_k}
+                d["results"] = self.client.find(dbconfig.MONGODB_DEFAULT_DB, self.scores_collection,
+                                                {"run_id": run_id, "rank": rank},
+                                                projection={"_id": 0, "run_id": 0, "rank": 0},
+                                                orderby=("rank", 1), limit=None)
+        return HyperparameterTuningResult.from_repr(res)
+
+
+class HyperparameterTuningResultLocalDao(HyperparameterTuningResultDao):
+    # Runs are stored as in the MongoDB DAO, as a header (pickled: log, configuration, keys) and a table of scored
+    # configurations: Parquet files written in batches during the search, replaced by a single file sorted by rank
+    # when the run is completed, so that the top_k results are read from its first row group.
+    # Headers are kept in a folder per (output_variable, regressors_key), so that looking up the most recent run of a
+    # key only reads the headers of its runs.
+    # cfg and scores are stored as JSON strings, the packed out-of-fold predictions as binary values.
+    HEADERS = "hyperparameters"
+    SCORES = "hyperparameter_scores"
+    RANKED_FILE = "ranked.parquet"
+
+    def __init__(self, path: str = None):
+        super().__init__()
+        self.store = ParquetStore(path)
+
+    def key_folder(self, output_variable: str, regressors_key: str) -> str:
+        key = hashlib.sha1(f"{output_variable}|{regressors_key}".encode()).hexdigest()[:16]
+        return os.path.join(self.store.path, self.HEADERS, key)
+
+    def header_path(self, header: dict) -> str:
+        return os.path.join(self.key_folder(header["output_variable"], header["regressors_key"]),
+                            f"{header['_id']}.pkl")
+
+    def scores_path(self, run_id: str) -> str:
+        return os.path.join(self.store.path, self.SCORES, run_id)
+
+    def write_header(self, header: dict):
+        path = self.header_path(header)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(header, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def read_header_file(path: str) -> dict:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def read_header(self, run_id: str) -> dict:
+        paths = glob.glob(os.path.join(self.store.path, self.HEADERS, "*", f"{run_id}.pkl"))
+        assert len(paths) == 1, f"Unknown hyperparameter tuning run {run_id}"
+        return self.read_header_file(paths[0])
+
+    def move_legacy_headers(self):
+        # Headers saved before they were kept in a folder per key are moved once to the folder of their key
+        for path in glob.glob(os.path.join(self.store.path, self.HEADERS, "*.pkl")):
+            header = self.read_header_file(path)
+            self.write_header(header)
+            os.remove(path)
+
+    @staticmethod
+    def scores_df(results: list, ranked: bool = False) -> pd.DataFrame:
+        def to_json(x):
+            return json.dumps(x, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+
+        df = pd.DataFrame({"index": [r["index"] for r in results],
+                           "cfg": [to_json(r["cfg"]) for r in results],
+                           "score_mean": [r["score_mean"] for r in results],
+                           "score_se": [r["score_se"] for r in results],
+                           "scores": [to_json(r.get("scores", {})) for r in results],
+                           "oof_predictions": [r.get("oof_predictions") if isinstance(r.get("oof_predictions"), bytes)
+                                               else None for r in results]})
+        if ranked:
+            df.insert(0, "rank", np.arange(len(df)))
+        return df
+
+    def create_run(self, log: dict, configuration: dict) -> str:
+        run_id = uuid4().hex
+        self.write_header(dict(_id=run_id, log=log, configuration=configuration, complete=False, n_results=0,
+                               **HyperparameterTuningResultMongoDao.key_fields(configuration)))
+        return run_id
+
+    def save_scores(self, run_id: str, results: list):
+        if len(results) > 0:
+            n_parts = len(glob.glob(os.path.join(self.scores_path(run_id), "part-*.parquet")))
+            self.store.write_file(self.scores_df(results),
+                                  os.path.join(self.scores_path(run_id), f"part-{n_parts:05d}.parquet"))
+
+    def complete_run(self, run_id: str, results: list, log: Optional[dict] = None):
+        # The ranked results replace the batches saved during the search
+        self.store.write_file(self.scores_df(results, ranked=True),
+                              os.path.join(self.scores_path(run_id), self.RANKED_FILE))
+        for path in glob.glob(os.path.join(self.scores_path(run_id), "part-*.parquet")):
+            os.remove(path)
+        header = self.read_header(run_id)
+        header.update({"complete": True, "n_results": len(results)})
+        if log is not None:
+            header["log"] = log
+        self.write_header(header)
 
-        if len(res) == 0:
+    def save(self, data: HyperparameterTuningResult or List[HyperparameterTuningResult]):
+        if isinstance(data, HyperparameterTuningResult):
+            data = [data]
+        assert isinstance(data, list), "Input to save function is not a list"
+        for htr in data:
+            run_id = self.create_run(htr.log, htr.configuration)
+            self.complete_run(run_id, [dict(r, index=r.get("index", i)) for i, r in enumerate(htr.results)])
+
+    def get_most_recent_record(self, output_variable: str, regressors: Optional[List] = [],
+                               top_k: Optional[int] = 1) -> List[HyperparameterTuningResult]:
+        self.move_legacy_headers()
+        key = {"output_variable": output_variable, "regressors_key": regressors_key(regressors)}
+        headers = [self.read_header_file(p)
+                   for p in glob.glob(os.path.join(self.key_folder(**key), "*.pkl"))]
+        headers = [h for h in headers if h["complete"] and all(h[k] == v for k, v in key.items())]
+        if len(headers) == 0:
             return []
+        header = max(headers, key=lambda h: h["log"]["timestamp"])
 
-        # Find most recent
-        res.sort(key=lambda x: x["log"]["timestamp"], reverse=True)
-        record = res[0]
-
-        data = HyperparameterTuningResult.from_repr([record])
-        return data
+        filters = None if top_k is None else [("rank", "<", top_k)]
+        df = self.store.read_file(os.path.join(self.scores_path(header["_id"]), self.RANKED_FILE), filters=filters)
+        results = []
+        for r in df.sort_values("rank").to_dict(orient="records"):
+            result = {"index": int(r["index"]), "cfg": json.loads(r["cfg"]), "score_mean": r["score_mean"],
+                      "score_se": r["score_se"], "scores": json.loads(r["scores"])}
+            if r["oof_predictions"] is not None:
+                result["oof_predictions"] = r["oof_predictions"]
+            results.append(result)
+        return [HyperparameterTuningResult(header["log"], header["configuration"], results)]
 
 
 class ForecastDao(ABC):
@@ -809,7 +1705,7 @@ class ForecastDao(ABC):
         pass
 
     @abstractmethod
-    def save(self, data: List[Forecast]):
+    def save(self, data: Forecast or List[Forecast] or ForecastBatch):
         # Insert list of instances
         # Inserts new data if not exists
         pass
@@ -819,23 +1715,27 @@ class ForecastDao(ABC):
         # Read in date range
         pass
 
+    @abstractmethod
+    def get_by_date_df(self, variable, date_from=None, date_to=None) -> pd.DataFrame:
+        # Read in date range as a DataFrame (same columns as Forecast.to_df)
+        pass
+
 
 class ForecastMongoDao(ForecastDao):
 
     def __init__(self):
         super().__init__()
         self.client = MongoDB()
-        self.collection = "forecasts"
+        self.collection = Forecast.SCHEMA.collection
 
-    def save(self, data: List[Forecast]):
-        assert isinstance(data, list)
-        out_variables = [d.output_variable for d in data]
-        out_variables_unique = list(np.unique(out_variables))
+    def save(self, data: Forecast or List[Forecast] or ForecastBatch):
+        data = ForecastBatch.coerce(data)
+        out_variables_unique = list(np.unique(data.columns["output_variable"]))
         if len(data) > 0:
             for v in out_variables_unique:
                 self.client.delete(dbconfig.MONGODB_DEFAULT_DB, self.collection, query={"output_variable": v},
                                    only_one=False)
-            status = self.client.insert(dbconfig.MONGODB_DEFAULT_DB, self.collection, Forecast.to_repr(data))
+            status = self.client.insert(dbconfig.MONGODB_DEFAULT_DB, self.collection, data.to_repr())
             assert status["inserted"] == len(data), "Not all records have been inserted"
 
     def get_by_date(self, variable, date_from=None, date_to=None) -> List[Forecast]:
@@ -847,3 +1747,27 @@ class ForecastMongoDao(ForecastDao):
                                     "output_variable": variable}, limit=None)
         data = Forecast.from_repr(records)
         return data
+
+    def get_by_date_df(self, variable, date_from=None, date_to=None) -> pd.DataFrame:
+        date_from, date_to = validate_dates(date_from, date_to)
+        return read_documents_df(self.client, self.collection,
+                                 {"date": {"$gte": Timestamp(date_from), "$lte": Timestamp(date_to)},
+                                  "output_variable": variable}, Forecast, orderby=("date", 1))
+
+
+class ForecastLocalDao(LocalDao, ForecastDao):
+    model = Forecast
+    batch_class = ForecastBatch
+
+    def save(self, data: Forecast or List[Forecast] or ForecastBatch):
+        # Previous forecasts of the output variables in data are replaced
+        data = ForecastBatch.coerce(data)
+        if len(data) > 0:
+            return self.store.replace(Forecast.SCHEMA, data.to_df(), "output_variable")
+
+    def get_by_date(self, variable, date_from=None, date_to=None) -> List[Forecast]:
+        return ForecastBatch.from_df(self.get_by_date_df(variable, date_from, date_to)).to_records()
+
+    def get_by_date_df(self, variable, date_from=None, date_to=None) -> pd.DataFrame:
+        date_from, date_to = validate_dates(date_from, date_to)
+        return self.store.read(Forecast.SCHEMA, date_from, date_to, filters=[("output_variable", "=", variable)])
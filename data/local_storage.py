@@ -0,0 +1,232 @@
+import os
+import time
+import glob
+import shutil
+import threading
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas import Timestamp
+
+from configuration import dbconfig
+from .schema import Schema
+
+PARTITION_PREFIX = "month="  # partitions of entities with a date column: one directory per month (e.g. month=2021-03)
+DATA_FILE = "data.parquet"
+ROW_GROUP_SIZE = 10000  # rows per row group, the unit of streaming reads
+
+
+class ParquetStore:
+    # Embedded columnar storage on Parquet files (pyarrow), used by the "local" storage option of the DAOs.
+    # Each entity is stored in a directory named after its schema, with the columns of model.to_df. Entities with a
+    # date column are partitioned by month, so that date range queries only open the partitions overlapping the range.
+    # Files are memory-mapped when read, and rewritten atomically (one file per partition) when data are saved.
+
+    def __init__(self, path: str = None):
+        self.path = path if path is not None else dbconfig.LOCAL_STORAGE_PATH
+
+    def dataset_path(self, schema: Schema) -> str:
+        return os.path.join(self.path, schema.name)
+
+    def partition_path(self, schema: Schema, month: str = None) -> str:
+        if schema.date_column is None:
+            return os.path.join(self.dataset_path(schema), DATA_FILE)
+        return os.path.join(self.dataset_path(schema), PARTITION_PREFIX + month, DATA_FILE)
+
+    def partitions(self, schema: Schema, date_from=None, date_to=None) -> List[str]:
+        # Existing files of the entity overlapping the date range (all files if no date is given), in date order
+        if schema.date_column is None:
+            path = self.partition_path(schema)
+            return [path] if os.path.isfile(path) else []
+        paths = sorted(glob.glob(os.path.join(self.dataset_path(schema), PARTITION_PREFIX + "*", DATA_FILE)))
+        month_from = Timestamp(date_from).strftime("%Y-%m") if date_from is not None else None
+        month_to = Timestamp(date_to).strftime("%Y-%m") if date_to is not None else None
+        out = []
+        for p in paths:
+            month = os.path.basename(os.path.dirname(p))[len(PARTITION_PREFIX):]
+            if (month_from is None or month >= month_from) and (month_to is None or month <= month_to):
+                out.append(p)
+        return out
+
+    @staticmethod
+    def date_filters(schema: Schema, date_from=None, date_to=None) -> Optional[list]:
+        filters = []
+        if date_from is not None:
+            filters.append((schema.field(schema.date_column), ">=", Timestamp(date_from)))
+        if date_to is not None:
+            filters.append((schema.field(schema.date_column), "<=", Timestamp(date_to)))
+        return filters if len(filters) > 0 else None
+
+    @staticmethod
+    def read_file(path: str, columns: List[str] = None, filters: list = None) -> pd.DataFrame:
+        # pyarrow is imported only when the local storage is used
+        import pyarrow.parquet as pq
+
+        # Columns added to the schema after the file was written are read as missing values
+        missing = [c for c in columns if c not in pq.read_schema(path, memory_map=True).names] \
+            if columns is not None else []
+        table = pq.read_table(path, columns=[c for c in columns if c not in missing] if len(missing) > 0 else columns,
+                              filters=filters, memory_map=True)
+        df = table.to_pandas()
+        for c in missing:
+            df[c] = np.nan
+        return df[columns] if len(missing) > 0 else df
+
+    def read(self, schema: Schema, date_from=None, date_to=None, columns: List[str] = None,
+             filters: list = None) -> pd.DataFrame:
+        # Records in the date range (all records if no date is given), with the given columns (all the columns of the
+        # schema by default). filters: additional pyarrow filters, e.g. [("station_id", "=", "T0001")]
+        columns = columns if columns is not None else schema.fields
+        date_filters = self.date_filters(schema, date_from, date_to) if schema.date_column is not None else None
+        filters = (date_filters or []) + (filters or []) or None
+        frames = [self.read_file(p, columns=columns, filters=filters)
+                  for p in self.partitions(schema, date_from, date_to)]
+        frames = [f for f in frames if len(f) > 0]
+        if len(frames) == 0:
+            return self.empty(schema, columns)
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def iter_read(self, schema: Schema, date_from=None, date_to=None,
+                  chunk_size: int = ROW_GROUP_SIZE) -> Iterator[pd.DataFrame]:
+        # Records in the date range as DataFrames of at most chunk_size rows. Files are read one batch of rows at a
+        # time, so at most one batch is held in memory.
+        import pyarrow.parquet as pq
+
+        for path in self.partitions(schema, date_from, date_to):
+            parquet_file = pq.ParquetFile(path, memory_map=True)
+            for record_batch in parquet_file.iter_batches(batch_size=chunk_size, columns=schema.fields):
+                df = record_batch.to_pandas()
+                if schema.date_column is not None:
+                    dates = df[schema.field(schema.date_column)]
+                    mask = np.ones(len(df), dtype=bool)
+                    if date_from is not None:
+                        mask &= (dates >= Timestamp(date_from)).to_numpy()
+                    if date_to is not None:
+                        mask &= (dates <= Timestamp(date_to)).to_numpy()
+                    if not mask.all():
+                        df = df[mask].reset_index(drop=True)
+                if len(df) > 0:
+                    yield df
+
+    def max_date(self, schema: Schema, filters: list = None) -> Optional[Timestamp]:
+        # Most recent date of the records matching filters (None if there are none). Partitions are scanned from the
+        # most recent one, reading the date column (and the filtered columns) only.
+        field = schema.field(schema.date_column)
+        columns = [field] + [f[0] for f in (filters or []) if f[0] != field]
+        for path in reversed(self.partitions(schema)):
+            df = self.read_file(path, columns=columns, filters=filters)
+            if len(df) > 0:
+                return Timestamp(df[field].max())
+        return None
+
+    def max_dates(self, schema: Schema, group: str = None) -> dict:
+        # Most recent date of the records for each value of the group column ({None: date} if group is None, {} if
+        # there are no records), reading the date and group columns only
+        field = schema.field(schema.date_column)
+        df = self.read(schema, columns=[field] + ([group] if group is not None else []))
+        if len(df) == 0:
+            return {}
+        if group is None:
+            return {None: Timestamp(df[field].max())}
+        return dict((k, Timestamp(v)) for k, v in df.groupby(group, sort=False)[field].max().items())
+
+    def count(self, schema: Schema) -> int:
+        # Number of records of the entity, from the metadata of the files (no data are read)
+        import pyarrow.parquet as pq
+
+        return sum(pq.ParquetFile(p, memory_map=True).metadata.num_rows for p in self.partitions(schema))
+
+    def write(self, schema: Schema, df: pd.DataFrame, upsert: bool = False) -> dict:
+        # Save the records of df (columns of model.to_df). Records whose unique key already exists are replaced if
+        # upsert, otherwise they are rejected (as the unique key of a MySQL table). Returns the insertion status, as
+        # MySqlDB.bulk_insert (statements are the files written).
+        t0 = time.perf_counter()
+        status = {"inserted": 0, "statements": 0}
+        if upsert:
+            status.update({"updated": 0, "unchanged": 0})
+
+        if schema.date_column is None:
+            groups = [(None, df)]
+        else:
+            months = pd.DatetimeIndex(df[schema.field(schema.date_column)]).strftime("%Y-%m")
+            groups = df.groupby(np.asarray(months), sort=True)
+
+        key = [schema.field(c) for c in schema.unique_key] if schema.unique_key is not None else None
+        for month, new in groups:
+            path = self.partition_path(schema, month)
+            old = self.read_file(path) if os.path.isfile(path) else self.empty(schema)
+            merged, counts = merge_records(old, new.reset_index(drop=True), key, upsert)
+            for k, v in counts.items():
+                status[k] += v
+            self.write_file(merged, path)
+            status["statements"] += 1
+
+        status["seconds"] = time.perf_counter() - t0
+        rows = len(df) if upsert else status["inserted"]
+        status["rows_per_second"] = rows / status["seconds"] if status["seconds"] > 0 else None
+        return status
+
+    def replace(self, schema: Schema, df: pd.DataFrame, field: str):
+        # Delete the records with the values of field that appear in df, then save df (e.g. all the forecasts of the
+        # output variables in df)
+        self.delete(schema, field, list(pd.unique(df[field])))
+        return self.write(schema, df)
+
+    def delete(self, schema: Schema, field: str, values: list):
+        # Delete the records whose field is in values
+        for path in self.partitions(schema):
+            df = self.read_file(path)
+            keep = ~df[field].isin(values).to_numpy()
+            if not keep.all():
+                self.write_file(df[keep].reset_index(drop=True), path)
+
+    def clear(self, schema: Schema):
+        # Delete all the records of the entity
+        shutil.rmtree(self.dataset_path(schema), ignore_errors=True)
+
+    @staticmethod
+    def write_file(df: pd.DataFrame, path: str):
+        # The file is replaced atomically: readers see either the previous or the new content. The temporary file is
+        # named after the process and the thread, so that concurrent writers of the same file do not share it
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def empty(schema: Schema, columns: List[str] = None) -> pd.DataFrame:
+        dtypes = schema.dtypes
+        columns = columns if columns is not None else schema.fields
+        return pd.DataFrame(dict((c, pd.Series([], dtype=dtypes[c])) for c in columns), columns=columns)
+
+
+def merge_records(old: pd.DataFrame, new: pd.DataFrame, key: Optional[List[str]], upsert: bool):
+    # Records of old and new, new records replacing the old ones with the same key (if upsert). Returns the merged
+    # records, sorted by key, and the counts of inserted, updated and unchanged records.
+    if key is None:
+        return pd.concat([old, new], ignore_index=True), {"inserted": len(new)}
+
+    assert not new.duplicated(key).any(), "Duplicated unique key in the records to save"
+    index_old = pd.MultiIndex.from_frame(old[key])
+    index_new = pd.MultiIndex.from_frame(new[key])
+    existing = index_new.isin(index_old)
+    assert upsert or not existing.any(), f"Duplicate entry for key {key}"
+
+    counts = {"inserted": int((~existing).sum())}
+    if upsert:
+        replaced = index_old.isin(index_new)
+        joined = new[existing].merge(old[replaced], on=key, how="left", suffixes=("", "_previous"))
+        changed = np.zeros(len(joined), dtype=bool)
+        for c in new.columns.difference(key):
+            current, previous = joined[c].to_numpy(), joined[c + "_previous"].to_numpy()
+            changed |= ~((current == previous) | (pd.isna(current) & pd.isna(previous)))
+        counts.update({"updated": int(changed.sum()), "unchanged": int((~changed).sum())})
+        old = old[~replaced]
+
+    merged = pd.concat([old, new], ignore_index=True) if len(old) > 0 else new
+    return merged.sort_values(key, ignore_index=True), counts
+
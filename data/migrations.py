@@ -0,0 +1,154 @@
+import os
+import re
+from itertools import zip_longest
+from typing import List, Tuple
+
+from pandas import Timestamp, DateOffset, date_range
+
+from .mysql_wrapper import MySqlDB, TABLES_INIT_SCRIPT
+from .schema import SCHEMAS
+
+# Schema migrations: SQL scripts named <version>_<description>.sql (e.g. 001_composite_indexes.sql), applied in version
+# order after init_tables.sql. Applied versions are recorded in the table MIGRATIONS_TABLE, so that each script runs
+# once on each database. Indexes created by migrations are named with the prefix INDEX_PREFIX.
+MIGRATIONS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql_scripts", "migrations")
+MIGRATIONS_TABLE = "SchemaMigration"
+INDEX_PREFIX = "ix_"
+TABLES_INIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), TABLES_INIT_SCRIPT)
+
+# MySQL types of the DDL scripts written differently from the column types of schema.py
+DDL_TYPE_ALIASES = {"boolean": "bool", "integer": "int"}
+
+# Optional monthly range partitioning of the largest time-series tables (table: date column)
+PARTITIONED_TABLES = {"WeatherData": "date", "VaccinesAdministrationData": "date"}
+PARTITION_MONTHS_AHEAD = 3  # empty partitions created after the current month
+MAX_PARTITION = "pmax"  # catch-all partition for dates after the last month
+
+
+def available_migrations() -> List[Tuple[int, str]]:
+    # (version, path) of the migration scripts, in version order
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_FOLDER):
+        match = re.match(r"^(\d+)_\w+\.sql$", filename)
+        if match is not None:
+            migrations.append((int(match.group(1)), os.path.join(MIGRATIONS_FOLDER, filename)))
+    versions = [v for v, _ in migrations]
+    assert len(set(versions)) == len(versions), "Duplicated migration versions"
+    return sorted(migrations)
+
+
+def applied_migrations(db: MySqlDB) -> set:
+    db.execute_query(f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (`version` int not null, "
+                     f"`name` varchar(200) not null, `applied_at` timestamp default current_timestamp, "
+                     f"PRIMARY KEY (`version`))")
+    return set(v[0] for v in db.read(f"select version from {MIGRATIONS_TABLE}"))
+
+
+def migrate(db: MySqlDB, target: int = None) -> List[str]:
+    # Apply the migrations not yet applied, up to version target (all of them if None). Returns the names of the
+    # applied scripts. Each migration is recorded as soon as it has been applied (DDL statements are not
+    # transactional in MySQL), so that a failed migration is retried, and the previous ones are not, at the next run.
+    # Scripts that would create tables differing from the schemas (see check_schemas) are not applied.
+    mismatches = check_schemas()
+    assert len(mismatches) == 0, "DDL scripts do not match the schemas:\n" + "\n".join(mismatches)
+    applied = applied_migrations(db)
+    names = []
+    for version, path in available_migrations():
+        if version in applied or (target is not None and version > target):
+            continue
+        name = os.path.basename(path)
+        print(f"Applying migration {name}")
+        db.execute_script(path)
+        db.execute_query(f"insert into {MIGRATIONS_TABLE} (version, name) values ({version}, '{name}')")
+        db.conn.commit()
+        names.append(name)
+    return names
+
+
+def ddl_columns(paths: List[str] = None) -> dict:
+    # Columns of the tables created by the DDL scripts (by default init_tables.sql, then the migrations in version
+    # order): table -> [(column, type)], types without length (e.g. varchar for varchar(100)). Columns are read from
+    # the CREATE TABLE statements and from ALTER TABLE ... ADD COLUMN statements.
+    paths = paths if paths is not None else [TABLES_INIT_PATH] + [path for _, path in available_migrations()]
+    tables = {}
+    for path in paths:
+        with open(path, "r") as f:
+            script = f.read()
+        for table, body in re.findall(r"CREATE TABLE IF NOT EXISTS (\w+)\s*\((.*?)\);", script, flags=re.S):
+            tables[table] = [(c, t.lower()) for c, t in re.findall(r"^\s*`(\w+)`\s+(\w+)", body, flags=re.M)]
+        for table, column, type in re.findall(r"ALTER TABLE (\w+)\s+ADD COLUMN `(\w+)`\s+(\w+)", script):
+            tables.setdefault(table, []).append((column, type.lower()))
+    return dict((table, [(c, DDL_TYPE_ALIASES.get(t, t)) for c, t in columns]) for table, columns in tables.items())
+
+
+def check_schemas(paths: List[str] = None) -> List[str]:
+    # Differences between the MySQL tables of the registered schemas (see schema.py) and the DDL scripts: the columns
+    # of each table must have the names, order and types of the schema. Returns a description of each difference
+    # (empty if they match).
+    tables = ddl_columns(paths)
+    mismatches = []
+    for schema in SCHEMAS.values():
+        if schema.table is None:
+            continue
+        if schema.table not in tables:
+            mismatches.append(f"{schema.table}: no CREATE TABLE statement")
+            continue
+        expected = [(c.name, c.type) for c in schema.columns]
+        if tables[schema.table] != expected:
+            # Columns differing in name or type at the same position
+            differences = [f"{a[0] if a else '-'} {a[1] if a else ''} (DDL) != {b[0] if b else '-'} {b[1] if b else ''}"
+                           for a, b in zip_longest(tables[schema.table], expected) if a != b]
+            mismatches.append(f"{schema.table}: {'; '.join(differences)}")
+    return mismatches
+
+
+def foreign_keys(db: MySqlDB, table: str) -> List[str]:
+    return [r[0] for r in db.read("select constraint_name from information_schema.referential_constraints "
+                                  f"where constraint_schema = database() and table_name = '{table}'")]
+
+
+def partition_names(db: MySqlDB, table: str) -> List[str]:
+    # Partitions of the table, in order (empty if the table is not partitioned)
+    return [r[0] for r in db.read("select partition_name from information_schema.partitions "
+                                  f"where table_schema = database() and table_name = '{table}' "
+                                  "and partition_name is not null order by partition_ordinal_position")]
+
+
+def month_partitions(months) -> str:
+    # One partition for each month (with the dates before the first day of the next month), then MAX_PARTITION
+    clauses = [f"PARTITION p{m.strftime('%Y%m')} VALUES LESS THAN "
+               f"(UNIX_TIMESTAMP('{(m + DateOffset(months=1)).strftime('%Y-%m-%d')}'))" for m in months]
+    clauses.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    return ", ".join(clauses)
+
+
+def partition_monthly(db: MySqlDB, table: str, months_ahead: int = PARTITION_MONTHS_AHEAD,
+                      date_column: str = None) -> int:
+    # Partition the table by month of its date column (by default the one in PARTITIONED_TABLES), from the month of
+    # the oldest record to months_ahead months after the current one. If the table is already partitioned, the months
+    # after the last partition are split from MAX_PARTITION: run it periodically (e.g. with the migrations) to keep
+    # partitions ahead of the data.
+    # MySQL does not support foreign keys on partitioned tables: those of the table are dropped. Returns the number of
+    # partitions created.
+    date_column = date_column if date_column is not None else PARTITIONED_TABLES.get(table)
+    assert date_column is not None, f"Monthly partitioning is not planned for table {table}"
+    month_to = Timestamp("now").to_period("M").to_timestamp() + DateOffset(months=months_ahead)
+
+    existing = partition_names(db, table)
+    if len(existing) == 0:
+        oldest = db.read(f"select min({date_column}) from {table}")[0][0]
+        month_from = Timestamp(oldest).to_period("M").to_timestamp() if oldest is not None else \
+            Timestamp("now").to_period("M").to_timestamp()
+        months = date_range(month_from, max(month_from, month_to), freq="MS")
+        for fk in foreign_keys(db, table):
+            print(f"Dropping foreign key {fk} of {table}")
+            db.execute_query(f"ALTER TABLE {table} DROP FOREIGN KEY {fk}")
+        db.execute_query(f"ALTER TABLE {table} PARTITION BY RANGE (UNIX_TIMESTAMP({date_column})) "
+                         f"({month_partitions(months)})")
+    else:
+        last = Timestamp(max(p for p in existing if p != MAX_PARTITION)[1:] + "01")
+        months = date_range(last + DateOffset(months=1), month_to, freq="MS")
+        if len(months) > 0:
+            db.execute_query(f"ALTER TABLE {table} REORGANIZE PARTITION {MAX_PARTITION} INTO "
+                             f"({month_partitions(months)})")
+    return len(months)
@@ -1,11 +1,70 @@
 from __future__ import absolute_import, annotations
 
+import inspect
+
 import pandas as pd
 from numpy import isnan
 from typing import Optional, List
 
+from . import schema
+
+# SCHEMA of each class: declarative definition of the entity (see schema.py). DTYPES: columns of the DataFrame returned
+# by to_df and their dtypes, in the same order as the columns of the corresponding table. DAOs use them to build
+# DataFrames directly from query results (see get_by_date_df).
+
+
+def nan_to_none(value):
+    return None if value is None or isnan(value) else value
+
+
+class Model:
+    # Base of the models with a SCHEMA: from_repr, to_repr, from_df and to_df are generated from its columns. Model
+    # attributes (the arguments of the constructor, in the same order) are the column names, the keys of the
+    # dictionaries and the columns of the DataFrames are the column fields.
+    # CONVERTERS: column name --> function applied by from_repr to the values read. Constructor arguments with a default
+    # may be missing from the dictionaries (e.g. documents saved before the column was added to the schema).
+    SCHEMA = None
+    DTYPES = None
+    CONVERTERS = {}
+    _reads = None  # (name, field, converter, optional) of each column, read by from_repr
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        parameters = list(inspect.signature(cls.__init__).parameters.values())[1:]
+        assert [p.name for p in parameters] == cls.SCHEMA.names, f"{cls.__name__}: constructor does not match SCHEMA"
+        assert set(cls.CONVERTERS) <= set(cls.SCHEMA.names), f"{cls.__name__}: converters of unknown columns"
+        cls._reads = [(c.name, c.field, cls.CONVERTERS.get(c.name), p.default is not p.empty)
+                      for c, p in zip(cls.SCHEMA.columns, parameters)]
+
+    @classmethod
+    def from_repr(cls, lst_dict: list) -> list:
+        out = []
+        for d in lst_dict:
+            kwargs = {}
+            for name, field, converter, optional in cls._reads:
+                value = d.get(field) if optional else d[field]
+                kwargs[name] = converter(value) if converter is not None else value
+            out.append(cls(**kwargs))
+        return out
+
+    @classmethod
+    def to_repr(cls, lst: list) -> list:
+        columns = [(c.name, c.field) for c in cls.SCHEMA.columns]
+        return [dict((field, getattr(instance, name)) for name, field in columns) for instance in lst]
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> list:
+        return cls.from_repr(df.to_dict(orient="records"))
+
+    @classmethod
+    def to_df(cls, lst: list) -> pd.DataFrame:
+        return pd.DataFrame(cls.to_repr(lst))
+
+
+class Municipality(Model):
 
-class Municipality:
+    SCHEMA = schema.MUNICIPALITY
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, code: int, name: str, province: str, lat: float, lon: float, population: int):
         self.code = code  # pk
@@ -15,44 +74,11 @@ class Municipality:
         self.lon = lon
         self.population = population  # Loaded one-time and might be updatable later
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[Municipality]:
-        out = []
-        for d in lst_dict:
-            out.append(Municipality(
-                d["code"],
-                d["name"],
-                d["province"],
-                d["lat"],
-                d["lon"],
-                d["population"]
-            ))
-        return out
 
-    @staticmethod
-    def to_repr(lst: List[Municipality]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "code": instance.code,
-                "name": instance.name,
-                "province": instance.province,
-                "lat": instance.lat,
-                "lon": instance.lon,
-                "population": instance.population
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[Municipality]:
-        return Municipality.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[Municipality]) -> pd.DataFrame:
-        return pd.DataFrame(Municipality.to_repr(lst))
+class MunicipalityData(Model):
 
-
-class MunicipalityData:
+    SCHEMA = schema.MUNICIPALITY_DATA
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, date: pd.Timestamp, code: int, cases: int, recovered: int, deaths: int, discharged: bool):
         self.date = date
@@ -62,82 +88,22 @@ class MunicipalityData:
         self.deaths = deaths
         self.discharged = discharged  # nullable
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[MunicipalityData]:
-        out = []
-        for d in lst_dict:
-            out.append(MunicipalityData(
-                d["date"],
-                d["code"],
-                d["cases"],
-                d["recovered"],
-                d["deaths"],
-                d["discharged"]
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[MunicipalityData]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "date": instance.date,
-                "code": instance.code,
-                "cases": instance.cases,
-                "recovered": instance.recovered,
-                "deaths": instance.deaths,
-                "discharged": instance.discharged
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[MunicipalityData]:
-        return MunicipalityData.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[MunicipalityData]) -> pd.DataFrame:
-        return pd.DataFrame(MunicipalityData.to_repr(lst))
 
+class Province(Model):
 
-class Province:
+    SCHEMA = schema.PROVINCE
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, name: int, code: int, population: int):
         self.name = name  # id
         self.code = code  # nullable
         self.population = population  # Loaded one-time and might be updatable later
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[Province]:
-        out = []
-        for d in lst_dict:
-            out.append(Province(
-                d["name"],
-                d["code"],
-                d["population"]
-            ))
-        return out
 
-    @staticmethod
-    def to_repr(lst: List[Province]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "name": instance.name,
-                "code": instance.code,
-                "population": instance.population
-            })
-        return out
+class ProvinceData(Model):
 
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[Province]:
-        return Province.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[Province]) -> pd.DataFrame:
-        return pd.DataFrame(Province.to_repr(lst))
-
-
-class ProvinceData:
+    SCHEMA = schema.PROVINCE_DATA
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, date: pd.Timestamp, name: str, cases: int, new_cases: int, active: int, recovered: int,
                  deaths: int, quarantined: int, hospitalized_infectious_diseases: int, hospitalized_high_intensity: int,
@@ -167,140 +133,36 @@ class ProvinceData:
         self.active_int_struct = active_int_struct
         self.active_rsa_total = active_rsa_total
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[ProvinceData]:
-        out = []
-        for d in lst_dict:
-            out.append(ProvinceData(
-                d["date"],
-                d["name"],
-                d["cases"],
-                d["new_cases"],
-                d["active"],
-                d["recovered"],
-                d["deaths"],
-                d["quarantined"],
-                d["hospitalized_infectious_diseases"],
-                d["hospitalized_high_intensity"],
-                d["hospitalized_intensive_care"],
-                d["discharged"],
-                d["active_rsa"],
-                d["active_nursing_homes"],
-                d["active_int_struct"],
-                d["active_rsa_total"]
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[ProvinceData]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "date": instance.date,
-                "name": instance.name,
-                "cases": instance.cases,
-                "new_cases": instance.new_cases,
-                "active": instance.active,
-                "recovered": instance.recovered,
-                "deaths": instance.deaths,
-                "quarantined": instance.quarantined,
-                "hospitalized_infectious_diseases": instance.hospitalized_infectious_diseases,
-                "hospitalized_high_intensity": instance.hospitalized_high_intensity,
-                "hospitalized_intensive_care": instance.hospitalized_intensive_care,
-                "discharged": instance.discharged,
-                "active_rsa": instance.active_rsa,
-                "active_nursing_homes": instance.active_nursing_homes,
-                "active_int_struct": instance.active_int_struct,
-                "active_rsa_total": instance.active_rsa_total
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[ProvinceData]:
-        return ProvinceData.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[ProvinceData]) -> pd.DataFrame:
-        return pd.DataFrame(ProvinceData.to_repr(lst))
 
+class RegionRisk(Model):
 
-class RegionRisk:
+    SCHEMA = schema.REGION_RISK
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, date: pd.Timestamp, region: str, risk: str):
         self.date = date
         self.region = region  # fk refereces Province(name)
         self.risk = risk
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[RegionRisk]:
-        out = []
-        for d in lst_dict:
-            out.append(RegionRisk(
-                d["date"],
-                d["region"],
-                d["risk"]
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[RegionRisk]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "date": instance.date,
-                "region": instance.region,
-                "risk": instance.risk
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[RegionRisk]:
-        return RegionRisk.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[RegionRisk]) -> pd.DataFrame:
-        return pd.DataFrame(RegionRisk.to_repr(lst))
 
+class Holiday(Model):
 
-class Holiday:
+    SCHEMA = schema.HOLIDAY
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, holiday: str, start: pd.Timestamp, end: pd.Timestamp):
         self.holiday = holiday
         self.start = start
         self.end = end
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[Holiday]:
-        out = []
-        for d in lst_dict:
-            out.append(Holiday(
-                d["holiday"],
-                d["start"],
-                d["end"]
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[Holiday]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "holiday": instance.holiday,
-                "start": instance.start,
-                "end": instance.end
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[Holiday]:
-        return Holiday.from_repr(df.to_dict(orient="records"))
 
-    @staticmethod
-    def to_df(lst: List[Holiday]) -> pd.DataFrame:
-        return pd.DataFrame(Holiday.to_repr(lst))
+class WeatherStation(Model):
 
+    SCHEMA = schema.WEATHER_STATION
+    DTYPES = SCHEMA.dtypes
+    CONVERTERS = {**dict((c, int) for c in ["elev", "mun_code", "n_sensors"]),
+                  **dict((c.name, bool) for c in SCHEMA.columns if c.type == "bool")}
 
-class WeatherStation:
     def __init__(self, station_id: str, name: str, lat: float, lon: float, elev: int, mun_code: int, n_sensors: int,
                  precipitation_available: bool, temperature_available: bool, humidity_available: bool,
                  wind_speed_available: bool, atmospheric_pressure_available: bool, solar_rad_available: bool):
@@ -319,93 +181,23 @@ class WeatherStation:
         self.atmospheric_pressure_available = atmospheric_pressure_available
         self.solar_rad_available = solar_rad_available
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[WeatherStation]:
-        out = []
-        for d in lst_dict:
-            out.append(WeatherStation(
-                d["station_id"],
-                d["name"],
-                d["lat"],
-                d["lon"],
-                int(d["elev"]),
-                int(d["mun_code"]),
-                int(d["n_sensors"]),
-                bool(d["precipitation_available"]),
-                bool(d["temperature_available"]),
-                bool(d["humidity_available"]),
-                bool(d["wind_speed_available"]),
-                bool(d["atmospheric_pressure_available"]),
-                bool(d["solar_rad_available"])
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[WeatherStation]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "station_id": instance.station_id,
-                "name": instance.name,
-                "lat": instance.lat,
-                "lon": instance.lon,
-                "elev": instance.elev,
-                "mun_code": instance.mun_code,
-                "n_sensors": instance.n_sensors,
-                "precipitation_available": instance.precipitation_available,
-                "temperature_available": instance.temperature_available,
-                "humidity_available": instance.humidity_available,
-                "wind_speed_available": instance.wind_speed_available,
-                "atmospheric_pressure_available": instance.atmospheric_pressure_available,
-                "solar_rad_available": instance.solar_rad_available
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[WeatherStation]:
-        return WeatherStation.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[WeatherStation]) -> pd.DataFrame:
-        return pd.DataFrame(WeatherStation.to_repr(lst))
 
+class MunicipalityWeatherStationLink(Model):
 
-class MunicipalityWeatherStationLink:
+    SCHEMA = schema.MUNICIPALITY_WEATHER_STATION_LINK
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, municipality_code, station_id):
         self.municipality_code = municipality_code  # fk references Municipality(code)
         self.station_id = station_id  # fk references WeatherStation(station_id)
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[MunicipalityWeatherStationLink]:
-        out = []
-        for d in lst_dict:
-            out.append(MunicipalityWeatherStationLink(
-                d["municipality_code"],
-                d["station_id"]
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[MunicipalityWeatherStationLink]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "municipality_code": instance.municipality_code,
-                "station_id": instance.station_id
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[MunicipalityWeatherStationLink]:
-        return MunicipalityWeatherStationLink.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[MunicipalityWeatherStationLink]) -> pd.DataFrame:
-        return pd.DataFrame(MunicipalityWeatherStationLink.to_repr(lst))
 
+class WeatherData(Model):
 
-class WeatherData:
+    SCHEMA = schema.WEATHER_DATA
+    DTYPES = SCHEMA.dtypes
+    # Missing measurements (NaN) are None
+    CONVERTERS = dict((c, nan_to_none) for c in schema.WEATHER_QUANTITIES)
 
     # These are daily measurements for each municipality.
     # Could be chosen from a single station or computed from different stations
@@ -422,48 +214,70 @@ class WeatherData:
         self.atmospheric_pressure_mean = atmospheric_pressure_mean  # units: hPa
         self.solar_rad_total = solar_rad_total  # solar radiation, units: kJ/m^2
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[WeatherData]:
-        out = []
-        for d in lst_dict:
-            out.append(WeatherData(
-                d["station_id"],
-                d["date"],
-                d["precipitation_total_mm"] if not isnan(d["precipitation_total_mm"]) else None,
-                d["temperature_mean_c"] if not isnan(d["temperature_mean_c"]) else None,
-                d["humidity_mean_percent"] if not isnan(d["humidity_mean_percent"]) else None,
-                d["wind_speed_mean_ms"] if not isnan(d["wind_speed_mean_ms"]) else None,
-                d["atmospheric_pressure_mean_hpa"] if not isnan(d["atmospheric_pressure_mean_hpa"]) else None,
-                d["solar_rad_total_kjm2"] if not isnan(d["solar_rad_total_kjm2"]) else None
-            ))
-        return out
 
-    @staticmethod
-    def to_repr(lst: List[WeatherData]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "station_id": instance.station_id,
-                "date": instance.date,
-                "precipitation_total_mm": instance.precipitation_total,
-                "temperature_mean_c": instance.temperature_mean,
-                "humidity_mean_percent": instance.humidity_mean,
-                "wind_speed_mean_ms": instance.wind_speed_mean,
-                "atmospheric_pressure_mean_hpa": instance.atmospheric_pressure_mean,
-                "solar_rad_total_kjm2": instance.solar_rad_total
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[WeatherData]:
-        return WeatherData.from_repr(df.to_dict(orient="records"))
+class DailyWeather(Model):
 
-    @staticmethod
-    def to_df(lst: List[WeatherData]) -> pd.DataFrame:
-        return pd.DataFrame(WeatherData.to_repr(lst))
+    SCHEMA = schema.DAILY_WEATHER
+    DTYPES = SCHEMA.dtypes
 
+    # Daily values averaged over the stations linked to municipalities (see DailyWeatherDao.refresh). Each mean is
+    # computed over the stations reporting that quantity, whose number is in the corresponding count.
 
-class VaccinesAdministrationData:
+    def __init__(self, date: pd.Timestamp, n_stations: int, precipitation_total: float, precipitation_total_count: int,
+                 temperature_mean: float, temperature_mean_count: int, humidity_mean: float, humidity_mean_count: int,
+                 wind_speed_mean: float, wind_speed_mean_count: int, atmospheric_pressure_mean: float,
+                 atmospheric_pressure_mean_count: int, solar_rad_total: float, solar_rad_total_count: int):
+        self.date = date
+        self.n_stations = n_stations  # linked stations with data on date
+        self.precipitation_total = precipitation_total
+        self.precipitation_total_count = precipitation_total_count
+        self.temperature_mean = temperature_mean
+        self.temperature_mean_count = temperature_mean_count
+        self.humidity_mean = humidity_mean
+        self.humidity_mean_count = humidity_mean_count
+        self.wind_speed_mean = wind_speed_mean
+        self.wind_speed_mean_count = wind_speed_mean_count
+        self.atmospheric_pressure_mean = atmospheric_pressure_mean
+        self.atmospheric_pressure_mean_count = atmospheric_pressure_mean_count
+        self.solar_rad_total = solar_rad_total
+        self.solar_rad_total_count = solar_rad_total_count
+
+
+class WeightedWeather(Model):
+
+    SCHEMA = schema.WEIGHTED_WEATHER_DATA
+    DTYPES = SCHEMA.dtypes
+
+    # Daily values of a province weighted by the population of the municipalities linked to the stations (see
+    # station_weights.py). Each value is averaged over the stations reporting that quantity, whose share of the
+    # population of the province is in the corresponding coverage.
+
+    def __init__(self, date: pd.Timestamp, province: str, precipitation_total_weighted: float,
+                 precipitation_total_coverage: float, temperature_mean_weighted: float,
+                 temperature_mean_coverage: float, humidity_mean_weighted: float, humidity_mean_coverage: float,
+                 wind_speed_mean_weighted: float, wind_speed_mean_coverage: float,
+                 atmospheric_pressure_mean_weighted: float, atmospheric_pressure_mean_coverage: float,
+                 solar_rad_total_weighted: float, solar_rad_total_coverage: float):
+        self.date = date
+        self.province = province  # references Province(name)
+        self.precipitation_total_weighted = precipitation_total_weighted
+        self.precipitation_total_coverage = precipitation_total_coverage
+        self.temperature_mean_weighted = temperature_mean_weighted
+        self.temperature_mean_coverage = temperature_mean_coverage
+        self.humidity_mean_weighted = humidity_mean_weighted
+        self.humidity_mean_coverage = humidity_mean_coverage
+        self.wind_speed_mean_weighted = wind_speed_mean_weighted
+        self.wind_speed_mean_coverage = wind_speed_mean_coverage
+        self.atmospheric_pressure_mean_weighted = atmospheric_pressure_mean_weighted
+        self.atmospheric_pressure_mean_coverage = atmospheric_pressure_mean_coverage
+        self.solar_rad_total_weighted = solar_rad_total_weighted
+        self.solar_rad_total_coverage = solar_rad_total_coverage
+
+
+class VaccinesAdministrationData(Model):
+
+    SCHEMA = schema.VACCINES_ADMINISTRATION_DATA
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, date: pd.Timestamp, region: str, supplier: str, age_group: str, male: int,
                  female: int, first_dose: int, second_dose: int):
@@ -476,48 +290,11 @@ class VaccinesAdministrationData:
         self.first_dose = first_dose
         self.second_dose = second_dose
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[VaccinesAdministrationData]:
-        out = []
-        for d in lst_dict:
-            out.append(VaccinesAdministrationData(
-                d["administration_date"],
-                d["region"],
-                d["supplier"],
-                d["age_group"],
-                d["male"],
-                d["female"],
-                d["first_dose"],
-                d["second_dose"],
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[VaccinesAdministrationData]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "administration_date": instance.date,
-                "region": instance.region,
-                "supplier": instance.supplier,
-                "age_group": instance.age_group,
-                "male": instance.male,
-                "female": instance.female,
-                "first_dose": instance.first_dose,
-                "second_dose": instance.second_dose
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[VaccinesAdministrationData]:
-        return VaccinesAdministrationData.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[VaccinesAdministrationData]) -> pd.DataFrame:
-        return pd.DataFrame(VaccinesAdministrationData.to_repr(lst))
 
+class VaccinesDeliveryData(Model):
 
-class VaccinesDeliveryData:
+    SCHEMA = schema.VACCINES_DELIVERY_DATA
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, date: pd.Timestamp, region: str, supplier: str, n_doses: int):
         self.date = date
@@ -525,75 +302,21 @@ class VaccinesDeliveryData:
         self.supplier = supplier
         self.n_doses = n_doses
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[VaccinesDeliveryData]:
-        out = []
-        for d in lst_dict:
-            out.append(VaccinesDeliveryData(
-                d["delivery_date"],
-                d["region"],
-                d["supplier"],
-                d["n_doses"]
-            ))
-        return out
 
-    @staticmethod
-    def to_repr(lst: List[VaccinesDeliveryData]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "delivery_date": instance.date,
-                "region": instance.region,
-                "supplier": instance.supplier,
-                "n_doses": instance.n_doses
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[VaccinesDeliveryData]:
-        return VaccinesDeliveryData.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[VaccinesDeliveryData]) -> pd.DataFrame:
-        return pd.DataFrame(VaccinesDeliveryData.to_repr(lst))
+class StringencyIndex(Model):
 
-
-class StringencyIndex:
+    SCHEMA = schema.STRINGENCY_INDEX
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, date: pd.Timestamp, value: float):
         self.date = date
         self.value = value
 
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[StringencyIndex]:
-        out = []
-        for d in lst_dict:
-            out.append(StringencyIndex(
-                d["date"],
-                d["value"]
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[StringencyIndex]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "date": instance.date,
-                "value": instance.value
-            })
-        return out
 
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[StringencyIndex]:
-        return StringencyIndex.from_repr(df.to_dict(orient="records"))
+class CuratedData(Model):
 
-    @staticmethod
-    def to_df(lst: List[StringencyIndex]) -> pd.DataFrame:
-        return pd.DataFrame(StringencyIndex.to_repr(lst))
-
-
-class CuratedData:
+    SCHEMA = schema.CURATED_DATA
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, date: pd.Timestamp, cases: int, new_cases: int, deaths: int, new_deaths: int, active: int,
                  recovered: int, quarantined: int, hospitalized: int, hospitalized_high_intensity: int,
@@ -602,7 +325,13 @@ class CuratedData:
                  new_second_doses_ag0: int, new_second_doses_ag1: int, new_second_doses_ag2: int, new_first_doses: int,
                  new_second_doses: int, first_doses_ag0: int, first_doses_ag1: int, first_doses_ag2: int,
                  second_doses_ag0: int, second_doses_ag1: int, second_doses_ag2: int, first_doses: int,
-                 second_doses: int, vaccinated_population: float, fully_vaccinated_population: float):
+                 second_doses: int, vaccinated_population: float, fully_vaccinated_population: float,
+                 precipitation_total: float = None, temperature_mean: float = None, humidity_mean: float = None,
+                 wind_speed_mean: float = None, atmospheric_pressure_mean: float = None,
+                 solar_rad_total: float = None, precipitation_total_weighted: float = None,
+                 temperature_mean_weighted: float = None, humidity_mean_weighted: float = None,
+                 wind_speed_mean_weighted: float = None, atmospheric_pressure_mean_weighted: float = None,
+                 solar_rad_total_weighted: float = None):
         self.date = date
         self.cases = cases
         self.new_cases = new_cases
@@ -637,98 +366,20 @@ class CuratedData:
         self.second_doses = second_doses
         self.vaccinated_population = vaccinated_population
         self.fully_vaccinated_population = fully_vaccinated_population
-
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[CuratedData]:
-        out = []
-        for d in lst_dict:
-            out.append(CuratedData(
-                d["date"],
-                d["cases"],
-                d["new_cases"],
-                d["deaths"],
-                d["new_deaths"],
-                d["active"],
-                d["recovered"],
-                d["quarantined"],
-                d["hospitalized"],
-                d["hospitalized_high_intensity"],
-                d["hospitalized_intensive_care"],
-                d["discharged"],
-                d["active_rsa_total"],
-                d["holiday"],
-                d["risk"],
-                d["stringency_index"],
-                d["new_first_doses_ag0"],
-                d["new_first_doses_ag1"],
-                d["new_first_doses_ag2"],
-                d["new_second_doses_ag0"],
-                d["new_second_doses_ag1"],
-                d["new_second_doses_ag2"],
-                d["new_first_doses"],
-                d["new_second_doses"],
-                d["first_doses_ag0"],
-                d["first_doses_ag1"],
-                d["first_doses_ag2"],
-                d["second_doses_ag0"],
-                d["second_doses_ag1"],
-                d["second_doses_ag2"],
-                d["first_doses"],
-                d["second_doses"],
-                d["vaccinated_population"],
-                d["fully_vaccinated_population"]
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[CuratedData]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "date": instance.date,
-                "cases": instance.cases,
-                "new_cases": instance.new_cases,
-                "deaths": instance.deaths,
-                "new_deaths": instance.new_deaths,
-                "active": instance.active,
-                "recovered": instance.recovered,
-                "quarantined": instance.quarantined,
-                "hospitalized": instance.hospitalized,
-                "hospitalized_high_intensity": instance.hospitalized_high_intensity,
-                "hospitalized_intensive_care": instance.hospitalized_intensive_care,
-                "discharged": instance.discharged,
-                "active_rsa_total": instance.active_rsa_total,
-                "holiday": instance.holiday,
-                "risk": instance.risk,
-                "stringency_index": instance.stringency_index,
-                "new_first_doses_ag0": instance.new_first_doses_ag0,
-                "new_first_doses_ag1": instance.new_first_doses_ag1,
-                "new_first_doses_ag2": instance.new_first_doses_ag2,
-                "new_second_doses_ag0": instance.new_second_doses_ag0,
-                "new_second_doses_ag1": instance.new_second_doses_ag1,
-                "new_second_doses_ag2": instance.new_second_doses_ag2,
-                "new_first_doses": instance.new_first_doses,
-                "new_second_doses": instance.new_second_doses,
-                "first_doses_ag0": instance.first_doses_ag0,
-                "first_doses_ag1": instance.first_doses_ag1,
-                "first_doses_ag2": instance.first_doses_ag2,
-                "second_doses_ag0": instance.second_doses_ag0,
-                "second_doses_ag1": instance.second_doses_ag1,
-                "second_doses_ag2": instance.second_doses_ag2,
-                "first_doses": instance.first_doses,
-                "second_doses": instance.second_doses,
-                "vaccinated_population": instance.vaccinated_population,
-                "fully_vaccinated_population": instance.fully_vaccinated_population
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[CuratedData]:
-        return CuratedData.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[CuratedData]) -> pd.DataFrame:
-        return pd.DataFrame(CuratedData.to_repr(lst))
+        # Weather averaged over the linked stations (see DailyWeather), None if not available
+        self.precipitation_total = precipitation_total
+        self.temperature_mean = temperature_mean
+        self.humidity_mean = humidity_mean
+        self.wind_speed_mean = wind_speed_mean
+        self.atmospheric_pressure_mean = atmospheric_pressure_mean
+        self.solar_rad_total = solar_rad_total
+        # Weather weighted by the population of the municipalities (see StationWeights), None if not available
+        self.precipitation_total_weighted = precipitation_total_weighted
+        self.temperature_mean_weighted = temperature_mean_weighted
+        self.humidity_mean_weighted = humidity_mean_weighted
+        self.wind_speed_mean_weighted = wind_speed_mean_weighted
+        self.atmospheric_pressure_mean_weighted = atmospheric_pressure_mean_weighted
+        self.solar_rad_total_weighted = solar_rad_total_weighted
 
 
 class HyperparameterTuningResult:
@@ -769,7 +420,10 @@ class HyperparameterTuningResult:
         return pd.DataFrame(HyperparameterTuningResult.to_repr(lst))
 
 
-class Forecast:
+class Forecast(Model):
+
+    SCHEMA = schema.FORECAST
+    DTYPES = SCHEMA.dtypes
 
     def __init__(self, output_variable: str, date: pd.Timestamp, forecast: float, se: float, upper_ci: float, lower_ci: float):
         self.output_variable = output_variable
@@ -778,39 +432,3 @@ class Forecast:
         self.se = se
         self.upper_ci = upper_ci
         self.lower_ci = lower_ci
-
-    @staticmethod
-    def from_repr(lst_dict: list) -> List[Forecast]:
-        out = []
-        for d in lst_dict:
-            out.append(Forecast(
-                d["output_variable"],
-                d["date"],
-                d["forecast"],
-                d["se"],
-                d["upper_ci"],
-                d["lower_ci"]
-            ))
-        return out
-
-    @staticmethod
-    def to_repr(lst: List[Forecast]) -> list:
-        out = []
-        for instance in lst:
-            out.append({
-                "output_variable": instance.output_variable,
-                "date": instance.date,
-                "forecast": instance.forecast,
-                "se": instance.se,
-                "upper_ci": instance.upper_ci,
-                "lower_ci": instance.lower_ci
-            })
-        return out
-
-    @staticmethod
-    def from_df(df: pd.DataFrame) -> List[Forecast]:
-        return Forecast.from_repr(df.to_dict(orient="records"))
-
-    @staticmethod
-    def to_df(lst: List[Forecast]) -> pd.DataFrame:
-        return pd.DataFrame(Forecast.to_repr(lst))
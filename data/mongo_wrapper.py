@@ -1,42 +1,145 @@
-from typing import Optional, List, Tuple
+import os
+import time
+import threading
+from itertools import islice
+from typing import Optional, List, Tuple, Iterator
 
 from pandas import DataFrame
-from pymongo import MongoClient
 from configuration import dbconfig
-import certifi
+
+DEFAULT_BATCH_SIZE = 1000  # documents per batch in streaming reads
+
+# Client settings (see get_client)
+DEFAULT_POOL_SIZE = 10  # connections per server of the shared client
+CONNECT_RETRIES = 4  # attempts to create the client and reach the cluster
+RETRY_BACKOFF = 1  # seconds before the first retry, doubled at each attempt
+MAX_RETRY_BACKOFF = 30
+
+
+def new_client(**kwargs):
+    # pymongo (and its DNS/TLS dependencies) are imported only when a client is created
+    from pymongo import MongoClient
+    import certifi
+
+    dbconfig.check_credentials()
+    conn_string = "mongodb+srv://{}:{}@{}.mongodb.net/{}?retryWrites=true&w=majority".format(
+        dbconfig.MONGODB_USER,
+        dbconfig.MONGODB_PW,
+        dbconfig.MONGODB_CLUSTER,
+        dbconfig.MONGODB_DEFAULT_DB
+    )
+    return MongoClient(conn_string, **kwargs, tlsCAFile=certifi.where())
+
+
+def connect_with_retries(ping=True, retries=CONNECT_RETRIES, **kwargs):
+    # Create a client and (if ping) wait until the cluster answers. Failed attempts (e.g. SRV lookup errors or server
+    # selection timeouts) are retried with exponential backoff; the last error is raised if all of them fail.
+    from pymongo.errors import PyMongoError
+
+    for attempt in range(retries):
+        client = None
+        try:
+            client = new_client(**kwargs)
+            if ping:
+                client.admin.command("ping")
+            return client
+        except PyMongoError as e:
+            if client is not None:
+                client.close()
+            if attempt == retries - 1:
+                raise
+            delay = min(RETRY_BACKOFF * 2 ** attempt, MAX_RETRY_BACKOFF)
+            print(f"Connection attempt {attempt + 1} failed ({type(e).__name__}). Retrying in {delay} s...")
+            time.sleep(delay)
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    # Process-wide client, created on first use and shared by all the wrappers (and DAOs) of the process, so that the
+    # SRV lookup, TLS handshakes and connection pool are paid once. Its pool size can be set with the environment
+    # variable MONGODB_POOL_SIZE. Clients are not fork-safe: a forked child process (e.g. a worker of a process pool)
+    # creates its own client instead of using the parent's.
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = connect_with_retries(maxPoolSize=dbconfig.MONGODB_POOL_SIZE or DEFAULT_POOL_SIZE)
+                _client_pid = os.getpid()
+    return _client
+
+
+def close_client():
+    # Close the shared client of this process (a new one is created by the next get_client)
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
 
 
 class MongoDB:
     # General-purpose wrapper class for MongoDB Atlas document database
 
-    def __init__(self, **kwargs):
+    def __init__(self, shared=True, **kwargs):
+        # If shared, the process-wide client is used, connected lazily at the first operation: creating wrappers is
+        # cheap. Otherwise a dedicated client is created with kwargs (MongoClient options).
+        self.shared = shared
+        self.__client = None if shared else connect_with_retries(ping=False, **kwargs)
 
-        conn_string = "mongodb+srv://{}:{}@{}.mongodb.net/{}?retryWrites=true&w=majority".format(
-            dbconfig.MONGODB_USER,
-            dbconfig.MONGODB_PW,
-            dbconfig.MONGODB_CLUSTER,
-            dbconfig.MONGODB_DEFAULT_DB
-        )
-        self.client = MongoClient(conn_string, **kwargs, tlsCAFile=certifi.where())
+    @property
+    def client(self):
+        return get_client() if self.shared else self.__client
 
     def find(self, db: str, collection: str, query: dict, projection: Optional[dict] = None,
              limit: Optional[int] = 10, orderby: Optional[Tuple or List] = None):
 
         if limit == 1 and orderby is None:
-            return [self.client[db][collection].find_one(query, projection)]
+            document = self.client[db][collection].find_one(query, projection)
+            return [document] if document is not None else []
         else:
-            cur = self.client[db][collection].find(query, projection)
-
-            if orderby is not None:
-                if isinstance(orderby, tuple):
-                    orderby = [orderby]
-                cur.sort(orderby)
-
-            if limit is not None:
-                cur.limit(limit)
-
-            out = list(cur)
-            return out
+            return list(self.iter_find(db, collection, query, projection=projection, orderby=orderby, limit=limit))
+
+    def iter_find(self, db: str, collection: str, query: dict, projection: Optional[dict] = None,
+                  orderby: Optional[Tuple or List] = None, limit: Optional[int] = None,
+                  batch_size: Optional[int] = DEFAULT_BATCH_SIZE, skip: Optional[int] = 0) -> Iterator[dict]:
+        # Generator of the matching documents. Projection, sort, skip and limit are executed by the server, and
+        # documents are transferred batch_size at a time as they are consumed.
+        cur = self.client[db][collection].find(query, projection, batch_size=batch_size or 0)
+
+        if orderby is not None:
+            if isinstance(orderby, tuple):
+                orderby = [orderby]
+            cur.sort(orderby)
+
+        if skip:
+            cur.skip(skip)
+
+        if limit is not None:
+            cur.limit(limit)
+
+        # The cursor is closed on the server also when the generator is not exhausted
+        try:
+            for document in cur:
+                yield document
+        finally:
+            cur.close()
+
+    def iter_batches(self, db: str, collection: str, query: dict, projection: Optional[dict] = None,
+                     orderby: Optional[Tuple or List] = None, limit: Optional[int] = None,
+                     batch_size: Optional[int] = DEFAULT_BATCH_SIZE) -> Iterator[List[dict]]:
+        # Generator of lists of at most batch_size matching documents (one list per batch fetched from the server)
+        documents = self.iter_find(db, collection, query, projection=projection, orderby=orderby, limit=limit,
+                                   batch_size=batch_size)
+        while True:
+            batch = list(islice(documents, batch_size))
+            if len(batch) == 0:
+                break
+            yield batch
 
     def insert(self, db: str, collection: str, x: DataFrame or list or dict):
 
@@ -64,18 +167,49 @@ class MongoDB:
         status["not_inserted"] = n_toinsert - status["inserted"]
         return status
 
-    def update(self, db: str, collection: str, query: dict, newvalues: dict, only_one: Optional[bool] = False):
+    def upsert(self, db: str, collection: str, x: list or dict, key: List[str]):
+        # Replace the documents matching the key fields of each element of x, or insert them if they do not exist
+        from pymongo import ReplaceOne
+
+        if isinstance(x, dict):
+            x = [x]
+
+        status = {"inserted": 0,
+                  "updated": 0,
+                  "unchanged": 0}
+
+        if len(x) > 0:
+            operations = [ReplaceOne(dict((k, d[k]) for k in key), d, upsert=True) for d in x]
+            result = self.client[db][collection].bulk_write(operations, ordered=False)
+            status["inserted"] = result.upserted_count
+            status["updated"] = result.modified_count
+            status["unchanged"] = result.matched_count - result.modified_count
+        return status
+
+    def update(self, db: str, collection: str, query: dict, newvalues: dict, only_one: Optional[bool] = False,
+               upsert: Optional[bool] = False):
+        # upsert: a document is inserted if none matches the query
 
         status = {"updated": 0}
 
         if only_one:
-            result = self.client[db][collection].update_one(query, newvalues)
+            result = self.client[db][collection].update_one(query, newvalues, upsert=upsert)
         else:
-            result = self.client[db][collection].update_many(query, newvalues)
+            result = self.client[db][collection].update_many(query, newvalues, upsert=upsert)
 
         status["updated"] = result.modified_count
         return status
 
+    def bulk_update(self, db: str, collection: str, updates: List[Tuple[dict, dict]], ordered: Optional[bool] = False):
+        # updates: (query, newvalues) pairs, each applied to the first matching document, in a single bulk write
+        from pymongo import UpdateOne
+
+        status = {"updated": 0}
+        if len(updates) > 0:
+            result = self.client[db][collection].bulk_write([UpdateOne(q, v) for q, v in updates], ordered=ordered)
+            status["updated"] = result.modified_count
+        return status
+
     def delete(self, db: str, collection: str, query: dict,
                only_one: Optional[bool] = False, delete_all: Optional[bool] = False):
 
@@ -90,6 +224,11 @@ class MongoDB:
         status["deleted"] = result.deleted_count
         return status
 
+    def create_index(self, db: str, collection: str, keys: List[Tuple], **kwargs):
+        # keys: list of (field, direction) tuples, direction 1 (ascending) or -1 (descending).
+        # No-op if the same index already exists. Returns the name of the index.
+        return self.client[db][collection].create_index(keys, **kwargs)
+
     def count_documents(self, db: str, collection: str, query: dict):
         return self.client[db][collection].count_documents(query)
 
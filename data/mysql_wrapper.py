@@ -1,6 +1,8 @@
-import mysql.connector
-import pandas as pd
 import os
+import re
+import time
+import queue
+import threading
 from typing import List
 
 from configuration import dbconfig
@@ -8,6 +10,21 @@ from configuration import dbconfig
 TABLES_INIT_SCRIPT = 'sql_scripts/init_tables.sql'
 DEFAULT_PORT = 3306
 
+# Connection pool settings (see ConnectionPool)
+DEFAULT_POOL_SIZE = 5
+POOL_CHECKOUT_TIMEOUT = 30  # seconds to wait for a free connection when the pool is exhausted
+POOL_PING_INTERVAL = 60  # idle connections are checked before reuse after this many seconds
+
+DEFAULT_CHUNK_SIZE = 10000  # rows per chunk in streaming reads
+
+# Bulk inserts are split into multi-row statements that fit into the server's max_allowed_packet
+PACKET_FILL_RATIO = 0.8  # fraction of max_allowed_packet used by each statement (safety margin for escaping)
+MAX_ROWS_PER_STATEMENT = 50000
+ROW_SIZE_SAMPLE = 100  # rows used to estimate the size of a row in a statement
+# Upserts count the existing keys of each chunk (one more query per chunk) to report inserted, updated and unchanged
+# rows; otherwise only the rows upserted and the rows affected are reported
+EXACT_UPSERT_COUNTS = False
+
 
 def sql_select_query_builder(table: str,
                              key1=None, value1=None,
@@ -58,20 +75,168 @@ def sql_select_query_builder(table: str,
     return query
 
 
+def new_connection():
+    # The connector is imported on first connection
+    import mysql.connector
+
+    dbconfig.check_credentials()
+
+    return mysql.connector.connect(
+        host=dbconfig.MYSQL_HOST,
+        user=dbconfig.MYSQL_USER,
+        password=dbconfig.MYSQL_PW,
+        database=dbconfig.MYSQL_SCHEMA,
+        port=DEFAULT_PORT
+    )
+
+
+def insert_columns(sql) -> List[str]:
+    # Column names of an "insert into Table (c1, c2, ...) values (...)" statement
+    start = sql.index("(")
+    return [c.strip() for c in sql[start + 1:sql.index(")", start)].split(",")]
+
+
+def insert_table(sql) -> str:
+    # Table of an "insert into Table (c1, c2, ...) values (...)" statement: the name between "into" and "("
+    match = re.match(r"\s*insert\s+into\s+`?(\w+)`?\s*\(", sql, flags=re.I)
+    assert match is not None, "Not an insert into statement with a list of columns"
+    return match.group(1)
+
+
+def upsert_query(sql, keys) -> str:
+    # Turn an insert statement into an upsert: rows whose unique key already exists are updated with the new values
+    updates = [f"{c}=values({c})" for c in insert_columns(sql) if c not in keys]
+    if len(updates) == 0:
+        updates = [f"{keys[0]}={keys[0]}"]  # all columns are part of the key: nothing to update
+    return f"{sql} on duplicate key update {', '.join(updates)}"
+
+
+class ConnectionPool:
+    # Thread-safe pool of MySQL connections shared by all MySqlDB instances of a process.
+    # Connections are created lazily up to size; when all of them are checked out, checkout waits until one is
+    # released. Connections idle for more than ping_interval seconds are pinged before being handed out and replaced
+    # if they are no longer alive.
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, checkout_timeout=POOL_CHECKOUT_TIMEOUT,
+                 ping_interval=POOL_PING_INTERVAL):
+        assert size > 0, "Pool size must be positive"
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.ping_interval = ping_interval
+        self.__idle = queue.LifoQueue()  # (connection, time of release); most recently used first
+        self.__created = 0
+        self.__lock = threading.Lock()
+        self.__pid = os.getpid()
+
+    def checkout(self):
+        self.__check_pid()
+
+        # Reuse an idle connection if available
+        try:
+            conn, released_at = self.__idle.get_nowait()
+            return self.__healthy_or_new(conn, released_at)
+        except queue.Empty:
+            pass
+
+        # Otherwise create a new one if the pool is not full
+        with self.__lock:
+            can_create = self.__created < self.size
+            if can_create:
+                self.__created += 1
+        if can_create:
+            return self.__create()
+
+        # Wait for a connection to be released
+        try:
+            conn, released_at = self.__idle.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No MySQL connection available after {self.checkout_timeout} s "
+                               f"(pool size: {self.size})")
+        return self.__healthy_or_new(conn, released_at)
+
+    def release(self, conn, discard=False):
+        # Connections are put back without contacting the server (their health is checked at checkout, see
+        # __healthy_or_new). discard: the caller has seen an error on the connection, which is closed instead.
+        if os.getpid() != self.__pid:
+            return
+        if discard:
+            self.__discard(conn)
+        else:
+            self.__idle.put((conn, time.monotonic()))
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self.__idle.get_nowait()
+            except queue.Empty:
+                break
+            self.__discard(conn)
+
+    @property
+    def created(self) -> int:
+        return self.__created
+
+    def __create(self):
+        try:
+            return new_connection()
+        except Exception:
+            with self.__lock:
+                self.__created -= 1
+            raise
+
+    def __healthy_or_new(self, conn, released_at):
+        if time.monotonic() - released_at < self.ping_interval:
+            return conn
+        try:
+            conn.ping(reconnect=True, attempts=1)
+            return conn
+        except Exception:
+            self.__discard(conn)
+            with self.__lock:
+                self.__created += 1
+            return self.__create()
+
+    def __discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self.__lock:
+            self.__created -= 1
+
+    def __check_pid(self):
+        # Connections cannot be shared with forked processes: a child process starts with an empty pool
+        if os.getpid() != self.__pid:
+            with self.__lock:
+                self.__idle = queue.LifoQueue()
+                self.__created = 0
+                self.__pid = os.getpid()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    # Process-wide pool, created on first use. Its size can be set with the environment variable MYSQL_POOL_SIZE.
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(size=dbconfig.MYSQL_POOL_SIZE or DEFAULT_POOL_SIZE)
+    return _pool
+
+
 class MySqlDB:
 
-    def __init__(self):
+    def __init__(self, pooled=True):
+        # If pooled, connections are borrowed from the process-wide pool and given back on close
+        self.pooled = pooled
         self.conn = None
         self.cursor = None
 
     def connect(self):
-        self.conn = mysql.connector.connect(
-            host=dbconfig.MYSQL_HOST,
-            user=dbconfig.MYSQL_USER,
-            password=dbconfig.MYSQL_PW,
-            database=dbconfig.MYSQL_SCHEMA,
-            port=DEFAULT_PORT
-        )
+        self.conn = get_pool().checkout() if self.pooled else new_connection()
         self.cursor = self.conn.cursor(buffered=True)
         return self
 
@@ -86,18 +251,125 @@ class MySqlDB:
                 self.cursor.execute(sql)
             else:
                 if many:
-                    self.cursor.executemany(sql, values)
+                    return self.bulk_insert(sql, values)["inserted"]
                 else:
                     self.cursor.execute(sql, values)
         inserted += self.cursor.rowcount
         return inserted
 
+    def bulk_insert(self, sql, values, upsert_keys=None, exact_counts=None) -> dict:
+        # Insert many rows (list of tuples) with an "insert into Table (...) values (%s, ...)" statement.
+        # Rows are sent as multi-row inserts (the connector batches executemany on insert statements), split into
+        # chunks that fit into max_allowed_packet. All chunks belong to the same transaction: it is committed on
+        # close, or rolled back if any chunk fails.
+        # If upsert_keys (columns of a unique key of the table) are given, existing rows are updated instead. MySQL
+        # reports 1 affected row for each inserted row, 2 for each updated row and 0 for unchanged rows: the status
+        # has the rows upserted and the rows affected. With exact_counts (default EXACT_UPSERT_COUNTS), the existing
+        # keys of each chunk are counted first, so that inserted, updated and unchanged rows are reported.
+        # Returns the number of inserted (or upserted) rows, the number of statements, elapsed time and throughput.
+        assert self.is_connected()
+        t0 = time.perf_counter()
+        chunk_rows = self.__rows_per_statement(sql, values)
+        status = {"inserted": 0, "statements": 0}
+        exact_counts = exact_counts if exact_counts is not None else EXACT_UPSERT_COUNTS
+
+        if upsert_keys is not None:
+            table = insert_table(sql)
+            key_positions = [insert_columns(sql).index(k) for k in upsert_keys]
+            sql = upsert_query(sql, upsert_keys)
+            status = {"inserted": 0, "updated": 0, "unchanged": 0, "statements": 0} if exact_counts else \
+                {"upserted": 0, "affected": 0, "statements": 0}
+
+        try:
+            for start in range(0, len(values), chunk_rows):
+                chunk = values[start:start + chunk_rows]
+                if upsert_keys is not None and exact_counts:
+                    existing = self.__count_existing(table, upsert_keys,
+                                                     [tuple(row[i] for i in key_positions) for row in chunk])
+                self.cursor.executemany(sql, chunk)
+                if upsert_keys is not None and exact_counts:
+                    inserted = len(chunk) - existing
+                    updated = (self.cursor.rowcount - inserted) // 2
+                    status["inserted"] += inserted
+                    status["updated"] += updated
+                    status["unchanged"] += existing - updated
+                elif upsert_keys is not None:
+                    status["upserted"] += len(chunk)
+                    status["affected"] += self.cursor.rowcount
+                else:
+                    status["inserted"] += self.cursor.rowcount
+                status["statements"] += 1
+        except Exception:
+            self.conn.rollback()
+            raise
+        status["seconds"] = time.perf_counter() - t0
+        rows = len(values) if upsert_keys is not None else status["inserted"]
+        status["rows_per_second"] = rows / status["seconds"] if status["seconds"] > 0 else None
+        return status
+
+    def __count_existing(self, table, keys, key_values) -> int:
+        # Number of rows of table whose key is among key_values (list of tuples)
+        if len(keys) == 1:
+            condition = f"{keys[0]} in ({', '.join(['%s'] * len(key_values))})"
+            params = [k[0] for k in key_values]
+        else:
+            placeholder = "(" + ", ".join(["%s"] * len(keys)) + ")"
+            condition = f"({', '.join(keys)}) in ({', '.join([placeholder] * len(key_values))})"
+            params = [v for k in key_values for v in k]
+        self.cursor.execute(f"select count(*) from {table} where {condition}", params)
+        return int(self.cursor.fetchall()[0][0])
+
+    def get_max_allowed_packet(self) -> int:
+        assert self.is_connected()
+        self.cursor.execute("select @@max_allowed_packet")
+        return int(self.cursor.fetchall()[0][0])
+
+    def __rows_per_statement(self, sql, values) -> int:
+        # Estimate the size of a row from a sample of rows and fill each statement up to a fraction of the packet
+        if len(values) == 0:
+            return 1
+        sample = values[:ROW_SIZE_SAMPLE]
+        row_bytes = max(1., sum(len(repr(row)) for row in sample) / len(sample))
+        budget = self.get_max_allowed_packet() * PACKET_FILL_RATIO - len(sql)
+        return int(min(MAX_ROWS_PER_STATEMENT, max(1, budget // row_bytes)))
+
     def read(self, sql):
         assert self.is_connected()
         self.cursor.execute(sql)
         res = self.cursor.fetchall()
         return res
 
+    def read_columns(self, sql) -> List[tuple]:
+        # Result of the query as a list of columns (one tuple of values for each column of the result)
+        assert self.is_connected()
+        self.cursor.execute(sql)
+        rows = self.cursor.fetchall()
+        if len(rows) == 0:
+            return [() for _ in self.cursor.description]
+        return list(zip(*rows))
+
+    def stream(self, sql, chunk_size=DEFAULT_CHUNK_SIZE):
+        # Generator of lists of at most chunk_size rows. An unbuffered cursor is used, so rows are transferred from
+        # the server as they are consumed instead of being loaded into memory all at once.
+        # The connection cannot run other queries until the generator is exhausted or closed.
+        assert self.is_connected()
+        assert chunk_size > 0, "Chunk size must be positive"
+        cursor = self.conn.cursor(buffered=False)
+        exhausted = False
+        try:
+            cursor.execute(sql)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if len(rows) == 0:
+                    exhausted = True
+                    break
+                yield rows
+        finally:
+            # Discard the rows that have not been read (generator closed early)
+            if not exhausted and self.conn.unread_result:
+                self.conn.consume_results()
+            cursor.close()
+
     def execute_query(self, sql):
         assert self.is_connected()
         self.cursor.execute(sql)
@@ -113,19 +385,36 @@ class MySqlDB:
         script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), TABLES_INIT_SCRIPT)
         self.execute_script(script_path)
 
-    def close(self):
+    def close(self, discard=False):
 
-        # Commit and close
+        # Commit and close. discard: an error occurred while the connection was in use: the transaction is rolled
+        # back (if the connection still works) and the connection is not given back to the pool
 
         if self.is_connected():
-            self.conn.commit()
-            self.cursor.close()
-            self.conn.close()
-            self.cursor = None
-            self.conn = None
+            failed = discard
+            try:
+                if discard:
+                    try:
+                        self.conn.rollback()
+                    except Exception:
+                        pass
+                else:
+                    self.conn.commit()
+                self.cursor.close()
+            except Exception:
+                failed = True
+                if not discard:
+                    raise
+            finally:
+                if self.pooled:
+                    get_pool().release(self.conn, discard=failed)
+                else:
+                    self.conn.close()
+                self.cursor = None
+                self.conn = None
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.close()
+        self.close(discard=exc_type is not None)
@@ -0,0 +1,276 @@
+from __future__ import absolute_import, annotations
+
+from collections import OrderedDict
+from typing import List
+
+# Column types, named after the MySQL types of sql_scripts/init_tables.sql, and the dtypes they are read into:
+# (dtype, compact dtype). Compact dtypes are the smallest dtypes holding any value of the column type, for large
+# in-memory frames (see Schema.compact_dtypes).
+COLUMN_TYPES = {
+    "timestamp": ("datetime64[ns]", "datetime64[ns]"),
+    "varchar": ("object", "category"),
+    "smallint": ("int64", "int16"),
+    "int": ("int64", "int32"),
+    "float": ("float64", "float32"),
+    "double": ("float64", "float64"),
+    "bool": ("bool", "bool"),
+}
+
+
+class Column:
+    __slots__ = ("name", "type", "field")
+
+    def __init__(self, name: str, type: str, field: str = None):
+        assert type in COLUMN_TYPES, f"Unknown column type {type}. Choose one among {list(COLUMN_TYPES)}"
+        self.name = name  # table column and model attribute
+        self.type = type
+        self.field = field if field is not None else name  # key in to_repr and column in to_df
+
+    @property
+    def dtype(self) -> str:
+        return COLUMN_TYPES[self.type][0]
+
+    @property
+    def compact_dtype(self) -> str:
+        return COLUMN_TYPES[self.type][1]
+
+
+class Schema:
+    # Declarative definition of an entity: its columns (in the order of the table and of the model constructor) and
+    # where it is stored. SQL statements, dtypes and projections used by models, batches and DAOs are generated from it.
+
+    def __init__(self, name: str, columns: List[Column], table: str = None, collection: str = None,
+                 unique_key: List[str] = None, date_column: str = None):
+        self.name = name  # name of the model class
+        self.columns = columns
+        self.table = table  # MySQL table (None if the entity is stored in MongoDB)
+        self.collection = collection  # MongoDB collection (None if the entity is stored in MySQL)
+        self.unique_key = unique_key  # columns identifying a record (None if there is no natural key)
+        self.date_column = date_column  # column used for date range queries
+        names = self.names
+        assert len(set(names)) == len(names), f"{name}: duplicated columns"
+        assert unique_key is None or set(unique_key) <= set(names), f"{name}: unique key is not a subset of columns"
+        assert date_column is None or date_column in names, f"{name}: unknown date column"
+
+    @property
+    def names(self) -> List[str]:
+        return [c.name for c in self.columns]
+
+    @property
+    def fields(self) -> List[str]:
+        return [c.field for c in self.columns]
+
+    def field(self, name: str) -> str:
+        # Field (to_repr key and to_df column) of a column
+        return next(c.field for c in self.columns if c.name == name)
+
+    @property
+    def dtypes(self) -> dict:
+        # to_df column --> dtype. Integer columns containing missing values are read as float64.
+        return dict((c.field, c.dtype) for c in self.columns)
+
+    @property
+    def compact_dtypes(self) -> dict:
+        # to_df column --> compact dtype (e.g. int16 for smallint, float32 for float, category for varchar), to be
+        # used with DataFrame.astype when memory matters more than precision. Integer columns containing missing values
+        # cannot be cast to integer dtypes.
+        return dict((c.field, c.compact_dtype) for c in self.columns)
+
+    def compact(self, df):
+        # Copy of df (columns of to_df) cast to the compact dtypes. Integer columns containing missing values are kept.
+        dtypes = dict((f, t) for f, t in self.compact_dtypes.items()
+                      if f in df.columns and not (t.startswith("int") and df[f].dtype.kind == "f"))
+        return df.astype(dtypes)
+
+    def insert_sql(self) -> str:
+        # Parameterized insert of all the columns (values as tuples in column order)
+        assert self.table is not None, f"{self.name} is not stored in a MySQL table"
+        return f"insert into {self.table} ({', '.join(self.names)}) values ({', '.join(['%s'] * len(self.columns))})"
+
+    def select_sql(self, where: str = None) -> str:
+        assert self.table is not None, f"{self.name} is not stored in a MySQL table"
+        sql = f"select {', '.join(self.names)} from {self.table}"
+        return sql if where is None else f"{sql} where {where}"
+
+    def projection(self) -> dict:
+        # MongoDB projection returning the fields of the schema only
+        return dict([("_id", 0)] + [(f, 1) for f in self.fields])
+
+    def __repr__(self):
+        return f"Schema({self.name}: {', '.join(f'{c.name} {c.type}' for c in self.columns)})"
+
+
+SCHEMAS = OrderedDict()
+
+
+def register(schema: Schema) -> Schema:
+    assert schema.name not in SCHEMAS, f"Schema {schema.name} is already registered"
+    SCHEMAS[schema.name] = schema
+    return schema
+
+
+def get_schema(name: str) -> Schema:
+    assert name in SCHEMAS, f"Unknown entity {name}. Choose one among {list(SCHEMAS)}"
+    return SCHEMAS[name]
+
+
+MUNICIPALITY = register(Schema("Municipality", [
+    Column("code", "smallint"),
+    Column("name", "varchar"),
+    Column("province", "varchar"),
+    Column("lat", "float"),
+    Column("lon", "float"),
+    Column("population", "int"),
+], table="Municipality", unique_key=["code"]))
+
+MUNICIPALITY_DATA = register(Schema("MunicipalityData", [
+    Column("date", "timestamp"),
+    Column("code", "smallint"),
+    Column("cases", "int"),
+    Column("recovered", "int"),
+    Column("deaths", "int"),
+    Column("discharged", "int"),
+], table="MunicipalityData", unique_key=["date", "code"], date_column="date"))
+
+PROVINCE = register(Schema("Province", [
+    Column("name", "varchar"),
+    Column("code", "smallint"),
+    Column("population", "int"),
+], table="Province", unique_key=["name"]))
+
+PROVINCE_DATA = register(Schema("ProvinceData", [
+    Column("date", "timestamp"),
+    Column("name", "varchar"),
+    Column("cases", "int"),
+    Column("new_cases", "int"),
+    Column("active", "int"),
+    Column("recovered", "int"),
+    Column("deaths", "int"),
+    Column("quarantined", "int"),
+    Column("hospitalized_infectious_diseases", "int"),
+    Column("hospitalized_high_intensity", "int"),
+    Column("hospitalized_intensive_care", "int"),
+    Column("discharged", "int"),
+    Column("active_rsa", "int"),
+    Column("active_nursing_homes", "int"),
+    Column("active_int_struct", "int"),
+    Column("active_rsa_total", "int"),
+], table="ProvinceData", unique_key=["date"], date_column="date"))
+
+REGION_RISK = register(Schema("RegionRisk", [
+    Column("date", "timestamp"),
+    Column("region", "varchar"),
+    Column("risk", "varchar"),
+], table="RegionRisk", unique_key=["date"], date_column="date"))
+
+HOLIDAY = register(Schema("Holiday", [
+    Column("holiday", "varchar"),
+    Column("start", "timestamp"),
+    Column("end", "timestamp"),
+], table="Holiday", unique_key=["holiday", "start"], date_column="start"))
+
+WEATHER_STATION = register(Schema("WeatherStation", [
+    Column("station_id", "varchar"),
+    Column("name", "varchar"),
+    Column("lat", "float"),
+    Column("lon", "float"),
+    Column("elev", "smallint"),
+    Column("mun_code", "smallint"),
+    Column("n_sensors", "smallint"),
+    Column("precipitation_available", "bool"),
+    Column("temperature_available", "bool"),
+    Column("humidity_available", "bool"),
+    Column("wind_speed_available", "bool"),
+    Column("atmospheric_pressure_available", "bool"),
+    Column("solar_rad_available", "bool"),
+], table="WeatherStation", unique_key=["station_id"]))
+
+MUNICIPALITY_WEATHER_STATION_LINK = register(Schema("MunicipalityWeatherStationLink", [
+    Column("municipality_code", "smallint"),
+    Column("station_id", "varchar"),
+], table="MunicipalityWeatherStationLink", unique_key=["municipality_code", "station_id"]))
+
+WEATHER_DATA = register(Schema("WeatherData", [
+    Column("station_id", "varchar"),
+    Column("date", "timestamp"),
+    Column("precipitation_total", "float", field="precipitation_total_mm"),
+    Column("temperature_mean", "float", field="temperature_mean_c"),
+    Column("humidity_mean", "float", field="humidity_mean_percent"),
+    Column("wind_speed_mean", "float", field="wind_speed_mean_ms"),
+    Column("atmospheric_pressure_mean", "float", field="atmospheric_pressure_mean_hpa"),
+    Column("solar_rad_total", "float", field="solar_rad_total_kjm2"),
+], table="WeatherData", unique_key=["station_id", "date"], date_column="date"))
+
+# Quantities measured by the weather stations (columns of WeatherData)
+WEATHER_QUANTITIES = ["precipitation_total", "temperature_mean", "humidity_mean", "wind_speed_mean",
+                      "atmospheric_pressure_mean", "solar_rad_total"]
+# Population-weighted quantities of a province (see station_weights.py) and the population share of the province
+# linked to the stations reporting each of them
+WEIGHTED_WEATHER = [f"{q}_weighted" for q in WEATHER_QUANTITIES]
+WEIGHTED_WEATHER_COVERAGE = [f"{q}_coverage" for q in WEATHER_QUANTITIES]
+
+# Daily aggregate of WeatherData over the linked stations: mean of each quantity and number of stations reporting it
+DAILY_WEATHER = register(Schema("DailyWeather", [
+    Column("date", "timestamp"),
+    Column("n_stations", "int"),
+    *[c for q in WEATHER_QUANTITIES for c in [Column(q, "double"), Column(f"{q}_count", "int")]],
+], table="DailyWeather", unique_key=["date"], date_column="date"))
+
+# Materialized population-weighted weather of each province and day (see WeightedWeatherDao.refresh)
+WEIGHTED_WEATHER_DATA = register(Schema("WeightedWeather", [
+    Column("date", "timestamp"),
+    Column("province", "varchar"),
+    *[c for q in WEATHER_QUANTITIES for c in [Column(f"{q}_weighted", "double"), Column(f"{q}_coverage", "double")]],
+], table="WeightedWeather", unique_key=["date", "province"], date_column="date"))
+
+VACCINES_ADMINISTRATION_DATA = register(Schema("VaccinesAdministrationData", [
+    Column("date", "timestamp", field="administration_date"),
+    Column("region", "varchar"),
+    Column("supplier", "varchar"),
+    Column("age_group", "varchar"),
+    Column("male", "int"),
+    Column("female", "int"),
+    Column("first_dose", "int"),
+    Column("second_dose", "int"),
+], table="VaccinesAdministrationData", unique_key=["date", "region", "supplier", "age_group"], date_column="date"))
+
+VACCINES_DELIVERY_DATA = register(Schema("VaccinesDeliveryData", [
+    Column("date", "timestamp", field="delivery_date"),
+    Column("region", "varchar"),
+    Column("supplier", "varchar"),
+    Column("n_doses", "int"),
+], table="VaccinesDeliveryData", date_column="date"))
+
+STRINGENCY_INDEX = register(Schema("StringencyIndex", [
+    Column("date", "timestamp"),
+    Column("value", "float"),
+], table="StringencyIndex", unique_key=["date"], date_column="date"))
+
+CURATED_DATA = register(Schema("CuratedData", [
+    Column("date", "timestamp"),
+    *[Column(c, "int") for c in ["cases", "new_cases", "deaths", "new_deaths", "active", "recovered", "quarantined",
+                                 "hospitalized", "hospitalized_high_intensity", "hospitalized_intensive_care",
+                                 "discharged", "active_rsa_total"]],
+    Column("holiday", "bool"),
+    Column("risk", "varchar"),
+    Column("stringency_index", "double"),
+    *[Column(f"{c}_ag{i}", "int") for c in ["new_first_doses", "new_second_doses"] for i in range(3)],
+    Column("new_first_doses", "int"),
+    Column("new_second_doses", "int"),
+    *[Column(f"{c}_ag{i}", "int") for c in ["first_doses", "second_doses"] for i in range(3)],
+    Column("first_doses", "int"),
+    Column("second_doses", "int"),
+    Column("vaccinated_population", "double"),
+    Column("fully_vaccinated_population", "double"),
+    *[Column(q, "double") for q in WEATHER_QUANTITIES],
+    *[Column(q, "double") for q in WEIGHTED_WEATHER],
+], collection="curated", unique_key=["date"], date_column="date"))
+
+FORECAST = register(Schema("Forecast", [
+    Column("output_variable", "varchar"),
+    Column("date", "timestamp"),
+    Column("forecast", "double"),
+    Column("se", "double"),
+    Column("upper_ci", "double"),
+    Column("lower_ci", "double"),
+], collection="forecasts", unique_key=["output_variable", "date"], date_column="date"))
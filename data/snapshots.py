@@ -0,0 +1,64 @@
+import os
+import glob
+
+import pandas as pd
+
+from configuration import dbconfig
+from .local_storage import ParquetStore
+
+SNAPSHOT_FOLDER = "snapshots"  # in the local storage folder (see dbconfig.LOCAL_STORAGE_PATH)
+SNAPSHOT_FORMAT = 3  # increased when the preprocessing changes, so that the existing snapshots are rebuilt
+
+
+class CuratedDataSnapshot:
+    # Local copy of the curated data preprocessed for the ML pipelines (forecast, hyperparameter tuning, report): the
+    # records of the DAO indexed by date at daily frequency (one row per day, NA on the missing days), in a Parquet
+    # file memory-mapped when read. The file name is the version of the source (latest date, number of records and
+    # write counter, see CuratedDataDao.get_version): the snapshot is rebuilt only when curated data have been added or
+    # reprocessed, otherwise loading costs three small queries instead of reading and converting the whole collection.
+    # Forward fill is left to the pipelines, since it depends on the date range they select.
+
+    def __init__(self, dao, path: str = None):
+        # dao: CuratedDataDao the data are read from. Snapshots of different DAOs are kept in different folders.
+        self.dao = dao
+        path = path if path is not None else dbconfig.LOCAL_STORAGE_PATH
+        self.folder = os.path.join(path, SNAPSHOT_FOLDER, type(dao).__name__)
+
+    def file_path(self, version: tuple) -> str:
+        latest, count, writes = version
+        return os.path.join(self.folder, f"{latest:%Y%m%d}_{count}_{writes}_v{SNAPSHOT_FORMAT}.parquet")
+
+    @staticmethod
+    def preprocess(df: pd.DataFrame) -> pd.DataFrame:
+        # set daily frequency in datetime index (ensures there is one row per day)
+        return df.set_index("date").asfreq("D")
+
+    def build(self, version: tuple) -> pd.DataFrame:
+        df = self.preprocess(self.dao.get_by_date_df())
+        ParquetStore.write_file(df.reset_index(drop=False), self.file_path(version))
+        # Older versions are not needed anymore
+        for path in glob.glob(os.path.join(self.folder, "*.parquet")):
+            if path != self.file_path(version):
+                os.remove(path)
+        return df
+
+    def load(self, date_from=None, refresh: bool = False) -> pd.DataFrame:
+        # Daily curated data from date_from (all data if None), read from the snapshot of the current version of the
+        # source, which is built if it does not exist (or if refresh)
+        version = self.dao.get_version()
+        if version[0] is None:
+            # No curated data: nothing to store
+            df = self.preprocess(self.dao.get_by_date_df())
+        elif refresh or not os.path.isfile(self.file_path(version)):
+            print("Building snapshot of curated data")
+            df = self.build(version)
+        else:
+            df = ParquetStore.read_file(self.file_path(version))
+            df = df.set_index(pd.DatetimeIndex(df.pop("date"), freq="D", name="date"))
+
+        if date_from is not None and date_from != "":
+            df = df.loc[df.index >= pd.Timestamp(date_from)]
+            # Start from the first record on or after date_from, as if data had been read from date_from
+            first = df.first_valid_index()
+            df = df.loc[first:] if first is not None else df
+        return df
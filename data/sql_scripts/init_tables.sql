@@ -52,6 +52,7 @@ CREATE TABLE IF NOT EXISTS MunicipalityData
     `deaths`     int,
     `discharged` int,
     INDEX (`date`),
+    UNIQUE KEY (`date`, `code`),
     FOREIGN KEY (`code`) REFERENCES Municipality (`code`) ON DELETE CASCADE
 );
 
@@ -71,7 +72,8 @@ CREATE TABLE IF NOT EXISTS Holiday
     `holiday` varchar(100) not null,
     `start`   timestamp,
     `end`     timestamp,
-    INDEX (`start`, `end`)
+    INDEX (`start`, `end`),
+    UNIQUE KEY (`holiday`, `start`)
 );
 
 CREATE TABLE IF NOT EXISTS VaccinesAdministrationData
@@ -85,6 +87,7 @@ CREATE TABLE IF NOT EXISTS VaccinesAdministrationData
     `first_dose`  int,
     `second_dose` int,
     INDEX (`date`),
+    UNIQUE KEY (`date`, `region`, `supplier`, `age_group`),
     FOREIGN KEY (`region`) REFERENCES Province (`name`) ON DELETE CASCADE
 );
 
@@ -129,7 +132,7 @@ CREATE TABLE IF NOT EXISTS WeatherData
     `wind_speed_mean`           float,
     `atmospheric_pressure_mean` float,
     `solar_rad_total`           float,
-    INDEX (`station_id`, `date`),
+    UNIQUE KEY (`station_id`, `date`),
     FOREIGN KEY (`station_id`) REFERENCES WeatherStation (`station_id`) ON DELETE CASCADE
 );
 
@@ -138,6 +141,7 @@ CREATE TABLE IF NOT EXISTS MunicipalityWeatherStationLink
 (
     `municipality_code` smallint   not null,
     `station_id`        varchar(6) not null,
+    UNIQUE KEY (`municipality_code`, `station_id`),
     FOREIGN KEY (`municipality_code`) REFERENCES Municipality (`code`) ON DELETE CASCADE,
     FOREIGN KEY (`station_id`) REFERENCES WeatherStation (`station_id`) ON DELETE CASCADE
 );
@@ -147,5 +151,5 @@ CREATE TABLE IF NOT EXISTS StringencyIndex
 (
     `date`  timestamp,
     `value` float,
-    INDEX (`date`)
+    UNIQUE KEY (`date`)
 );
\ No newline at end of file
@@ -0,0 +1,52 @@
+-- Unique keys required by upserts (DAO save with upsert=True), for databases created before they were added to
+-- init_tables.sql. Each key is added only if the table has no unique key on the same columns, so that databases
+-- created with init_tables.sql are left as they are. It fails if a table contains duplicate keys, which must be
+-- removed first: the migration is then retried at the next run.
+
+SET @ddl = IF((SELECT COUNT(*) FROM (SELECT index_name FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'MunicipalityData' AND non_unique = 0
+               GROUP BY index_name HAVING GROUP_CONCAT(column_name ORDER BY seq_in_index) = 'date,code') K) = 0,
+              'ALTER TABLE MunicipalityData ADD UNIQUE KEY (`date`, `code`)', 'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @ddl = IF((SELECT COUNT(*) FROM (SELECT index_name FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Holiday' AND non_unique = 0
+               GROUP BY index_name HAVING GROUP_CONCAT(column_name ORDER BY seq_in_index) = 'holiday,start') K) = 0,
+              'ALTER TABLE Holiday ADD UNIQUE KEY (`holiday`, `start`)', 'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @ddl = IF((SELECT COUNT(*) FROM (SELECT index_name FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'VaccinesAdministrationData' AND non_unique = 0
+               GROUP BY index_name HAVING GROUP_CONCAT(column_name ORDER BY seq_in_index) = 'date,region,supplier,age_group') K) = 0,
+              'ALTER TABLE VaccinesAdministrationData ADD UNIQUE KEY (`date`, `region`, `supplier`, `age_group`)', 'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @ddl = IF((SELECT COUNT(*) FROM (SELECT index_name FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'WeatherData' AND non_unique = 0
+               GROUP BY index_name HAVING GROUP_CONCAT(column_name ORDER BY seq_in_index) = 'station_id,date') K) = 0,
+              'ALTER TABLE WeatherData ADD UNIQUE KEY (`station_id`, `date`)', 'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @ddl = IF((SELECT COUNT(*) FROM (SELECT index_name FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'MunicipalityWeatherStationLink' AND non_unique = 0
+               GROUP BY index_name HAVING GROUP_CONCAT(column_name ORDER BY seq_in_index) = 'municipality_code,station_id') K) = 0,
+              'ALTER TABLE MunicipalityWeatherStationLink ADD UNIQUE KEY (`municipality_code`, `station_id`)', 'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @ddl = IF((SELECT COUNT(*) FROM (SELECT index_name FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'StringencyIndex' AND non_unique = 0
+               GROUP BY index_name HAVING GROUP_CONCAT(column_name ORDER BY seq_in_index) = 'date') K) = 0,
+              'ALTER TABLE StringencyIndex ADD UNIQUE KEY (`date`)', 'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
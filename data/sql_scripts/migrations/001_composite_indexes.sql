@@ -0,0 +1,21 @@
+-- Composite indexes matching the DAO queries. Index names start with "ix_" (see data/migrations.py).
+
+-- Watermarks: select <key>, max(date) ... group by <key> (loose index scan on the covering (key, date) index)
+ALTER TABLE ProvinceData
+    ADD INDEX ix_name_date (`name`, `date`);
+
+ALTER TABLE MunicipalityData
+    ADD INDEX ix_code_date (`code`, `date`);
+
+ALTER TABLE RegionRisk
+    ADD INDEX ix_region_date (`region`, `date`);
+
+ALTER TABLE VaccinesAdministrationData
+    ADD INDEX ix_region_date (`region`, `date`);
+
+ALTER TABLE VaccinesDeliveryData
+    ADD INDEX ix_region_date (`region`, `date`);
+
+-- Date range reads of all the stations: the (station_id, date) unique key only serves per-station watermarks
+ALTER TABLE WeatherData
+    ADD INDEX ix_date_station (`date`, `station_id`);
@@ -0,0 +1,20 @@
+-- Daily aggregate of WeatherData over the stations linked to municipalities, refreshed by the weather data updater
+-- (see DailyWeatherDao): mean of each quantity and number of stations reporting it
+CREATE TABLE IF NOT EXISTS DailyWeather
+(
+    `date`                            timestamp not null,
+    `n_stations`                      int       not null,
+    `precipitation_total`             double,
+    `precipitation_total_count`       int,
+    `temperature_mean`                double,
+    `temperature_mean_count`          int,
+    `humidity_mean`                   double,
+    `humidity_mean_count`             int,
+    `wind_speed_mean`                 double,
+    `wind_speed_mean_count`           int,
+    `atmospheric_pressure_mean`       double,
+    `atmospheric_pressure_mean_count` int,
+    `solar_rad_total`                 double,
+    `solar_rad_total_count`           int,
+    UNIQUE KEY (`date`)
+);
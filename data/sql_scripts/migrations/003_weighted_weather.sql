@@ -0,0 +1,20 @@
+-- Population-weighted weather of each province and day, refreshed by the weather data updater (see
+-- WeightedWeatherDao): weighted mean of each quantity over the reporting stations and their share of the population
+CREATE TABLE IF NOT EXISTS WeightedWeather
+(
+    `date`                                timestamp    not null,
+    `province`                            varchar(100) not null,
+    `precipitation_total_weighted`        double,
+    `precipitation_total_coverage`        double,
+    `temperature_mean_weighted`           double,
+    `temperature_mean_coverage`           double,
+    `humidity_mean_weighted`              double,
+    `humidity_mean_coverage`              double,
+    `wind_speed_mean_weighted`            double,
+    `wind_speed_mean_coverage`            double,
+    `atmospheric_pressure_mean_weighted`  double,
+    `atmospheric_pressure_mean_coverage`  double,
+    `solar_rad_total_weighted`            double,
+    `solar_rad_total_coverage`            double,
+    UNIQUE KEY (`date`, `province`)
+);
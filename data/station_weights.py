@@ -0,0 +1,151 @@
+import os
+import glob
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from configuration import dbconfig
+from .models import WeatherData
+from .schema import WEATHER_QUANTITIES, WEIGHTED_WEATHER, WEIGHTED_WEATHER_COVERAGE
+
+WEIGHTS_FOLDER = "weights"  # in the local storage folder (see dbconfig.LOCAL_STORAGE_PATH)
+
+
+class StationWeights:
+    # Population weights of the weather stations in each province: the weight of a station is the population of the
+    # municipalities linked to it (split evenly among the stations of a municipality with several links), divided by
+    # the population of the linked municipalities of the province. Weights are kept as a sparse provinces x stations
+    # matrix, so that the weighted features of all the days are one sparse product per quantity.
+    # The matrix is saved in a file named after a digest of the links and the populations it is built from: it is
+    # recomputed only when they change (e.g. by weather_setup.py), otherwise loading costs reading the two tables.
+
+    def __init__(self, mundao, linkdao, path: str = None):
+        # mundao: MunicipalityDao, linkdao: MunicipalityWeatherStationLinkDao
+        self.mundao = mundao
+        self.linkdao = linkdao
+        path = path if path is not None else dbconfig.LOCAL_STORAGE_PATH
+        self.folder = os.path.join(path, WEIGHTS_FOLDER)
+        self.version = None
+        self.matrix = None  # scipy.sparse CSR matrix, rows: provinces, columns: stations
+        self.provinces = None
+        self.stations = None
+
+    def links(self) -> pd.DataFrame:
+        # (province, station_id, population) of each link, population being the share of the municipality
+        links = self.linkdao.read_all_df()
+        municipalities = self.mundao.read_all_df()[["code", "province", "population"]]
+        df = links.merge(municipalities, left_on="municipality_code", right_on="code", how="inner")
+        df = df.sort_values(["municipality_code", "station_id"], ignore_index=True)
+        n_links = df.groupby("municipality_code")["station_id"].transform("size")
+        df["population"] = df["population"].astype(float).fillna(0) / n_links
+        return df[["province", "station_id", "population"]]
+
+    @staticmethod
+    def digest(links: pd.DataFrame) -> str:
+        return hashlib.sha1(pd.util.hash_pandas_object(links, index=False).to_numpy().tobytes()).hexdigest()[:16]
+
+    def file_path(self, version: str) -> str:
+        return os.path.join(self.folder, f"station_weights_{version}.npz")
+
+    @staticmethod
+    def build(links: pd.DataFrame):
+        # scipy is imported only when weights are built
+        from scipy import sparse
+
+        provinces = np.sort(links["province"].unique()).astype(str)
+        stations = np.sort(links["station_id"].unique()).astype(str)
+        rows = np.searchsorted(provinces, links["province"].to_numpy(dtype=str))
+        cols = np.searchsorted(stations, links["station_id"].to_numpy(dtype=str))
+        # Populations of the municipalities linked to the same station are summed
+        matrix = sparse.csr_matrix((links["population"].to_numpy(), (rows, cols)),
+                                   shape=(len(provinces), len(stations)))
+        totals = np.asarray(matrix.sum(axis=1)).ravel()
+        totals[totals == 0] = 1
+        return sparse.diags(1 / totals).dot(matrix).tocsr(), provinces, stations
+
+    def write_file(self, path: str):
+        os.makedirs(self.folder, exist_ok=True)
+        # Written atomically: concurrent readers see either no file or the whole matrix
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+                     shape=np.array(self.matrix.shape), provinces=self.provinces, stations=self.stations)
+        os.replace(tmp_path, path)
+
+    def read_file(self, path: str):
+        from scipy import sparse
+
+        with np.load(path) as f:
+            self.matrix = sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+            self.provinces = f["provinces"]
+            self.stations = f["stations"]
+
+    def load(self, refresh: bool = False):
+        # Weights of the current links, read from the file of their version, which is built if it does not exist (or
+        # if refresh)
+        links = self.links()
+        version = self.digest(links)
+        if version == self.version and not refresh:
+            return self
+        path = self.file_path(version)
+        if refresh or not os.path.isfile(path):
+            print("Computing population weights of weather stations")
+            self.matrix, self.provinces, self.stations = self.build(links)
+            self.write_file(path)
+            # Weights of the previous links are not needed anymore
+            for p in glob.glob(os.path.join(self.folder, "station_weights_*.npz")):
+                if p != path:
+                    os.remove(p)
+        else:
+            self.read_file(path)
+        self.version = version
+        return self
+
+    def features(self, df: pd.DataFrame, province: str, coverage: bool = False) -> pd.DataFrame:
+        # Population-weighted daily weather of the province, from WeatherData records (columns of WeatherData.to_df).
+        # The weights of the stations without data on a day are left out, i.e. each day is averaged over the stations
+        # reporting the quantity. Returns a DataFrame indexed by date with columns WEIGHTED_WEATHER (and, if coverage,
+        # WEIGHTED_WEATHER_COVERAGE: the total weight of the reporting stations).
+        if self.matrix is None:
+            self.load()
+        assert province in self.provinces, f"No weather stations linked to municipalities of {province}"
+        weights = self.matrix[int(np.searchsorted(self.provinces, province))]
+
+        # Station x date arrays (records of stations without weights are ignored)
+        dates = pd.DatetimeIndex(np.unique(df["date"].to_numpy()), name="date")
+        rows = pd.Index(self.stations).get_indexer(df["station_id"].astype(str))
+        cols = dates.get_indexer(df["date"])
+        keep = rows >= 0
+        rows, cols = rows[keep], cols[keep]
+
+        out = pd.DataFrame(index=dates)
+        for q, weighted, covered in zip(WEATHER_QUANTITIES, WEIGHTED_WEATHER, WEIGHTED_WEATHER_COVERAGE):
+            values = df[WeatherData.SCHEMA.field(q)].to_numpy(dtype=float)[keep]
+            reported = ~np.isnan(values)
+            # Weighted sums of the values and of the weights of the reporting stations, in a single product
+            stacked = np.zeros((len(self.stations), 2 * len(dates)))
+            stacked[rows[reported], cols[reported]] = values[reported]
+            stacked[rows[reported], len(dates) + cols[reported]] = 1
+            sums = np.asarray(weights.dot(stacked)).ravel()
+            total, total_weight = sums[:len(dates)], sums[len(dates):]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[weighted] = np.where(total_weight > 0, total / total_weight, np.nan)
+            if coverage:
+                out[covered] = total_weight
+        return out
+
+    def table(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Weighted daily weather and coverage of all the provinces, from WeatherData records: the rows of
+        # WeightedWeather (columns of WeightedWeather.to_df)
+        if self.matrix is None:
+            self.load()
+        frames = []
+        for province in self.provinces:
+            out = self.features(df, province, coverage=True).reset_index(drop=False)
+            out.insert(1, "province", province)
+            frames.append(out)
+        columns = ["date", "province"] + [c for pair in zip(WEIGHTED_WEATHER, WEIGHTED_WEATHER_COVERAGE) for c in pair]
+        if len(frames) == 0:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
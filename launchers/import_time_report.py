@@ -0,0 +1,60 @@
+import sys, os
+import argparse
+import subprocess
+from collections import defaultdict
+
+ROOT_FOLDER = os.path.dirname(
+    os.path.dirname(
+        os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["data.dao", "ml", "ml.model_selection", "updaters", "pipelines.data_update",
+                   "pipelines.data_curation", "pipelines.hyperparameter_tuning", "pipelines.forecast"]
+
+
+def measure_import(module: str):
+    # Import the module in a fresh interpreter with "-X importtime" and parse the report written to stderr.
+    # Returns the exit code and a list of (module, self time [us], cumulative time [us]) tuples.
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         cwd=ROOT_FOLDER, capture_output=True, text=True)
+    rows = []
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return res.returncode, rows
+
+
+def report(module: str, top=10):
+    returncode, rows = measure_import(module)
+
+    # Total import time is the cumulative time of the requested module (last matching line)
+    total = max([r[2] for r in rows if r[0] == module], default=sum(r[1] for r in rows))
+
+    # Group self times by top-level package
+    packages = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us
+
+    status = "ok" if returncode == 0 else f"failed (exit code {returncode})"
+    print(f"{module}: {total / 1e3:.1f} ms, {len(rows)} modules imported --> {status}")
+    for name, self_us in sorted(packages.items(), key=lambda x: x[1], reverse=True)[:top]:
+        print(f"   {name:<30} {self_us / 1e3:8.1f} ms")
+
+
+def main(modules=None, top=10):
+    for module in modules if modules else DEFAULT_MODULES:
+        report(module, top=top)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report the import time of the entry points of the application.')
+    parser.add_argument('modules', type=str, nargs='*',
+                        help='modules to import (default: main packages and pipelines)')
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of top-level packages to show for each module, sorted by import time')
+    args = parser.parse_args()
+
+    main(modules=args.modules, top=args.top)
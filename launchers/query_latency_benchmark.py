@@ -0,0 +1,158 @@
+import sys, os
+import argparse
+import time
+from statistics import median
+
+from pandas import Timestamp, Timedelta
+
+ROOT_FOLDER = os.path.dirname(
+    os.path.dirname(
+        os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT_FOLDER)
+
+from data.schema import Schema
+from data.models import WeatherData, VaccinesAdministrationData, VaccinesDeliveryData, MunicipalityData
+from data.mysql_wrapper import MySqlDB
+from data.migrations import INDEX_PREFIX, partition_monthly, partition_names
+
+# Benchmarked tables and the column their watermarks are grouped by
+BENCHMARK_TABLES = {
+    "WeatherData": (WeatherData.SCHEMA, "station_id"),
+    "VaccinesAdministrationData": (VaccinesAdministrationData.SCHEMA, "region"),
+    "VaccinesDeliveryData": (VaccinesDeliveryData.SCHEMA, "region"),
+    "MunicipalityData": (MunicipalityData.SCHEMA, "code"),
+}
+DEFAULT_ROWS = [10000, 100000, 1000000]
+DEFAULT_GROUPS = 200  # stations, regions or municipalities
+TABLE_PREFIX = "bench_"
+RANGE_DAYS = 30  # date range read by the range query (most recent days)
+
+
+def synthetic_rows(schema: Schema, group: str, start: int, stop: int, n_groups: int, first_date: Timestamp) -> list:
+    # Rows start..stop-1 of the synthetic table: one row per group and day (so that the unique keys, which include the
+    # date and the group column, are not violated), constant values in the other columns
+    rows = []
+    for i in range(start, stop):
+        date = first_date + Timedelta(days=i // n_groups)
+        row = []
+        for c in schema.columns:
+            if c.name == schema.date_column:
+                row.append(date.to_pydatetime())
+            elif c.name == group:
+                row.append(i % n_groups if c.type in ("smallint", "int") else f"G{i % n_groups:04d}")
+            elif c.type == "varchar":
+                row.append("x")
+            elif c.type == "bool":
+                row.append(True)
+            elif c.type == "timestamp":
+                row.append(date.to_pydatetime())
+            else:
+                row.append(i % 1000)
+        rows.append(tuple(row))
+    return rows
+
+
+def composite_indexes(db: MySqlDB, table: str) -> list:
+    # Indexes of the table created by the migrations
+    return [r[0] for r in db.read("select distinct index_name from information_schema.statistics "
+                                  f"where table_schema = database() and table_name = '{table}' "
+                                  f"and index_name like '{INDEX_PREFIX}%'")]
+
+
+def queries(schema: Schema, group: str, table: str, last_date: Timestamp) -> dict:
+    # DAO queries on the synthetic table: watermark per group and date range read of the last RANGE_DAYS days
+    date_from = (last_date - Timedelta(days=RANGE_DAYS - 1)).strftime("%Y-%m-%d")
+    date_to = last_date.strftime("%Y-%m-%d")
+    return {
+        "watermark": f"select {group}, max({schema.date_column}) from {table} {{hint}} group by {group}",
+        "date range": f"select {', '.join(schema.names)} from {table} {{hint}} "
+                      f'where {schema.date_column} between "{date_from}" and "{date_to}"',
+    }
+
+
+def latency(db: MySqlDB, sql: str, repeat: int) -> float:
+    # Median latency in milliseconds (the first execution warms up the buffer pool)
+    db.read(sql)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        db.read(sql)
+        times.append(time.perf_counter() - t0)
+    return median(times) * 1000
+
+
+def benchmark(db: MySqlDB, name: str, row_counts: list, n_groups: int, repeat: int, partition: bool):
+    # Copy of the table (same columns, indexes and, if partition, monthly partitions), filled with synthetic rows up
+    # to each row count; latencies of each query are measured with the indexes of the migrations ("indexed") and
+    # ignoring them ("baseline")
+    schema, group = BENCHMARK_TABLES[name]
+    table = TABLE_PREFIX + schema.table
+    db.execute_query(f"DROP TABLE IF EXISTS {table}")
+    db.execute_query(f"CREATE TABLE {table} LIKE {schema.table}")
+    if len(partition_names(db, table)) > 0:
+        db.execute_query(f"ALTER TABLE {table} REMOVE PARTITIONING")
+    indexes = composite_indexes(db, table)
+    if len(indexes) == 0:
+        print(f"Warning: {schema.table} has no indexes created by migrations (run pipelines/db_migrate.py)")
+
+    # Dates end today at the largest row count
+    first_date = Timestamp("today").normalize() - Timedelta(days=max(row_counts) // n_groups)
+    sql = schema.insert_sql().replace(f"insert into {schema.table} ", f"insert into {table} ", 1)
+    results = []
+    try:
+        loaded = 0
+        for n_rows in sorted(row_counts):
+            for start in range(loaded, n_rows, 50000):
+                db.bulk_insert(sql, synthetic_rows(schema, group, start, min(start + 50000, n_rows), n_groups,
+                                                   first_date))
+                db.conn.commit()
+            loaded = n_rows
+            if partition and len(partition_names(db, table)) == 0:
+                partition_monthly(db, table, date_column=schema.date_column)
+            db.execute_query(f"ANALYZE TABLE {table}")
+            db.cursor.fetchall()
+
+            last_date = first_date + Timedelta(days=(n_rows - 1) // n_groups)
+            for query, template in queries(schema, group, table, last_date).items():
+                indexed = latency(db, template.format(hint=""), repeat)
+                baseline = latency(db, template.format(hint=f"IGNORE INDEX ({', '.join(indexes)})"), repeat) \
+                    if len(indexes) > 0 else None
+                results.append((schema.table, n_rows, query, baseline, indexed))
+    finally:
+        db.execute_query(f"DROP TABLE IF EXISTS {table}")
+    return results
+
+
+def report(results: list):
+    print(f"{'table':<28}{'rows':>10}  {'query':<12}{'baseline [ms]':>15}{'indexed [ms]':>15}")
+    for table, n_rows, query, baseline, indexed in results:
+        baseline = f"{baseline:.2f}" if baseline is not None else "-"
+        print(f"{table:<28}{n_rows:>10}  {query:<12}{baseline:>15}{indexed:>15.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure the latency of the DAO queries on the MySQL time-series tables against their row count.')
+    parser.add_argument('tables', type=str, nargs='*', default=list(BENCHMARK_TABLES),
+                        help=f'tables to benchmark (default: {", ".join(BENCHMARK_TABLES)})')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help='row counts at which latencies are measured')
+    parser.add_argument('--groups', type=int, default=DEFAULT_GROUPS,
+                        help='distinct values of the group column (stations, regions, municipalities)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='executions of each query (the median is reported)')
+    parser.add_argument('--partition', action="store_true",
+                        help='partition the synthetic tables by month')
+    args = parser.parse_args()
+
+    for t in args.tables:
+        assert t in BENCHMARK_TABLES, f"Invalid table. Choose among {list(BENCHMARK_TABLES)}"
+
+    results = []
+    db = MySqlDB(pooled=False)
+    with db.connect():
+        for t in args.tables:
+            print(f"Benchmarking {t}")
+            results.extend(benchmark(db, t, args.rows, args.groups, args.repeat, args.partition))
+    report(results)
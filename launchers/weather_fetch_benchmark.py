@@ -0,0 +1,134 @@
+import sys, os
+import argparse
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from pandas import Timestamp, Timedelta, date_range, to_datetime
+
+ROOT_FOLDER = os.path.dirname(
+    os.path.dirname(
+        os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT_FOLDER)
+
+from collectors.weather_collectors import WeatherDataCollector
+from collectors.rate_limit import HostRateLimiter
+from updaters.weather_data_updater import WeatherDataUpdater
+
+DEFAULT_STATIONS = 40
+DEFAULT_DAYS = 30  # days collected for each station
+DEFAULT_LATENCY = 0.5  # seconds taken by the stand-in to answer each request
+DEFAULT_CONCURRENCY = [1, 4, 8]
+ENDPOINT = "/cgi/webhyd.pl"
+HEADERS = ["Date", "Pioggia (mm)", "Temp. aria (°C)", "Umidita' aria (%)", "Vel. Vento (m/s)",
+           "Pressione atm. (hPa)", "Rad.Sol.Tot. (kJ/m2)"]
+
+
+def synthetic_page(station_id: str, date_from: Timestamp, date_to: Timestamp) -> str:
+    # Page laid out as those of storico.meteotrentino.it: two title rows, the header row, the units row, then one row
+    # per day, each value followed by its quality code (whose header is empty)
+    def row(cells):
+        return "<tr>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>"
+
+    rows = [row([f"Station {station_id}"] + [""] * 12), row([""] * 13),
+            row([HEADERS[0]] + [c for h in HEADERS[1:] for c in (h, "")]), row([""] * 13)]
+    for i, d in enumerate(date_range(date_from, date_to, freq="D")):
+        rows.append(row([d.strftime("%H:%M:%S %d/%m/%Y")] + [c for k in range(6) for c in (i + k, 1)]))
+    return '<html><head><meta charset="utf-8"></head><body><table>' + "".join(rows) + "</table></body></html>"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Stand-in of the weather data server: answers with the recorded page of the station (<pages>/<station_id>.html)
+    # if it exists, otherwise with a synthetic page of the requested dates, after the configured latency
+    server_version = "WeatherStandIn/1.0"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.starts.append(time.monotonic())
+        try:
+            time.sleep(server.latency)
+            query = parse_qs(urlparse(self.path).query)
+            station_id = query.get("co", [""])[0]
+            path = os.path.join(server.pages, f"{station_id}.html") if server.pages is not None else None
+            if path is not None and os.path.isfile(path):
+                with open(path, "rb") as f:
+                    body = f.read()
+            else:
+                date_from = to_datetime(query["d1"][0], format="%d/%m/%Y")
+                date_to = to_datetime(query["d2"][0].strip(), format="%d/%m/%Y")
+                body = synthetic_page(station_id, date_from, date_to).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in(latency: float, pages: str = None) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.pages = pages
+    server.lock = threading.Lock()
+    server.in_flight = server.max_in_flight = 0
+    server.starts = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark(server: ThreadingHTTPServer, n_stations: int, days: int, concurrency: int, rate: float) -> tuple:
+    # Fetch the stations through WeatherDataUpdater.fetch (nothing is saved): records, seconds, maximum concurrent
+    # requests seen by the stand-in and minimum interval between the starts of two requests
+    updater = WeatherDataUpdater(storage="local", concurrency=concurrency)
+    updater.collector = WeatherDataCollector(base_url=f"http://127.0.0.1:{server.server_port}{ENDPOINT}",
+                                             rate_limiter=HostRateLimiter(rate) if rate is not None else None)
+    latest = Timestamp("today").normalize() - Timedelta(days=days + 1)
+    stations_dates = dict((f"T{i:04d}", latest) for i in range(n_stations))
+    server.max_in_flight, server.starts = 0, []
+
+    t0 = time.perf_counter()
+    n_records = sum(len(data) for data in updater.fetch(stations_dates))
+    seconds = time.perf_counter() - t0
+    starts = sorted(server.starts)
+    min_interval = min(b - a for a, b in zip(starts, starts[1:])) if len(starts) > 1 else None
+    return n_records, seconds, server.max_in_flight, min_interval
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measure the time WeatherDataUpdater takes to fetch weather stations, one at a time or '
+                    'concurrently, from a local stand-in of the weather data server.')
+    parser.add_argument('--stations', type=int, default=DEFAULT_STATIONS,
+                        help='stations fetched')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS,
+                        help='days collected for each station')
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help='seconds taken by the stand-in to answer each request')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=DEFAULT_CONCURRENCY,
+                        help='concurrency limits to compare')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='maximum requests per second (no limit by default)')
+    parser.add_argument('--pages', type=str, default=None,
+                        help='folder of recorded pages, named <station_id>.html (synthetic pages by default)')
+    args = parser.parse_args()
+
+    server = start_stand_in(args.latency, args.pages)
+    print(f"{'concurrency':>12}{'records':>10}{'seconds':>10}{'max in flight':>15}{'min interval [s]':>18}")
+    try:
+        for c in args.concurrency:
+            n_records, seconds, in_flight, interval = benchmark(server, args.stations, args.days, c, args.rate)
+            interval = f"{interval:.3f}" if interval is not None else "-"
+            print(f"{c:>12}{n_records:>10}{seconds:>10.2f}{in_flight:>15}{interval:>18}")
+    finally:
+        server.shutdown()
@@ -1 +1,6 @@
-from .sarimax import Sarimax
+def __getattr__(name):
+    # Sarimax is imported on first access, so that importing a submodule of ml does not load the whole package
+    if name == "Sarimax":
+        from .sarimax import Sarimax
+        return Sarimax
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
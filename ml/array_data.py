@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class ArrayData:
+    # NumPy view of a dataset with the endogenous variable (already transformed) and the exogenous variables.
+    # It is built once (e.g. per tuning run) so that models can be constructed from array slices without pandas.
+
+    def __init__(self, endog, exog=None, index=None, transformation=None, endog_name=None, exog_names=None):
+        if transformation is not None:
+            assert transformation in ["sqrt"], "Invalid transformation"
+        self.endog = np.asarray(endog, dtype=np.float64)  # transformed endogenous variable, 1-d
+        self.exog = np.asarray(exog, dtype=np.float64) if exog is not None else None  # 2-d or None
+        self.index = index  # reference to the date index of the original data (not copied)
+        self.transformation = transformation
+        self.endog_name = endog_name
+        self.exog_names = exog_names
+        self.__actual = None
+
+    @staticmethod
+    def from_df(data, transformation=None, transformed=False):
+        # data has the endogenous variable as first column and the exogenous variables as the other columns.
+        # If transformed is True, the endogenous variable has already been transformed.
+        endog = data.iloc[:, 0].to_numpy(dtype=np.float64)
+        if transformation == "sqrt" and not transformed:
+            endog = np.sqrt(endog)
+        exog = data.iloc[:, 1:].to_numpy(dtype=np.float64) if data.shape[1] > 1 else None
+        return ArrayData(endog, exog, index=data.index, transformation=transformation,
+                         endog_name=data.columns[0],
+                         exog_names=data.columns[1:].to_list() if data.shape[1] > 1 else None)
+
+    @property
+    def actual(self):
+        # Untransformed endogenous variable (computed once)
+        if self.__actual is None:
+            self.__actual = back_transform(self.endog, self.transformation)
+        return self.__actual
+
+    def __len__(self):
+        return len(self.endog)
+
+
+def back_transform(x, transformation=None):
+    if transformation == "sqrt":
+        return np.power(x, 2)
+    return x
+
+
+def back_transform_interval(lower, upper, transformation=None):
+    # Negative bounds in the square root space correspond to a zero bound in the original space
+    if transformation == "sqrt":
+        return np.power(np.clip(lower, 0, None), 2), np.power(np.clip(upper, 0, None), 2)
+    return lower, upper
+
+
+def as_slice(indices):
+    # Contiguous indices (as produced by TsCvSplitter) are turned into a slice, so that arrays are sliced as views
+    indices = np.asarray(indices)
+    if len(indices) > 0 and indices[-1] - indices[0] == len(indices) - 1 and np.all(np.diff(indices) == 1):
+        return slice(int(indices[0]), int(indices[-1]) + 1)
+    return indices
@@ -1,13 +1,25 @@
-import numpy as np
+import pandas as pd
 from .performance_measures import rmse
+from .metrics import METRICS, FoldArrays, compute_metrics, summarise
+from .array_data import ArrayData, back_transform, back_transform_interval, as_slice
 
 
 def model_cross_validation(data=None, splits=None, model=None, transformed=None, performance_measure=rmse,
-                           **kwargs):
+                           return_metrics=False, return_predictions=False, **kwargs):
     assert data is not None, "Missing data"
     assert splits is not None, "Missing splits"
     assert model is not None, "Missing model"
 
+    # Models that can be built from NumPy arrays skip the pandas wrapping at each fold
+    if hasattr(model, "from_arrays"):
+        if not isinstance(data, ArrayData):
+            data = ArrayData.from_df(data, transformation=transformed, transformed=True)
+        return _array_cross_validation(data, splits, model, performance_measure,
+                                       return_metrics=return_metrics, return_predictions=return_predictions,
+                                       **kwargs)
+
+    measure_name = performance_measure.__name__.upper()
+    fold_arrays = FoldArrays(splits)
     performance_list = []
 
     for split in splits:
@@ -17,19 +29,67 @@ def model_cross_validation(data=None, splits=None, model=None, transformed=None,
         # Test
         forecast_df = model_instance.forecast(len(split[1]), exog=data.iloc[split[1], 1:] if data.shape[1]>1 else None)
 
-        # Calculate performance
-        actual = data.iloc[split[1], :]
-        prediction = forecast_df["forecast"]
+        # Collect actual values and forecasts (untransformed)
+        actual = back_transform(data.iloc[split[1], :], transformed)
+        prediction = back_transform(forecast_df["forecast"], transformed)
+        lower, upper = back_transform_interval(forecast_df["lower_ci"].values, forecast_df["upper_ci"].values,
+                                               transformed)
+        fold_arrays.add(actual.iloc[:, 0].values, prediction.values, lower, upper,
+                        train=back_transform(data.iloc[split[0], 0].values, transformed))
+
+        # Performance measures other than the built-in ones are computed fold by fold
+        if measure_name not in METRICS:
+            performance = performance_measure(actual, prediction)
+            performance_list.append(performance)
+
+    return _summarise_cross_validation(fold_arrays, measure_name, performance_list,
+                                       return_metrics=return_metrics, return_predictions=return_predictions)
+
 
-        if transformed == "sqrt":
-            actual = np.power(actual, 2)
-            prediction = np.power(prediction, 2)
+def _array_cross_validation(data: ArrayData, splits, model, performance_measure, return_metrics=False,
+                            return_predictions=False, **kwargs):
+    # Fast path: data are transformed once and each fold model is built from (views of) NumPy arrays
+    measure_name = performance_measure.__name__.upper()
+    fold_arrays = FoldArrays(splits)
+    performance_list = []
+
+    for split in splits:
+        train, test = as_slice(split[0]), as_slice(split[1])
 
-        performance = performance_measure(actual, prediction)
-        performance_list.append(performance)
+        # Train
+        model_instance = model.from_arrays(data.endog[train],
+                                           exog=data.exog[train] if data.exog is not None else None,
+                                           transformation=data.transformation, **kwargs).fit()
+
+        # Test (forecasts are back-transformed by the model)
+        prediction, lower, upper = model_instance.forecast_arrays(len(split[1]),
+                                                                  exog=data.exog[test] if data.exog is not None
+                                                                  else None)
+        actual = data.actual[test]
+        fold_arrays.add(actual, prediction, lower, upper, train=data.actual[train])
+
+        # Performance measures other than the built-in ones are computed fold by fold
+        if measure_name not in METRICS:
+            performance = performance_measure(pd.DataFrame(actual), prediction)
+            performance_list.append(performance)
+
+    return _summarise_cross_validation(fold_arrays, measure_name, performance_list,
+                                       return_metrics=return_metrics, return_predictions=return_predictions)
+
+
+def _summarise_cross_validation(fold_arrays, measure_name, performance_list, return_metrics=False,
+                                return_predictions=False):
+    # Compute all built-in performance measures at once
+    scores = compute_metrics(fold_arrays)
 
     # Compute average performance measure
-    performance_mean = np.mean(performance_list)
-    performance_se = np.std(performance_list, ddof=1) / np.sqrt(len(performance_list))
+    if measure_name not in scores:
+        scores[measure_name], scores[measure_name + "_se"] = summarise(performance_list)
+
+    result = scores if return_metrics else (scores[measure_name], scores[measure_name + "_se"])
+
+    # Out-of-fold predictions (untransformed, concatenated in the order of the splits)
+    if return_predictions:
+        return result, fold_arrays.predicted
 
-    return performance_mean, performance_se
+    return result
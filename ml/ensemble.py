@@ -0,0 +1,87 @@
+from multiprocessing import cpu_count
+
+import numpy as np
+
+# Out-of-fold predictions are stored as raw float32 buffers (one contiguous column per configuration)
+PREDICTIONS_DTYPE = np.float32
+
+
+def pack_predictions(values) -> bytes:
+    return np.ascontiguousarray(values, dtype=PREDICTIONS_DTYPE).tobytes()
+
+
+def unpack_predictions(buffer: bytes) -> np.ndarray:
+    return np.frombuffer(buffer, dtype=PREDICTIONS_DTYPE)
+
+
+def out_of_fold_actual(data, splits) -> np.ndarray:
+    # Actual values of the endogenous variable (first column of data), in the same order as the out-of-fold
+    # predictions produced by cross validation
+    y = data.iloc[:, 0].values
+    return np.concatenate([y[split[1]] for split in splits]).astype(PREDICTIONS_DTYPE)
+
+
+def fit_ensemble_weights(predictions, actual) -> np.ndarray:
+    # Non-negative weights summing to one that minimise the squared error of the weighted out-of-fold predictions.
+    # predictions is a list with one array of out-of-fold predictions for each ensemble member
+    from scipy.optimize import nnls
+
+    x = np.column_stack([np.asarray(p, dtype=np.float64) for p in predictions])
+    y = np.asarray(actual, dtype=np.float64)
+    assert x.shape[0] == len(y), "Out-of-fold predictions and actual values have different lengths"
+
+    # Ignore points where any of the members diverged
+    valid = np.isfinite(x).all(axis=1) & np.isfinite(y)
+    weights = np.zeros(x.shape[1])
+    if valid.sum() > 0:
+        weights, _ = nnls(x[valid], y[valid])
+
+    if weights.sum() == 0:
+        return np.full(x.shape[1], 1 / x.shape[1])
+    return weights / weights.sum()
+
+
+def ensemble_residuals(predictions, actual, weights) -> np.ndarray:
+    # Out-of-fold errors (actual - prediction) of the weighted ensemble, at the points where all the members and the
+    # actual value are finite
+    x = np.column_stack([np.asarray(p, dtype=np.float64) for p in predictions])
+    y = np.asarray(actual, dtype=np.float64)
+    valid = np.isfinite(x).all(axis=1) & np.isfinite(y)
+    return y[valid] - x[valid].dot(np.asarray(weights, dtype=np.float64))
+
+
+def fit_and_forecast(model, data, cfg, steps=1, exog=None, **kwargs):
+    return model(data=data, config=cfg, **kwargs).fit().forecast(steps=steps, exog=exog)
+
+
+def ensemble_forecast(model, data, configurations, weights, steps=1, exog=None, residuals=None, alpha=0.05,
+                      n_jobs=cpu_count(), parallel_backend="loky", **kwargs):
+    # Fit one model for each configuration in parallel and combine their point forecasts with the given weights.
+    # Standard errors and confidence bounds are not linear in the forecasts, so they are not combined: if residuals
+    # (out-of-fold errors of the ensemble, see ensemble_residuals) are given, se is their standard deviation and the
+    # 1 - alpha interval adds their alpha / 2 and 1 - alpha / 2 quantiles to the forecast (the same width at every
+    # step); otherwise only the point forecast is returned (se and bounds are NaN).
+    assert len(configurations) == len(weights), "Provide one weight for each configuration"
+    from joblib import Parallel, delayed
+
+    executor = Parallel(n_jobs=min(n_jobs, len(configurations)), backend=parallel_backend)
+    forecasts = executor(delayed(fit_and_forecast)(model, data, cfg, steps=steps, exog=exog, **kwargs)
+                         for cfg in configurations)
+
+    combined = forecasts[0][["forecast"]] * weights[0]
+    for w, f in zip(weights[1:], forecasts[1:]):
+        combined = combined + f[["forecast"]] * w
+    combined["se"] = np.nan
+    combined["lower_ci"] = np.nan
+    combined["upper_ci"] = np.nan
+
+    residuals = np.asarray(residuals, dtype=np.float64) if residuals is not None else np.array([])
+    if len(residuals) > 1:
+        lower, upper = np.quantile(residuals, [alpha / 2, 1 - alpha / 2])
+        combined["se"] = np.std(residuals, ddof=1)
+        combined["lower_ci"] = combined["forecast"] + lower
+        combined["upper_ci"] = combined["forecast"] + upper
+        if kwargs.get("transformation") == "sqrt":
+            # Back-transformed quantities are non-negative (see array_data.back_transform_interval)
+            combined["lower_ci"] = combined["lower_ci"].clip(lower=0)
+    return combined, forecasts
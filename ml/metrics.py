@@ -0,0 +1,119 @@
+import numpy as np
+
+# Names of the measures computed by compute_metrics (keys in test_performance and tuning results)
+METRICS = ["RMSE", "MAE", "MAPE", "SMAPE", "MASE", "COVERAGE"]
+
+# Score assigned to folds whose forecasts contain NaN or infinite values (same as performance_measures.rmse)
+FAILED_FOLD_SCORE = 1e6
+
+NOMINAL_COVERAGE = 0.95
+
+
+class FoldArrays:
+    # Contiguous buffers holding actual values, forecasts and forecast intervals of all cross validation folds
+    # of a single model configuration, so that all measures can be computed at once
+
+    def __init__(self, splits):
+        n_points = sum(len(split[1]) for split in splits)
+        self.n_folds = len(splits)
+        self.actual = np.empty(n_points, dtype=np.float64)
+        self.predicted = np.empty(n_points, dtype=np.float64)
+        self.lower = np.empty(n_points, dtype=np.float64)
+        self.upper = np.empty(n_points, dtype=np.float64)
+        self.fold = np.empty(n_points, dtype=np.intp)
+        self.scale = np.full(self.n_folds, np.nan, dtype=np.float64)  # in-sample naive MAE, used by MASE
+        self.__position = 0
+        self.__next_fold = 0
+
+    def add(self, actual, predicted, lower=None, upper=None, train=None):
+        # Append the test set of the next fold; train (untransformed training values) is used for MASE scaling
+        n = len(actual)
+        start, stop = self.__position, self.__position + n
+        self.actual[start:stop] = actual
+        self.predicted[start:stop] = predicted
+        self.lower[start:stop] = lower if lower is not None else np.nan
+        self.upper[start:stop] = upper if upper is not None else np.nan
+        self.fold[start:stop] = self.__next_fold
+        if train is not None and len(train) > 1:
+            self.scale[self.__next_fold] = np.mean(np.abs(np.diff(np.asarray(train, dtype=np.float64))))
+        self.__position = stop
+        self.__next_fold += 1
+        return self
+
+
+def _fold_mean(values, fold, n_folds):
+    # Per-fold mean of the finite entries of values (NaN for folds without finite entries)
+    valid = np.isfinite(values)
+    sums = np.bincount(fold[valid], weights=values[valid], minlength=n_folds)
+    counts = np.bincount(fold[valid], minlength=n_folds)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return sums / counts
+
+
+def fold_scores(arrays: FoldArrays) -> dict:
+    # Compute every measure for each fold in a single vectorized pass over the concatenated folds
+    n_folds = arrays.n_folds
+    fold = arrays.fold
+    actual = arrays.actual
+    predicted = arrays.predicted
+
+    error = predicted - actual
+    abs_error = np.abs(error)
+    abs_actual = np.abs(actual)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Points with zero actual value are excluded from MAPE
+        ape = np.where(abs_actual > 0, abs_error / abs_actual, np.nan)
+        # sMAPE is zero where both actual and predicted values are zero
+        denominator = abs_actual + np.abs(predicted)
+        sape = np.where(denominator > 0, 2 * abs_error / denominator, 0.)
+
+    mae = _fold_mean(abs_error, fold, n_folds)
+    with np.errstate(invalid="ignore"):
+        covered = ((actual >= arrays.lower) & (actual <= arrays.upper)).astype(np.float64)
+    covered[np.isnan(arrays.lower) | np.isnan(arrays.upper)] = np.nan
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = {
+            "RMSE": np.sqrt(_fold_mean(error ** 2, fold, n_folds)),
+            "MAE": mae,
+            "MAPE": _fold_mean(ape, fold, n_folds),
+            "SMAPE": _fold_mean(sape, fold, n_folds),
+            "MASE": np.where(arrays.scale > 0, mae / arrays.scale, np.nan),
+            "COVERAGE": _fold_mean(covered, fold, n_folds)
+        }
+
+    # Folds with diverging forecasts get a high error score
+    failed = np.bincount(fold, weights=~np.isfinite(predicted), minlength=n_folds) > 0
+    for name in ["RMSE", "MAE", "MAPE", "SMAPE", "MASE"]:
+        scores[name][failed] = FAILED_FOLD_SCORE
+
+    return scores
+
+
+def summarise(values) -> (float, float):
+    # Mean and standard error across folds, ignoring folds for which the measure is undefined
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return None, None
+    mean = float(np.mean(values))
+    se = float(np.std(values, ddof=1) / np.sqrt(len(values))) if len(values) > 1 else None
+    return mean, se
+
+
+def compute_metrics(arrays: FoldArrays) -> dict:
+    # Returns {"RMSE": mean, "RMSE_se": standard error, "MAE": ..., ...}
+    out = {}
+    for name, values in fold_scores(arrays).items():
+        out[name], out[name + "_se"] = summarise(values)
+    return out
+
+
+def ranking_key(metric: str, nominal_coverage=NOMINAL_COVERAGE):
+    # Function mapping a score to a sorting key (lower is better)
+    metric = metric.upper()
+    assert metric in METRICS, f"Unknown metric {metric}"
+    if metric == "COVERAGE":
+        return lambda value: abs(value - nominal_coverage)
+    return lambda value: value
@@ -1,8 +1,9 @@
 from multiprocessing import cpu_count
 
-from joblib import Parallel, delayed
-
 from .performance_measures import rmse
+from .metrics import METRICS, ranking_key
+from .ensemble import pack_predictions
+from .array_data import ArrayData
 from .sarimax import SarimaxException
 
 
@@ -26,58 +27,127 @@ def get_sarima_configurations(p_values, d_values, q_values,
     return configurations
 
 
-def get_performance(data, model, cfg, performance_measure, transformation=None, splits=None, **kwargs):
-    m = model(data=data, config=cfg, transformation=transformation, **kwargs)
+def get_performance(data, model, cfg, performance_measure, transformation=None, splits=None,
+                    store_predictions=False, **kwargs):
+    # Returns mean score, its standard error, the dictionary of all test scores and the out-of-fold predictions
+    # (None unless store_predictions is True)
+    if isinstance(data, ArrayData):
+        # Data have already been transformed (once for the whole grid search)
+        m = model.from_array_data(data, config=cfg, **kwargs)
+    else:
+        m = model(data=data, config=cfg, transformation=transformation, **kwargs)
     if isinstance(performance_measure, str):
         if performance_measure.lower() == "aic":
             m.fit()
-            return m.aic, None
+            return m.aic, None, {}, None
+        # Built-in measures are computed together during cross validation
+        assert performance_measure.upper() in METRICS, f"Unknown performance measure {performance_measure}"
+        measure_name = performance_measure.upper()
+        performance_measure = rmse
     else:
-        assert splits is not None, "Missing splits"
-        m.cross_validate(splits=splits, performance_measure=performance_measure)
-        return m.test_performance[performance_measure.__name__.upper()], m.test_performance[
-            performance_measure.__name__.upper() + "_se"]
+        measure_name = performance_measure.__name__.upper()
+
+    assert splits is not None, "Missing splits"
+    m.cross_validate(splits=splits, performance_measure=performance_measure, store_predictions=store_predictions)
+    return m.test_performance[measure_name], m.test_performance[measure_name + "_se"], m.test_performance, \
+        m.oof_predictions
 
 
-def score_model(data, model, cfg, iteration_count, performance_measure, transformation=None, splits=None, debug=False, **kwargs):
+def score_model(data, model, cfg, iteration_count, performance_measure, transformation=None, splits=None, debug=False,
+                store_predictions=False, **kwargs):
     if (iteration_count + 1) % 100 == 0:
         print(f"Scoring configuration {iteration_count + 1}")
 
     try:
         result = get_performance(data, model, cfg, performance_measure, transformation=transformation, splits=splits,
-                                 convergence_warnings=debug, **kwargs)
+                                 store_predictions=store_predictions, convergence_warnings=debug, **kwargs)
     except SarimaxException:
         result = None
 
-    return {"cfg": cfg, "score_mean": result[0] if result is not None else None,
-            "score_se": result[1] if result is not None else None}
+    out = {"index": iteration_count, "cfg": cfg, "score_mean": result[0] if result is not None else None,
+           "score_se": result[1] if result is not None else None,
+           "scores": result[2] if result is not None else {}}
+    if store_predictions and result is not None and result[3] is not None:
+        out["oof_predictions"] = result[3]
+    return out
+
+
+def keep_predictions(results, top_n):
+    # Keep out-of-fold predictions (packed as float32 bytes) only for the first top_n results
+    for i, r in enumerate(results):
+        predictions = r.pop("oof_predictions", None)
+        if i < top_n and predictions is not None:
+            r["oof_predictions"] = pack_predictions(predictions)
+    return results
+
+
+def rank_results(results, metric):
+    # Re-rank grid search results according to a different measure among the stored scores (no refitting);
+    # score_mean and score_se of the returned results refer to the chosen measure
+    metric = metric.upper()
+    key = ranking_key(metric)
+    ranked = []
+    for r in results:
+        if r.get("scores", {}).get(metric) is not None:
+            ranked.append(dict(r, score_mean=r["scores"][metric], score_se=r["scores"][metric + "_se"]))
+    ranked.sort(key=lambda x: key(x["score_mean"]))
+    return ranked
 
 
 def grid_search(data=None, model=None, configurations=None,
                 performance_measure=rmse, splits=None,
                 parallel=False, n_jobs=cpu_count(), parallel_backend="loky",
-                debug=False, transformation=None,
+                debug=False, transformation=None, store_predictions=0,
+                callback=None, callback_batch_size=100,
                 **kwargs):
+    # store_predictions: number of best configurations for which out-of-fold predictions are kept in the results
+    # callback: function called with each batch of callback_batch_size scored (not yet ranked) results as soon as the
+    # batch is complete, e.g. to save them while the search is running. Each result has the index of its configuration.
     assert data is not None, "Missing data"
     assert model is not None, "Missing model"
     assert configurations is not None, "Missing list of configurations"
 
     print(f"Scoring {len(configurations)} configurations{' in parallel' if parallel else ''}...")
 
-    results = None
-
+    # Models that can be built from NumPy arrays share a single transformed copy of the data
+    if hasattr(model, "from_array_data") and not isinstance(data, ArrayData):
+        data = ArrayData.from_df(data, transformation=transformation)
+
+    batch_size = max(callback_batch_size, 1) if callback is not None else max(len(configurations), 1)
+    batches = [range(start, min(start + batch_size, len(configurations)))
+               for start in range(0, len(configurations), batch_size)]
+
+    def score_batch(executor, batch):
+        tasks = ((score_model, (data, model, configurations[i], i, performance_measure),
+                  dict(transformation=transformation, splits=splits, debug=debug,
+                       store_predictions=store_predictions > 0, **kwargs)) for i in batch)
+        if executor is None:
+            scored = [f(*args, **kw) for f, args, kw in tasks]
+        else:
+            from joblib import delayed
+            scored = executor(delayed(f)(*args, **kw) for f, args, kw in tasks)
+        if callback is not None:
+            callback([r for r in scored if r["score_mean"] is not None])
+        return scored
+
+    results = []
     if parallel:
-        # execute configs in parallel
-        executor = Parallel(n_jobs=n_jobs, backend=parallel_backend)
-        tasks = (delayed(score_model)(data, model, cfg, i, performance_measure, transformation=transformation,
-                                      splits=splits, debug=debug, **kwargs) for i, cfg in enumerate(configurations))
-        results = executor(tasks)
+        from joblib import Parallel
+
+        # execute configs in parallel (the pool of workers is shared by all the batches)
+        with Parallel(n_jobs=n_jobs, backend=parallel_backend) as executor:
+            for batch in batches:
+                results.extend(score_batch(executor, batch))
     else:
-        results = [score_model(data, model, cfg, i, performance_measure, transformation=transformation,
-                               splits=splits, debug=debug, **kwargs) for i, cfg in enumerate(configurations)]
+        for batch in batches:
+            results.extend(score_batch(None, batch))
 
     results = [r for r in results if r["score_mean"] is not None]
 
+    # Built-in measures requested by name are ranked according to their own criterion
+    if isinstance(performance_measure, str) and performance_measure.upper() in METRICS:
+        return keep_predictions(rank_results(results, performance_measure), store_predictions)
+
     # For some performance measures, pick max
     sort_descending = False
     if isinstance(performance_measure, str):
@@ -85,4 +155,4 @@ def grid_search(data=None, model=None, configurations=None,
             sort_descending = True
 
     results.sort(key=lambda x: x["score_mean"], reverse=sort_descending)
-    return results
+    return keep_predictions(results, store_predictions)
@@ -1,8 +1,8 @@
-from sklearn.metrics import mean_squared_error
 from numpy import sqrt
 
 
 def rmse(actual, predicted):
+    from sklearn.metrics import mean_squared_error
     try:
         score = sqrt(mean_squared_error(actual.iloc[:, 0], predicted))
     except ValueError as e:
@@ -0,0 +1,73 @@
+import os
+from multiprocessing import cpu_count
+
+ALLOWED_FORMATS = ["png", "svg", "pdf"]
+
+DIAGNOSTICS_FIGSIZE = (10, 8)
+
+# Figures owned by the current process, one for each kind of plot. They are cleared and reused for every model
+# rendered by the process instead of being created (and leaked) through pyplot.
+_figures = {}
+
+
+def get_figure(kind: str):
+    # Figures are created through the object-oriented API (no pyplot state, no GUI backend): saving them uses the
+    # non-interactive canvas matching the file format (Agg for PNG, SVG and PDF backends otherwise)
+    from matplotlib.figure import Figure
+
+    fig = _figures.get(kind)
+    if fig is None:
+        fig = Figure()
+        _figures[kind] = fig
+    else:
+        fig.clf()
+    return fig
+
+
+def render_model(name, data, config, output_dir, fmt="png", steps=7, exog=None, transformation="sqrt",
+                 diagnostics=True, dpi=100):
+    # Fit a model and write its forecast plot (and diagnostics). PNG and SVG are written as one file per plot,
+    # PDF as a multi-page file per model. Returns the list of written paths.
+    assert fmt in ALLOWED_FORMATS, f"Invalid format. Choose one among {ALLOWED_FORMATS}"
+    from .sarimax import Sarimax
+
+    model = Sarimax(data, config=config, transformation=transformation, convergence_warnings=False).fit()
+
+    figures = {"forecast": get_figure("forecast")}
+    model.plot_prediction_and_forecast(steps=steps, exog=exog, plot_residuals=True, fig=figures["forecast"])
+    if diagnostics:
+        figures["diagnostics"] = get_figure("diagnostics")
+        figures["diagnostics"].set_size_inches(DIAGNOSTICS_FIGSIZE)
+        model.plot_diagnostics(fig=figures["diagnostics"])
+
+    if fmt == "pdf":
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        path = os.path.join(output_dir, f"{name}.pdf")
+        with PdfPages(path) as pdf:
+            for fig in figures.values():
+                pdf.savefig(fig, dpi=dpi)
+        return [path]
+
+    paths = []
+    for kind, fig in figures.items():
+        path = os.path.join(output_dir, f"{name}_{kind}.{fmt}")
+        fig.savefig(path, dpi=dpi)
+        paths.append(path)
+    return paths
+
+
+def render_reports(jobs, output_dir, fmt="png", n_jobs=cpu_count(), parallel_backend="loky"):
+    # Render the plots of many models in parallel worker processes.
+    # jobs is a list of dicts with the arguments of render_model (name, data, config and optionally steps, exog,
+    # transformation, diagnostics, dpi).
+    assert fmt in ALLOWED_FORMATS, f"Invalid format. Choose one among {ALLOWED_FORMATS}"
+    if len(jobs) == 0:
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+
+    from joblib import Parallel, delayed
+
+    executor = Parallel(n_jobs=min(n_jobs, len(jobs)), backend=parallel_backend)
+    results = executor(delayed(render_model)(output_dir=output_dir, fmt=fmt, **job) for job in jobs)
+    return [path for paths in results for path in paths]
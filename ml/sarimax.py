@@ -1,11 +1,11 @@
 from warnings import catch_warnings, filterwarnings
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.statespace.sarimax import SARIMAX
 
+from .array_data import ArrayData, back_transform, back_transform_interval
 from .cross_validation import model_cross_validation
+from .ensemble import PREDICTIONS_DTYPE
 from .performance_measures import rmse
-from .viz import plot_model
 
 
 class SarimaxException(Exception):
@@ -48,8 +48,39 @@ class Sarimax:
         if self.transformation == "sqrt":
             self.endog = np.sqrt(self.endog)
 
+        self.index = self.endog.index
         self.endog_name = self.endog.columns[0]
         self.exog_names = self.exog.columns.to_list() if self.exog is not None else None
+        self._setup(config, relax_constraints, convergence_warnings)
+
+    @classmethod
+    def from_arrays(cls, endog, exog=None, index=None, transformation=None, config=None,
+                    endog_name=None, exog_names=None,
+                    relax_constraints=True,
+                    convergence_warnings=True):
+        # Fast constructor: endog (1-d) and exog (2-d) are NumPy arrays and endog is ALREADY transformed according
+        # to transformation (forecasts are still back-transformed). index is an optional reference to the date
+        # index of the data. No pandas object is created.
+        if transformation is not None:
+            assert transformation in ["sqrt"], "Invalid transformation"
+        assert endog is not None, "Must provide endogenous variable"
+
+        self = cls.__new__(cls)
+        self.transformation = transformation
+        self.endog = endog
+        self.exog = exog
+        self.index = index
+        self.endog_name = endog_name if endog_name is not None else "y"
+        self.exog_names = exog_names
+        self._setup(config, relax_constraints, convergence_warnings)
+        return self
+
+    @classmethod
+    def from_array_data(cls, data: ArrayData, config=None, **kwargs):
+        return cls.from_arrays(data.endog, exog=data.exog, index=data.index, transformation=data.transformation,
+                               config=config, endog_name=data.endog_name, exog_names=data.exog_names, **kwargs)
+
+    def _setup(self, config, relax_constraints, convergence_warnings):
         self.config = config
         self.arima_order = config["arima_order"] if "arima_order" in config else (1, 0, 0)
         self.seasonal_order = config["seasonal_order"] if "seasonal_order" in config else (0, 0, 0, 0)
@@ -62,6 +93,9 @@ class Sarimax:
         self.enforce_invertibility = not relax_constraints
         self.convergence_warnings = convergence_warnings
 
+        # statsmodels is imported when the first model is built
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+
         try:
             self.model = SARIMAX(endog=self.endog, exog=self.exog,
                                  order=self.arima_order, seasonal_order=self.seasonal_order,
@@ -82,6 +116,10 @@ class Sarimax:
         self.training_performance = {}  # Warning: if endog are transformed, measurement errors are not the
         # same units as the untransformed quantity
         self.test_performance = {}
+        self.oof_predictions = None
+
+    def is_array_backed(self):
+        return isinstance(self.endog, np.ndarray)
 
     def fit(self):
         if self.convergence_warnings:
@@ -98,21 +136,28 @@ class Sarimax:
         self.training_performance["RMSE"] = np.sqrt(training_mse)
         return self
 
-    def cross_validate(self, splits=None, performance_measure=rmse):
-
-        data = self.endog  # if transformation != None, data are tranformed
-        if self.exog is not None:
-            data = data.join(self.exog)
-
-        performance_mean, performance_se = model_cross_validation(data, splits,
-                                                                  performance_measure=performance_measure,
-                                                                  model=Sarimax,
-                                                                  config=self.config,
-                                                                  convergence_warnings=False,
-                                                                  transformed=self.transformation)
+    def cross_validate(self, splits=None, performance_measure=rmse, store_predictions=False):
+
+        # Arrays are extracted once (endog is already transformed); fold models are built from array slices
+        data = ArrayData(np.asarray(self.endog).reshape(-1),
+                         exog=np.asarray(self.exog) if self.exog is not None else None,
+                         index=self.index, transformation=self.transformation,
+                         endog_name=self.endog_name, exog_names=self.exog_names)
+
+        # All available performance measures (and their standard errors) are stored in test_performance
+        scores, predictions = model_cross_validation(data, splits,
+                                                     performance_measure=performance_measure,
+                                                     model=Sarimax,
+                                                     config=self.config,
+                                                     convergence_warnings=False,
+                                                     return_metrics=True,
+                                                     return_predictions=True)
         self.cross_validated = True
-        self.test_performance[performance_measure.__name__.upper()] = performance_mean
-        self.test_performance[performance_measure.__name__.upper() + "_se"] = performance_se
+        self.test_performance.update(scores)
+
+        # Keep out-of-fold predictions (e.g. to fit ensemble weights later)
+        if store_predictions:
+            self.oof_predictions = predictions.astype(PREDICTIONS_DTYPE)
         return self
 
     def get_summary(self):
@@ -120,11 +165,13 @@ class Sarimax:
 
         return self.fitted_model.summary()
 
-    def plot_diagnostics(self):
+    def plot_diagnostics(self, fig=None):
         assert self.trained, "Untrained model"
+        if fig is not None:
+            fig.clf()
         with catch_warnings():
             filterwarnings("ignore")
-            self.fitted_model.plot_diagnostics()
+            return self.fitted_model.plot_diagnostics(fig=fig)
 
     def forecast(self, steps=1, exog=None):
         assert self.trained, "Untrained model"
@@ -133,36 +180,64 @@ class Sarimax:
         forecast_df = forecast.summary_frame()
         forecast_df.columns = ["forecast", "se", "lower_ci", "upper_ci"]
 
+        # The standard error of the back-transformed forecast is approximated with the delta method
+        # (se of y^2 ~ 2 |y| se of y); the interval bounds are back-transformed as in forecast_arrays
         if self.transformation == "sqrt":
-            forecast_df = np.power(forecast_df, 2)
+            forecast_df["se"] = 2 * np.abs(forecast_df["forecast"]) * forecast_df["se"]
+        forecast_df["forecast"] = back_transform(forecast_df["forecast"], self.transformation)
+        forecast_df["lower_ci"], forecast_df["upper_ci"] = back_transform_interval(
+            forecast_df["lower_ci"], forecast_df["upper_ci"], self.transformation)
+
+        # Models built from arrays: restore the dates following the ones of the data
+        if self.is_array_backed() and self.index is not None:
+            forecast_df.index = future_dates(self.index, steps)
         return forecast_df
 
+    def forecast_arrays(self, steps=1, exog=None):
+        # Forecast, lower and upper bound of the 95% confidence interval as (back-transformed) NumPy arrays
+        assert self.trained, "Untrained model"
+
+        forecast = self.fitted_model.get_forecast(steps=steps, exog=exog)
+        prediction = np.asarray(forecast.predicted_mean)
+        confint = np.asarray(forecast.conf_int(alpha=0.05))
+        lower, upper = back_transform_interval(confint[:, 0], confint[:, 1], self.transformation)
+        return back_transform(prediction, self.transformation), lower, upper
+
     def get_prediction_and_forecast_df(self, steps=1, exog=None):
         assert self.trained, "Untrained model"
 
         forecast_df = self.forecast(steps=steps, exog=exog)
-        fit_result_df = self.endog.copy()
-        fit_result_df.columns = ["data"]
-        fit_result_df["fitted"] = self.fitted_model.fittedvalues
+        if self.is_array_backed():
+            fit_result_df = pd.DataFrame({"data": self.endog}, index=self.index)
+        else:
+            fit_result_df = self.endog.copy()
+            fit_result_df.columns = ["data"]
+        fit_result_df["fitted"] = np.asarray(self.fitted_model.fittedvalues)
 
-        if self.transformation == "sqrt":
-            fit_result_df = np.power(fit_result_df, 2)
+        fit_result_df = back_transform(fit_result_df, self.transformation)
         return fit_result_df.join(forecast_df.iloc[:, [0, 2, 3]], how="outer")
 
-    def plot_prediction_and_forecast(self, steps=1, exog=None, plot_residuals=False):
+    def plot_prediction_and_forecast(self, steps=1, exog=None, plot_residuals=False, fig=None):
         assert self.trained, "Untrained model"
+        from .viz import plot_model
 
         fit_result_df = self.get_prediction_and_forecast_df(steps=steps, exog=exog)
-        residuals = self.fitted_model.resid if plot_residuals else None
-
-        if self.transformation == "sqrt" and plot_residuals:
-            residuals = np.power(residuals, 2)
+        residuals = None
+        if plot_residuals:
+            # Residuals in the units of the quantity: back-transformed data minus back-transformed fitted values
+            # (residuals of the transformed data are not squared, which would lose their sign)
+            residuals = self.fitted_model.resid
+            if self.is_array_backed():
+                residuals = pd.Series(residuals, index=self.index)
+            if self.transformation is not None:
+                residuals = (fit_result_df["data"] - fit_result_df["fitted"]).loc[residuals.index]
 
         title = f"SARIMAX {self.config}"
         return plot_model(fit_result_df, quantity=self.endog_name,
                           title=title,
                           residuals=residuals,
-                          confint="95%")
+                          confint="95%",
+                          fig=fig)
 
     def __str__(self):
         s = f"SARIMAX {self.config}"
@@ -179,3 +254,8 @@ class Sarimax:
         if self.trained:
             s += ", trained"
         return s
+
+
+def future_dates(index, steps):
+    freq = index.freq if index.freq is not None else pd.infer_freq(index)
+    return pd.date_range(start=index[-1], periods=steps + 1, freq=freq)[1:]
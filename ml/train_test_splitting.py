@@ -1,6 +1,3 @@
-from sklearn.model_selection import TimeSeriesSplit
-
-
 def split_train_test_last_n(data, n=1):
     # Split dataset into train/test sets for walk-forward validation
     # Default leaves last element as test set
@@ -9,6 +6,7 @@ def split_train_test_last_n(data, n=1):
 
 class TsCvSplitter:
     def __init__(self, n_splits=10, max_test_size=None):
+        from sklearn.model_selection import TimeSeriesSplit
         self.n_splits = n_splits
         self.max_test_size = max_test_size
         self.__splitter = TimeSeriesSplit(n_splits=n_splits)
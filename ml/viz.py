@@ -1,8 +1,19 @@
 import matplotlib.pyplot as plt
 
 
-def plot_model(fit_result_df, quantity=None, title=None, residuals=None, confint="95%"):
-    if residuals is not None:
+def plot_model(fit_result_df, quantity=None, title=None, residuals=None, confint="95%", fig=None):
+    # If fig is provided (e.g. when rendering many plots in batch), it is cleared and reused instead of creating a
+    # new figure through pyplot
+    if fig is not None:
+        fig.clf()
+        fig.set_size_inches((8, 5) if residuals is not None else (8, 3))
+        if residuals is not None:
+            axes = fig.subplots(2, 1,
+                                gridspec_kw={'height_ratios': [3, 1]},
+                                sharex=True)
+        else:
+            axes = [fig.subplots(1, 1)]
+    elif residuals is not None:
         fig, axes = plt.subplots(2, 1,
                                  figsize=(8, 5),
                                  gridspec_kw={'height_ratios': [3, 1]},
@@ -51,6 +62,6 @@ def plot_model(fit_result_df, quantity=None, title=None, residuals=None, confint
     for ax in axes:
         ax.grid(which="major", alpha=0.5)
         ax.grid(which="minor", alpha=0.2)
-    plt.tight_layout()
+    fig.tight_layout()
 
     return fig, axes
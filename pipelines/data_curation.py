@@ -1,9 +1,7 @@
 import argparse
 import sys, os
-import time
 from collections import OrderedDict
 import pandas as pd
-from pymongo.errors import ConfigurationError
 
 ROOT_FOLDER = os.path.dirname(
     os.path.dirname(
@@ -12,29 +10,70 @@ ROOT_FOLDER = os.path.dirname(
 sys.path.insert(0, ROOT_FOLDER)
 
 from collectors import validation_utils
-from data.models import *
-from data.dao import *
-
-
-def main(reprocess_all=False):
+from data.models import CuratedData
+from data.schema import WEATHER_QUANTITIES, WEIGHTED_WEATHER
+from data.batches import CuratedDataBatch
+from data.mongo_wrapper import get_client
+from data.dao import ALLOWED_STORAGE, CuratedDataMongoDao, ProvinceMySqlDao, ProvinceDataMySqlDao, \
+    RegionRiskMySqlDao, VaccinesAdministrationDataMySqlDao, HolidayMySqlDao, StringencyIndexMySqlDao, \
+    DailyWeatherMySqlDao, WeightedWeatherMySqlDao, CuratedDataLocalDao, ProvinceLocalDao, ProvinceDataLocalDao, \
+    RegionRiskLocalDao, VaccinesAdministrationDataLocalDao, HolidayLocalDao, StringencyIndexLocalDao, \
+    DailyWeatherLocalDao, WeightedWeatherLocalDao
+
+
+def relabel_age_group(g):
+    labels = [0, 1, 2]
+    g = g.strip()
+    if g == "90+":
+        return labels[2]
+    age_range = g.split("-")
+    if int(age_range[1]) < 30:
+        return labels[0]
+    elif int(age_range[0]) >= 60:
+        return labels[2]
+    elif int(age_range[0]) >= 30 and int(age_range[1]) < 60:
+        return labels[1]
+
+
+def daily_doses(chunks) -> pd.DataFrame:
+    # Sum of first and second doses by administration date (rows) and relabelled age group (columns).
+    # VaccinesAdministrationData has many rows per day (one per supplier and age group): chunks of records are
+    # aggregated as they are read, so that memory usage does not grow with the length of the date range.
+    # chunks are DataFrames with the columns of VaccinesAdministrationData.to_df
+    partial = []
+    for df in chunks:
+        df["age_group"] = df["age_group"].apply(relabel_age_group)
+        partial.append(df.groupby(["administration_date", "age_group"])[["first_dose", "second_dose"]].sum())
+    if len(partial) == 0:
+        return pd.DataFrame()
+    df = pd.concat(partial).groupby(level=[0, 1]).sum()
+    return df.unstack("age_group", fill_value=0)
+
+
+def main(reprocess_all=False, storage="default"):
     # # Ingestion stage
 
-    print("Connecting to DB")
-    success = False
-    n_retries = 0
-    while n_retries <= 3:
+    # Instantiate DAOs according to storage option
+    assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
+    if storage == "default":
+        print("Connecting to DB")
+        # The shared client is created (with retries) once; DAOs reuse it
+        from pymongo.errors import PyMongoError
         try:
-            cddao = CuratedDataMongoDao()
-            success = True
-            break
-        except ConfigurationError:
-            n_retries += 1
-            print(f"Connection attempt {n_retries} failed. Retrying in 3 s...")
-            time.sleep(3)
-
-    if not success:
-        print("Connection to DB failed.")
-        exit()
+            get_client()
+        except PyMongoError:
+            print("Connection to DB failed.")
+            exit()
+
+        cddao = CuratedDataMongoDao()
+        pdao, pddao, rrdao = ProvinceMySqlDao(), ProvinceDataMySqlDao(), RegionRiskMySqlDao()
+        vadao, hdao, sidao = VaccinesAdministrationDataMySqlDao(), HolidayMySqlDao(), StringencyIndexMySqlDao()
+        dwdao, wwdao = DailyWeatherMySqlDao(), WeightedWeatherMySqlDao()
+    else:
+        cddao = CuratedDataLocalDao()
+        pdao, pddao, rrdao = ProvinceLocalDao(), ProvinceDataLocalDao(), RegionRiskLocalDao()
+        vadao, hdao, sidao = VaccinesAdministrationDataLocalDao(), HolidayLocalDao(), StringencyIndexLocalDao()
+        dwdao, wwdao = DailyWeatherLocalDao(), WeightedWeatherLocalDao()
 
     # Define some column names
     doses_columns = ['first_doses_ag0',
@@ -82,22 +121,24 @@ def main(reprocess_all=False):
 
     # Read static information tables
     print("Retrieving population from Province")
-    pat_population = ProvinceMySqlDao().get_population("PAT")
+    pat_population = pdao.get_population("PAT")
 
     # Read data tables
-    avail_sources = 4  # Do not count Holiday
+    avail_sources = 4  # Do not count Holiday, DailyWeather and WeightedWeather
     print("Retrieving ProvinceData")
-    df_provdata = ProvinceData.to_df(ProvinceDataMySqlDao().get_by_date(date_from, date_to))
+    df_provdata = pddao.get_by_date_df(date_from, date_to)
     print("Retrieving RegionRisk")
-    df_risk = RegionRisk.to_df(RegionRiskMySqlDao().get_by_date(date_from, date_to))
+    df_risk = rrdao.get_by_date_df(date_from, date_to)
     print("Retrieving VaccinesAdministrationData")
-    df_vaxadm = VaccinesAdministrationData.to_df(VaccinesAdministrationDataMySqlDao().get_by_date(date_from, date_to))
+    df_vax = daily_doses(vadao.iter_by_date_df(date_from, date_to))
     print("Retrieving Holiday")
-    df_holiday = Holiday.to_df(HolidayMySqlDao().get_by_date(date_from, date_to))
+    df_holiday = hdao.get_by_date_df(date_from, date_to)
     print("Retrieving StringencyIndex")
-    df_stringency = StringencyIndex.to_df(StringencyIndexMySqlDao().get_by_date(date_from, date_to))
-    # print("Retrieving average temperature from WeatherData")
-    # df_temperature = WeatherData.to_df(WeatherDataMySqlDao().get_average_temperature(date_from, date_to))
+    df_stringency = sidao.get_by_date_df(date_from, date_to)
+    print("Retrieving DailyWeather")
+    df_weather = dwdao.get_by_date_df(date_from, date_to)
+    print("Retrieving WeightedWeather")
+    df_weighted = wwdao.get_by_date_df("PAT", date_from, date_to)
 
     # Check: proceed only if all data are available
     sources = 0
@@ -105,12 +146,10 @@ def main(reprocess_all=False):
         sources += 1
     if len(df_risk) > 0:
         sources += 1
-    if len(df_vaxadm) > 0:
+    if len(df_vax) > 0:
         sources += 1
     if len(df_stringency) > 0:
         sources += 1
-    # if len(df_temperature) > 0:
-    #     sources += 1
 
     if sources != avail_sources:
         print("No data to be processed")
@@ -120,27 +159,7 @@ def main(reprocess_all=False):
 
     # # Data manipulation
     #
-    # ## Vaccine data: relabel age groups and pivot
-
-    def relabel_age_group(g):
-        labels = [0, 1, 2]
-        g = g.strip()
-        if g == "90+":
-            return labels[2]
-        age_range = g.split("-")
-        if int(age_range[1]) < 30:
-            return labels[0]
-        elif int(age_range[0]) >= 60:
-            return labels[2]
-        elif int(age_range[0]) >= 30 and int(age_range[1]) < 60:
-            return labels[1]
-
-    df_vaxadm = df_vaxadm.drop(columns=["supplier", "region", "male", "female"])
-    df_vaxadm.age_group = df_vaxadm.age_group.apply(relabel_age_group)
-
-    df_vax = df_vaxadm.pivot_table(index="administration_date", values=["first_dose", "second_dose"],
-                                   columns="age_group",
-                                   aggfunc='sum', fill_value=0)
+    # ## Vaccine data: daily doses by age group (aggregated while reading)
     df_vax["new_first_doses"] = df_vax["first_dose"].sum(axis=1)
     df_vax["new_second_doses"] = df_vax["second_dose"].sum(axis=1)
     df_vax.columns = ["new_first_doses_ag0", "new_first_doses_ag1", "new_first_doses_ag2",
@@ -161,6 +180,18 @@ def main(reprocess_all=False):
     for d in tables_to_join[1:]:
         df = df.join(d)
 
+    # ## Add average weather of the linked stations (NA on the days without weather data)
+    if len(df_weather) > 0:
+        df = df.join(df_weather.set_index("date")[WEATHER_QUANTITIES])
+    else:
+        df[WEATHER_QUANTITIES] = float("nan")
+
+    # ## Add weather weighted by the population of the municipalities linked to the stations
+    if len(df_weighted) > 0:
+        df = df.join(df_weighted.set_index("date")[WEIGHTED_WEATHER])
+    else:
+        df[WEIGHTED_WEATHER] = float("nan")
+
     # ## Fix columns
     df = df.drop(columns=["name", "region"]).rename(columns={"value": "stringency_index"})
 
@@ -227,7 +258,7 @@ def main(reprocess_all=False):
 
     # # Save
     print(f"Saving {len(df)} records")
-    data = CuratedData.from_df(df.reset_index(drop=False))
+    data = CuratedDataBatch.from_df(df.reset_index(drop=False))
     cddao.save(data)
 
     print("Done")
@@ -237,6 +268,8 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Data validation and integration pipeline.')
     parser.add_argument('-r', '--reprocess-all', dest="reprocess_all", action="store_true",
                         help='clear current curated data table and reprocess all data, otherwise append new data only')
+    parser.add_argument('--storage', type=str, default="default", choices=ALLOWED_STORAGE,
+                        help='where data are read and saved: default (MySQL and MongoDB) or local (Parquet files)')
     args = parser.parse_args()
 
-    main(reprocess_all=args.reprocess_all)
+    main(reprocess_all=args.reprocess_all, storage=args.storage)
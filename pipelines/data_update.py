@@ -8,11 +8,19 @@ ROOT_FOLDER = os.path.dirname(
 
 sys.path.insert(0, ROOT_FOLDER)
 
-from updaters import *
+from updaters import get_updaters, WeatherDataUpdater
+from updaters.weather_data_updater import DEFAULT_CONCURRENCY
+from collectors.http_client import http_client
+from data.dao import ALLOWED_STORAGE, WatermarkMySqlDao, WatermarkLocalDao
 
 
-def main(selected_updaters=None, skip=None, all=False, debug=False):
+def main(selected_updaters=None, skip=None, all=False, debug=False, refetch_days=0, storage="default",
+         weather_concurrency=DEFAULT_CONCURRENCY, weather_rate=None):
     execution_timestamp = Timestamp.utcnow()
+    avail_updaters = get_updaters(storage)
+    # Weather stations are fetched weather_concurrency at a time, with at most weather_rate requests per second
+    avail_updaters["WeatherData"] = WeatherDataUpdater(storage=storage, concurrency=weather_concurrency,
+                                                       requests_per_second=weather_rate)
     success = {}
 
     # Pick chosen updaters (each option overrides the previous)
@@ -40,30 +48,54 @@ def main(selected_updaters=None, skip=None, all=False, debug=False):
     f.flush()
 
     ti = Timestamp("now")
+
+    # Most recent dates of the entities of all the chosen updaters, read in one round trip
+    wdao = WatermarkMySqlDao() if storage == "default" else WatermarkLocalDao()
+    watermarks = wdao.get_watermarks([updaters[u].entity for u in updaters])
+
     # Orchestrates all updaters
 
     for u in updaters:
         tci = Timestamp("now")
+        http_before = dict(http_client.stats)
         print("Running updater for entity " + u, end="")
         status = "failed"
         n_records = 0
         if debug:
-            n_records = updaters[u].run()
+            n_records = updaters[u].run(refetch_days=refetch_days, watermarks=watermarks)
             status = "success"
         else:
             try:
-                n_records += updaters[u].run()
+                n_records += updaters[u].run(refetch_days=refetch_days, watermarks=watermarks)
                 status = "success"
             except:
                 status = "failed"
         tcf = Timestamp("now")
+
+        # Insertion throughput (if reported by the updater)
+        throughput = ""
+        insert_status = getattr(updaters[u], "insert_status", None)
+        if status == "success" and insert_status is not None and insert_status.get("rows_per_second"):
+            throughput = f" | insert rate: {insert_status['rows_per_second']:.0f} rows/s"
+            if "updated" in insert_status:
+                throughput += f" | inserted: {insert_status['inserted']}, updated: {insert_status['updated']}, " \
+                              f"unchanged: {insert_status['unchanged']}"
+            elif "upserted" in insert_status:
+                throughput += f" | upserted: {insert_status['upserted']} (affected rows: {insert_status['affected']})"
+
+        # Traffic of the collectors (responses not modified since the previous run are served from the HTTP cache)
+        http = dict((k, http_client.stats[k] - http_before[k]) for k in http_client.stats)
+        if http["requests"] > 0:
+            throughput += f" | http: {http['requests']} requests, {http['not_modified']} not modified, " \
+                          f"{http['bytes_received'] / 1e6:.2f} MB received"
+
         if status == "success":
-            print(f" --> {status} | records: {n_records} | elapsed time: {tcf - tci}")
+            print(f" --> {status} | records: {n_records} | elapsed time: {tcf - tci}{throughput}")
         elif status == "failed":
             print(" --> failed")
 
         # Write log
-        f.write(f"{u} --> status: {status} | records: {n_records} | elapsed time: {tcf - tci}\n")
+        f.write(f"{u} --> status: {status} | records: {n_records} | elapsed time: {tcf - tci}{throughput}\n")
         f.flush()
 
     tf = Timestamp("now")
@@ -86,6 +118,16 @@ if __name__ == '__main__':
                         help='run all updaters')
     parser.add_argument('--debug', action="store_true",
                         help='run in debug mode (throws exceptions)')
+    parser.add_argument('--storage', type=str, default="default", choices=ALLOWED_STORAGE,
+                        help='where data are saved: default (MySQL) or local (Parquet files)')
+    parser.add_argument('--refetch-days', dest="refetch_days", type=int, default=0,
+                        help='collect again the last N days already stored and update them (upsert)')
+    parser.add_argument('--weather-concurrency', dest="weather_concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help='weather stations fetched concurrently by the WeatherData updater')
+    parser.add_argument('--weather-rate', dest="weather_rate", type=float, default=None,
+                        help='maximum requests per second to the weather data server (no limit by default)')
     args = parser.parse_args()
 
-    main(selected_updaters=args.updaters, skip=args.skip, all=args.all, debug=args.debug)
+    main(selected_updaters=args.updaters, skip=args.skip, all=args.all, debug=args.debug,
+         refetch_days=args.refetch_days, storage=args.storage, weather_concurrency=args.weather_concurrency,
+         weather_rate=args.weather_rate)
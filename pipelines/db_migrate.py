@@ -0,0 +1,51 @@
+import argparse
+import sys, os
+
+sys.path.insert(0,
+                os.path.dirname(
+                    os.path.dirname(
+                        os.path.abspath(__file__))))
+
+from data.mysql_wrapper import MySqlDB
+from data.migrations import migrate, check_schemas, partition_monthly, PARTITIONED_TABLES, PARTITION_MONTHS_AHEAD
+
+
+def check():
+    # Compare the tables created by the DDL scripts with the schemas of the models, without connecting to the database
+    mismatches = check_schemas()
+    for mismatch in mismatches:
+        print(mismatch)
+    print("DDL scripts match the schemas." if len(mismatches) == 0 else f"{len(mismatches)} tables do not match.")
+    return len(mismatches) == 0
+
+
+def main(target=None, partition=False, months_ahead=PARTITION_MONTHS_AHEAD):
+    # Bring an existing MySQL database to the current schema (and, if partition, create or extend the monthly
+    # partitions)
+    db = MySqlDB()
+    with db.connect():
+        applied = migrate(db, target=target)
+        print(f"{len(applied)} migration{'s' if len(applied) != 1 else ''} applied")
+        if partition:
+            for table in PARTITIONED_TABLES:
+                n_partitions = partition_monthly(db, table, months_ahead=months_ahead)
+                print(f"{table}: {n_partitions} monthly partitions created")
+    print("Done.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply the pending schema migrations to the MySQL database.')
+    parser.add_argument('--target', type=int, default=None,
+                        help='apply migrations up to this version (all by default)')
+    parser.add_argument('--partition', action="store_true",
+                        help='partition the largest time-series tables by month, or add the partitions of the next '
+                             'months if they are already partitioned')
+    parser.add_argument('--months-ahead', dest="months_ahead", type=int, default=PARTITION_MONTHS_AHEAD,
+                        help='monthly partitions created after the current month')
+    parser.add_argument('--check', action="store_true",
+                        help='only check that the DDL scripts match the schemas of the models (no database needed)')
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check() else 1)
+    main(target=args.target, partition=args.partition, months_ahead=args.months_ahead)
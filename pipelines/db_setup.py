@@ -1,3 +1,4 @@
+import argparse
 import sys, os
 from pandas import Timestamp
 
@@ -6,10 +7,12 @@ sys.path.insert(0,
                     os.path.dirname(
                         os.path.abspath(__file__))))
 
-from collectors import *
+from collectors import ProvinceCollector, MunicipalityCollector
 from pipelines import weather_setup
-from data.dao import *
+from data.dao import ALLOWED_STORAGE, ProvinceMySqlDao, MunicipalityMySqlDao, ProvinceLocalDao, MunicipalityLocalDao
 from data.mysql_wrapper import MySqlDB
+from data.migrations import migrate, partition_monthly, PARTITIONED_TABLES
+from data.cache import reference_cache
 
 
 def collect_and_save(collector, dao) -> int:
@@ -18,18 +21,32 @@ def collect_and_save(collector, dao) -> int:
     return len(data)
 
 
-def main():
+def main(storage="default", partition=False):
     ti = Timestamp("now")
+    assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
 
-    # Creates all tables in the db
-    db = MySqlDB()
-    with db.connect():
-        print("Creating tables")
-        db.create_default_tables()
+    if storage == "default":
+        # Creates all tables in the db
+        db = MySqlDB()
+        with db.connect():
+            print("Creating tables")
+            db.create_default_tables()
+            # Evolve the tables to the current schema
+            migrate(db)
+            if partition:
+                for table in PARTITIONED_TABLES:
+                    print(f"Partitioning {table} by month")
+                    partition_monthly(db, table)
+        # Reference data cached before the tables were created are not valid anymore
+        reference_cache.invalidate()
 
-    # Runs all static data collector and stores data via DAOs
-    entities = {"Province": [ProvinceCollector(), ProvinceMySqlDao()],
-                  "Municipality": [MunicipalityCollector(), MunicipalityMySqlDao()]}
+        # Runs all static data collector and stores data via DAOs
+        entities = {"Province": [ProvinceCollector(), ProvinceMySqlDao()],
+                    "Municipality": [MunicipalityCollector(), MunicipalityMySqlDao()]}
+    else:
+        # Local files are created when data are saved
+        entities = {"Province": [ProvinceCollector(), ProvinceLocalDao()],
+                    "Municipality": [MunicipalityCollector(), MunicipalityLocalDao()]}
     success = {}
 
     for entity in entities:
@@ -42,7 +59,7 @@ def main():
     # Run weather setup
     tci = Timestamp("now")
     print("Running weather setup script (WeatherStation, WeatherStationLink)")
-    n_stations, n_links = weather_setup.main()
+    n_stations, n_links = weather_setup.main(storage=storage)
     tcf = Timestamp("now")
     success["WeatherSetup"] = [f"{n_stations} stations, {n_links} links", tcf - tci]
 
@@ -55,4 +72,11 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Create the database and collect static data.')
+    parser.add_argument('--storage', type=str, default="default", choices=ALLOWED_STORAGE,
+                        help='where data are saved: default (MySQL) or local (Parquet files)')
+    parser.add_argument('--partition', action="store_true",
+                        help='partition the largest time-series tables by month (MySQL only)')
+    args = parser.parse_args()
+
+    main(storage=args.storage, partition=args.partition)
@@ -1,9 +1,8 @@
 import json
 import sys, os
 import argparse
-import time
 
-from pymongo.errors import ConfigurationError
+import pandas as pd
 
 ROOT_FOLDER = os.path.dirname(
     os.path.dirname(
@@ -12,11 +11,15 @@ ROOT_FOLDER = os.path.dirname(
 sys.path.insert(0, ROOT_FOLDER)
 
 from ml import Sarimax
-from data.models import *
-from data.dao import *
+from ml.ensemble import unpack_predictions, fit_ensemble_weights, ensemble_residuals, ensemble_forecast
+from data.batches import ForecastBatch
+from data.mongo_wrapper import get_client
+from data.snapshots import CuratedDataSnapshot
+from data.dao import ALLOWED_STORAGE, CuratedDataMongoDao, ForecastMongoDao, HyperparameterTuningResultMongoDao, \
+    CuratedDataLocalDao, ForecastLocalDao, HyperparameterTuningResultLocalDao
 
 
-def main(configuration_path, steps=7):
+def main(configuration_path, steps=7, storage="default"):
     # Find and read configuration file
     if os.path.isfile(configuration_path):
         print(f"Reading configuration file at {configuration_path}")
@@ -26,27 +29,29 @@ def main(configuration_path, steps=7):
         raise FileNotFoundError("Cannot find specified configuration file")
 
     # # Ingestion
-    print("Connecting to DB")
-    success = False
-    n_retries = 0
-    while n_retries <= 3:
+    # Instantiate DAOs according to storage option
+    assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
+    if storage == "default":
+        print("Connecting to DB")
+        # The shared client is created (with retries) once; DAOs reuse it
+        from pymongo.errors import PyMongoError
         try:
-            cddao = CuratedDataMongoDao()
-            fdao = ForecastMongoDao()
-            htrdao = HyperparameterTuningResultMongoDao()
-            success = True
-            break
-        except ConfigurationError:
-            n_retries += 1
-            print(f"Connection attempt {n_retries} failed. Retrying in 3 s...")
-            time.sleep(3)
-
-    if not success:
-        print("Connection to DB failed.")
-        exit()
+            get_client()
+        except PyMongoError:
+            print("Connection to DB failed.")
+            exit()
+
+        cddao = CuratedDataMongoDao()
+        fdao = ForecastMongoDao()
+        htrdao = HyperparameterTuningResultMongoDao()
+    else:
+        cddao = CuratedDataLocalDao()
+        fdao = ForecastLocalDao()
+        htrdao = HyperparameterTuningResultLocalDao()
 
     print("Ingesting data")
-    df = CuratedData.to_df(cddao.get_by_date()).set_index("date")
+    # Daily data (one row per day), from the local snapshot of the current version of curated data
+    df = CuratedDataSnapshot(cddao).load()
 
     # Check data
     print("Date range:", df.index[0].date(), "-", df.index[-1].date())
@@ -54,9 +59,6 @@ def main(configuration_path, steps=7):
 
     # # Preprocessing
 
-    # set daily frequency in datetime index (ensures there is one row per day)
-    df = df.asfreq("D")
-
     # Handle NA in the last rows if data are missing
     # Warn if there are NA (except for risk)
     cols_with_na = df.isna().sum()
@@ -66,14 +68,15 @@ def main(configuration_path, steps=7):
                 f"Warning: variable '{variable}' has {na_count} missing "
                 f"value{'s' if na_count > 1 else ''} --> forward fill")
     # Fill NA with last known value
-    df = df.fillna(method="ffill")
+    df = df.ffill()
 
     for m in models:
         # Get best configuration for variable
         print("Getting best configuration for variable", m["output"])
         if len(m["regressors"]) > 0:
             print("with regressors", m["regressors"])
-        htr = htrdao.get_most_recent_record(m["output"], m["regressors"])
+        # Only the results of the ensemble members are read
+        htr = htrdao.get_most_recent_record(m["output"], m["regressors"], top_k=m.get("ensemble_size", 1))
         if len(htr) == 0:
             print("Could not find the configuration for the current model.",
                   "Make sure hyperparameter tuning has been run and the corresponding model configuration",
@@ -94,28 +97,48 @@ def main(configuration_path, steps=7):
             x = None
             data = y
 
-        # Extract best configuration from htr result
-        model_best_config = htr.results[0]["cfg"]
-
-        print("Fitting model for variable", m["output"])
-        model = Sarimax(data, config=model_best_config, convergence_warnings=False, transformation="sqrt")
-        model.fit()
-        print(model)
-
         exog_scenario = None
         if x is not None:
             # Scenario: constant future values for exog
             dtidx = pd.date_range(start=y.index[-1] + pd.Timedelta(days=1), end=y.index[-1] + pd.Timedelta(days=7))
             scenario = pd.DataFrame(index=dtidx)
-            exog_scenario = scenario.join(x, how="outer").fillna(method="ffill").reindex(dtidx)
+            exog_scenario = scenario.join(x, how="outer").ffill().reindex(dtidx)
+
+        # Ensemble members: best configurations for which out-of-fold predictions were stored during tuning
+        ensemble_size = m.get("ensemble_size", 1)
+        members = [r for r in htr.results[:ensemble_size] if "oof_predictions" in r]
+
+        if ensemble_size > 1 and len(members) > 1 and "oof_actual" in htr.log:
+            # Fit weights on the stored out-of-fold predictions (no additional cross validation)
+            oof_predictions = [unpack_predictions(r["oof_predictions"]) for r in members]
+            oof_actual = unpack_predictions(htr.log["oof_actual"])
+            weights = fit_ensemble_weights(oof_predictions, oof_actual)
+            print(f"Fitting ensemble of {len(members)} models for variable", m["output"])
+            for r, w in zip(members, weights):
+                print(f"   SARIMAX {r['cfg']} | weight: {w:.3f}")
+
+            print("Forecasting variable", m["output"])
+            # Confidence intervals from the out-of-fold errors of the weighted ensemble
+            fcast, _ = ensemble_forecast(Sarimax, data, [r["cfg"] for r in members], weights, steps=steps,
+                                         exog=exog_scenario if x is not None else None,
+                                         residuals=ensemble_residuals(oof_predictions, oof_actual, weights),
+                                         convergence_warnings=False, transformation="sqrt")
+        else:
+            # Extract best configuration from htr result
+            model_best_config = htr.results[0]["cfg"]
+
+            print("Fitting model for variable", m["output"])
+            model = Sarimax(data, config=model_best_config, convergence_warnings=False, transformation="sqrt")
+            model.fit()
+            print(model)
 
-        print("Forecasting variable", m["output"])
-        fcast = model.forecast(steps=steps, exog=exog_scenario if x is not None else None)
+            print("Forecasting variable", m["output"])
+            fcast = model.forecast(steps=steps, exog=exog_scenario if x is not None else None)
         fcast["output_variable"] = m["output"]
         fcast.index.name = "date"
 
         print("Saving results for variable", m["output"])
-        data = Forecast.from_df(fcast.reset_index(drop=False))
+        data = ForecastBatch.from_df(fcast.reset_index(drop=False))
         fdao.save(data)
 
     print("Done.")
@@ -128,6 +151,8 @@ if __name__ == '__main__':
                         help='path to configuration file (JSON)')
     parser.add_argument('--steps', type=int, default=7,
                         help='how many steps in the future')
+    parser.add_argument('--storage', type=str, default="default", choices=ALLOWED_STORAGE,
+                        help='where data are read and saved: default (MongoDB) or local (Parquet files)')
     args = parser.parse_args()
 
-    main(args.configuration_path, steps=args.steps)
+    main(args.configuration_path, steps=args.steps, storage=args.storage)
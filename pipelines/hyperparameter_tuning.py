@@ -1,5 +1,4 @@
 import sys, os
-import time
 
 from pandas import Timestamp
 import numpy as np
@@ -7,8 +6,6 @@ import pandas as pd
 import json
 import argparse
 
-from pymongo.errors import ConfigurationError
-
 ROOT_FOLDER = os.path.dirname(
     os.path.dirname(
         os.path.abspath(__file__)))
@@ -19,11 +16,14 @@ from ml.train_test_splitting import TsCvSplitter
 from ml import Sarimax
 from ml import model_selection
 from ml.performance_measures import rmse
-from data.models import *
-from data.dao import *
+from ml.ensemble import out_of_fold_actual, pack_predictions
+from data.mongo_wrapper import get_client
+from data.snapshots import CuratedDataSnapshot
+from data.dao import ALLOWED_STORAGE, CuratedDataMongoDao, HyperparameterTuningResultMongoDao, CuratedDataLocalDao, \
+    HyperparameterTuningResultLocalDao
 
 
-def main(configuration_path, parallel=None, debug=None):
+def main(configuration_path, parallel=None, debug=None, storage="default"):
     # Find and read configuration file
     if os.path.isfile(configuration_path):
         with open(configuration_path, "r") as f:
@@ -42,31 +42,30 @@ def main(configuration_path, parallel=None, debug=None):
     }
 
     # # Ingestion
-    print("Connecting to DB")
-    success = False
-    n_retries = 0
-    while n_retries <= 3:
+    # Instantiate DAOs according to storage option
+    assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
+    if storage == "default":
+        print("Connecting to DB")
+        # The shared client is created (with retries) once; DAOs reuse it
+        from pymongo.errors import PyMongoError
         try:
-            cddao = CuratedDataMongoDao()
-            htrdao = HyperparameterTuningResultMongoDao()
-            success = True
-            break
-        except ConfigurationError:
-            n_retries += 1
-            print(f"Connection attempt {n_retries} failed. Retrying in 3 s...")
-            time.sleep(3)
-
-    if not success:
-        print("Connection to DB failed.")
-        exit()
+            get_client()
+        except PyMongoError:
+            print("Connection to DB failed.")
+            exit()
 
-    print("Ingesting data")
-    df = CuratedData.to_df(cddao.get_by_date()).set_index("date")
+        cddao = CuratedDataMongoDao()
+        htrdao = HyperparameterTuningResultMongoDao()
+    else:
+        cddao = CuratedDataLocalDao()
+        htrdao = HyperparameterTuningResultLocalDao()
 
-    # Crop data
+    print("Ingesting data")
+    # Daily data (one row per day), from the local snapshot of the current version of curated data, cropped to
+    # date_from
     if configuration["date_from"] != "":
         print(f"Filtering date after {configuration['date_from']}")
-        df = df.loc[df.index >= configuration["date_from"]]
+    df = CuratedDataSnapshot(cddao).load(date_from=configuration["date_from"])
 
     # Check data
     print("Date range:", df.index[0].date(), "-", df.index[-1].date())
@@ -76,9 +75,6 @@ def main(configuration_path, parallel=None, debug=None):
 
     # # Preprocessing
 
-    # set daily frequency in datetime index (ensures there is one row per day)
-    df = df.asfreq("D")
-
     # Handle NA in the last rows if data are missing
     # Warn if there are NA (except for risk)
     cols_with_na = df.isna().sum()
@@ -87,7 +83,7 @@ def main(configuration_path, parallel=None, debug=None):
             print(
                 f"Warning: variable '{variable}' has {na_count} missing value{'s' if na_count > 1 else ''} --> forward fill")
     # Fill NA with last known value
-    df = df.fillna(method="ffill")
+    df = df.ffill()
 
     # Extracting outputs (endogenous variables) and regressors (exogenous variables)
 
@@ -142,21 +138,32 @@ def main(configuration_path, parallel=None, debug=None):
     if performance_measure.lower() == "rmse":
         performance_measure = rmse
 
+    # Out-of-fold predictions of the best configurations are stored to build ensembles at forecast time
+    oof_top_n = configuration.get("oof_top_n", 0)
+
+    # Scores are saved in bulk while the search is running; the run is hidden from readers until it is complete
+    run_id = htrdao.create_run(log, configuration)
     results = model_selection.grid_search(data=data, model=Sarimax, configurations=configs,
                                           splits=splits, debug=configuration["debug"],
                                           parallel=configuration["parallel"],
-                                          performance_measure=performance_measure, transformation="sqrt")
+                                          performance_measure=performance_measure, transformation="sqrt",
+                                          store_predictions=oof_top_n,
+                                          callback=lambda batch: htrdao.save_scores(run_id, batch),
+                                          callback_batch_size=configuration.get("save_batch_size", 100))
+
+    if oof_top_n > 0:
+        log["oof_actual"] = pack_predictions(out_of_fold_actual(data, splits))
 
     best_config = results[0]
 
     print("Best configuration:", best_config["cfg"])
     print("Average score:", best_config["score_mean"], "| standard error:", best_config["score_se"])
+    print("All test scores:", best_config["scores"])
 
     log["elapsed_time"] = str(pd.Timestamp.utcnow() - log["timestamp"])
 
     print("Saving configuration")
-    htr = HyperparameterTuningResult(log, configuration, results)
-    htrdao.save(htr)
+    htrdao.complete_run(run_id, results, log=log)
 
     print("Done.")
 
@@ -171,6 +178,8 @@ if __name__ == '__main__':
     parser.add_argument('--debug', type=int,
                         help='enable warnings and errors (1=true, 0=false), default false, '
                              'overrides value in configuration file')
+    parser.add_argument('--storage', type=str, default="default", choices=ALLOWED_STORAGE,
+                        help='where data are read and saved: default (MongoDB) or local (Parquet files)')
     args = parser.parse_args()
 
-    main(args.configuration_path, parallel=args.parallel, debug=args.debug)
+    main(args.configuration_path, parallel=args.parallel, debug=args.debug, storage=args.storage)
@@ -1,7 +1,8 @@
 import pandas as pd
 from typing import List
 
-from data.models import WeatherStation, MunicipalityWeatherStationLink
+from data.models import WeatherStation
+from data.batches import WeatherStationBatch, MunicipalityWeatherStationLinkBatch
 
 ALLOWED_RULES = ["max_sensors_min_elevation"]
 
@@ -13,10 +14,10 @@ class MunicipalityWeatherStationLinker:
         assert rule in ALLOWED_RULES, "Unrecognised rule"
         self.rule = rule  # Allows for having multiple rules
 
-    def run(self, weather_stations: List[WeatherStation]) \
-            -> List[MunicipalityWeatherStationLink]:
+    def run(self, weather_stations: List[WeatherStation] or WeatherStationBatch) \
+            -> MunicipalityWeatherStationLinkBatch:
 
-        ws = WeatherStation.to_df(weather_stations)
+        ws = WeatherStationBatch.coerce(weather_stations).to_df()
 
         edgelist = None
 
@@ -48,5 +49,5 @@ class MunicipalityWeatherStationLinker:
                 .reset_index(drop=True)
 
         # Export
-        edgelist = MunicipalityWeatherStationLink.from_df(edgelist)
+        edgelist = MunicipalityWeatherStationLinkBatch.from_df(edgelist)
         return edgelist
@@ -0,0 +1,119 @@
+import json
+import sys, os
+import argparse
+import time
+from multiprocessing import cpu_count
+
+import pandas as pd
+
+ROOT_FOLDER = os.path.dirname(
+    os.path.dirname(
+        os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT_FOLDER)
+
+# Batch rendering does not need a display: force a non-interactive backend (inherited by the worker processes)
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from ml.reporting import render_reports, ALLOWED_FORMATS
+from data.mongo_wrapper import get_client
+from data.snapshots import CuratedDataSnapshot
+from data.dao import ALLOWED_STORAGE, CuratedDataMongoDao, HyperparameterTuningResultMongoDao, CuratedDataLocalDao, \
+    HyperparameterTuningResultLocalDao
+
+
+def main(configuration_path, output_dir, fmt="png", steps=7, diagnostics=True, n_jobs=cpu_count(),
+         storage="default"):
+    # Find and read configuration file (same format as the forecast pipeline)
+    if os.path.isfile(configuration_path):
+        print(f"Reading configuration file at {configuration_path}")
+        with open(configuration_path, "r") as f:
+            models = json.load(f)
+    else:
+        raise FileNotFoundError("Cannot find specified configuration file")
+
+    assert fmt in ALLOWED_FORMATS, f"Invalid format. Choose one among {ALLOWED_FORMATS}"
+
+    # # Ingestion
+    # Instantiate DAOs according to storage option
+    assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
+    if storage == "default":
+        print("Connecting to DB")
+        # The shared client is created (with retries) once; DAOs reuse it
+        from pymongo.errors import PyMongoError
+        try:
+            get_client()
+        except PyMongoError:
+            print("Connection to DB failed.")
+            exit()
+
+        cddao = CuratedDataMongoDao()
+        htrdao = HyperparameterTuningResultMongoDao()
+    else:
+        cddao = CuratedDataLocalDao()
+        htrdao = HyperparameterTuningResultLocalDao()
+
+    print("Ingesting data")
+    df = CuratedDataSnapshot(cddao).load()
+
+    # # Preprocessing (as in the forecast pipeline)
+    df = df.ffill()
+
+    # Build one rendering job for each model
+    jobs = []
+    for m in models:
+        htr = htrdao.get_most_recent_record(m["output"], m["regressors"])
+        if len(htr) == 0:
+            print("Could not find the configuration for variable", m["output"], "with regressors", m["regressors"],
+                  "--> skipped")
+            continue
+        htr = htr[0]
+
+        outputs = htr.configuration["outputs"]
+        regressors = htr.configuration["regressors"]
+
+        y = df[outputs]
+        exog_scenario = None
+        if len(regressors) > 0:
+            x = df[regressors]
+            data = y.join(x)
+            # Scenario: constant future values for exog
+            dtidx = pd.date_range(start=y.index[-1] + pd.Timedelta(days=1),
+                                  end=y.index[-1] + pd.Timedelta(days=steps))
+            exog_scenario = pd.DataFrame(index=dtidx).join(x, how="outer").ffill().reindex(dtidx)
+        else:
+            data = y
+
+        name = "_".join([m["output"]] + sorted(m["regressors"]))
+        jobs.append({"name": name, "data": data, "config": htr.results[0]["cfg"], "steps": steps,
+                     "exog": exog_scenario, "transformation": "sqrt", "diagnostics": diagnostics})
+
+    print(f"Rendering plots of {len(jobs)} models to {output_dir}")
+    t0 = time.time()
+    paths = render_reports(jobs, output_dir, fmt=fmt, n_jobs=n_jobs)
+    print(f"{len(paths)} files written in {time.time() - t0:.1f} s")
+
+    print("Done.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Render forecast and diagnostic plots of the best models without a display.')
+    parser.add_argument('configuration_path', type=str,
+                        help='path to configuration file (JSON), same format as the forecast pipeline')
+    parser.add_argument('output_dir', type=str,
+                        help='folder where plots are written')
+    parser.add_argument('--format', type=str, default="png", choices=ALLOWED_FORMATS,
+                        help='output format (pdf: one multi-page file per model)')
+    parser.add_argument('--steps', type=int, default=7,
+                        help='how many steps in the future')
+    parser.add_argument('--no-diagnostics', action='store_true',
+                        help='do not render the diagnostic plots')
+    parser.add_argument('--n_jobs', type=int, default=cpu_count(),
+                        help='number of worker processes')
+    parser.add_argument('--storage', type=str, default="default", choices=ALLOWED_STORAGE,
+                        help='where data are read and saved: default (MongoDB) or local (Parquet files)')
+    args = parser.parse_args()
+
+    main(args.configuration_path, args.output_dir, fmt=args.format, steps=args.steps,
+         diagnostics=not args.no_diagnostics, n_jobs=args.n_jobs, storage=args.storage)
@@ -8,6 +8,7 @@ sys.path.insert(0, ROOT_DIR)
 from collectors import WeatherStationCollector
 from pipelines import MunicipalityWeatherStationLinker
 from data import dao
+from data.station_weights import StationWeights
 
 
 def main(storage="default", _test=False):
@@ -18,11 +19,21 @@ def main(storage="default", _test=False):
     mundao = None
     wsdao = None
     wslinkdao = None
+    dwdao = None
+    wwdao = None
     assert storage in dao.ALLOWED_STORAGE, "Unrecognised storage option"
     if storage == "default":
         mundao = dao.MunicipalityMySqlDao()
         wsdao = dao.WeatherStationMySqlDao()
         wslinkdao = dao.MunicipalityWeatherStationLinkMySqlDao()
+        dwdao = dao.DailyWeatherMySqlDao()
+        wwdao = dao.WeightedWeatherMySqlDao()
+    elif storage == "local":
+        mundao = dao.MunicipalityLocalDao()
+        wsdao = dao.WeatherStationLocalDao()
+        wslinkdao = dao.MunicipalityWeatherStationLinkLocalDao()
+        dwdao = dao.DailyWeatherLocalDao()
+        wwdao = dao.WeightedWeatherLocalDao()
     assert wsdao is not None and wslinkdao is not None, "DAO has not been instantiated"
 
     # Get existing municipalities
@@ -47,6 +58,15 @@ def main(storage="default", _test=False):
     print("Saving links")
     wslinkdao.save(wslinks)
 
+    # The linked stations have changed: all the days of the daily weather aggregate are recomputed
+    print("Refreshing daily weather")
+    dwdao.refresh()
+
+    # Population weights of the stations are recomputed for the new links, and all the days of the weighted weather
+    # with them
+    print("Refreshing weighted weather")
+    wwdao.refresh(StationWeights(mundao, wslinkdao))
+
     return len(ws), len(wslinks)
 
 
@@ -2,13 +2,21 @@ from .weather_data_updater import WeatherDataUpdater
 from .data_updaters import MunicipalityDataUpdater, ProvinceDataUpdater, VaccinesAdministrationDataUpdater, \
     VaccinesDeliveryDataUpdater, HolidayUpdater, RegionRiskUpdater, StringencyIndexUpdater
 
-avail_updaters = {
-        "MunicipalityData": MunicipalityDataUpdater(), # fix NaT in MunicipalityDataUpdater (issue #19)
-        "ProvinceData": ProvinceDataUpdater(),
-        "Holiday": HolidayUpdater(),
-        "RegionRisk": RegionRiskUpdater(),
-        "VaccinesAdministrationData": VaccinesAdministrationDataUpdater(),
-        "VaccinesDeliveryData": VaccinesDeliveryDataUpdater(),
-        "StringencyIndex": StringencyIndexUpdater(),
-        "WeatherData": WeatherDataUpdater()
-    }
\ No newline at end of file
+updater_classes = {
+        "MunicipalityData": MunicipalityDataUpdater, # fix NaT in MunicipalityDataUpdater (issue #19)
+        "ProvinceData": ProvinceDataUpdater,
+        "Holiday": HolidayUpdater,
+        "RegionRisk": RegionRiskUpdater,
+        "VaccinesAdministrationData": VaccinesAdministrationDataUpdater,
+        "VaccinesDeliveryData": VaccinesDeliveryDataUpdater,
+        "StringencyIndex": StringencyIndexUpdater,
+        "WeatherData": WeatherDataUpdater
+    }
+
+
+def get_updaters(storage="default") -> dict:
+    # One updater for each entity, saving data to the chosen storage (see data.dao.ALLOWED_STORAGE)
+    return dict((name, updater(storage=storage)) for name, updater in updater_classes.items())
+
+
+avail_updaters = get_updaters()
@@ -1,109 +1,157 @@
 from pandas import Timedelta
 
-from collectors import *
-from data.dao import *
+from collectors import MunicipalityDataCollector, ProvinceDataCollector, VaccinesDeliveryDataCollector, \
+    VaccinesAdministrationDataCollector, HolidayCollector, RegionRiskCollector, StringencyIndexCollector
+from collectors.validation_utils import validate_dates
+from data.dao import ALLOWED_STORAGE, MunicipalityDataMySqlDao, ProvinceDataMySqlDao, VaccinesDeliveryDataMySqlDao, \
+    VaccinesAdministrationDataMySqlDao, HolidayMySqlDao, RegionRiskMySqlDao, StringencyIndexMySqlDao, \
+    MunicipalityDataLocalDao, ProvinceDataLocalDao, VaccinesDeliveryDataLocalDao, VaccinesAdministrationDataLocalDao, \
+    HolidayLocalDao, RegionRiskLocalDao, StringencyIndexLocalDao
 
 
 class DataUpdater:
+    # Entity (name of the model, as in WatermarkDao.GROUPS) and key of its watermark (None if not grouped)
+    entity = None
+    watermark_key = None
 
     def __init__(self, dao, collector):
         self.dao = dao
         self.collector = collector
+        self.insert_status = None  # insertion status of the last run (see MySqlDB.bulk_insert)
+
+    def run(self, refetch_days=0, watermarks=None) -> int:
+        # If refetch_days > 0, the last refetch_days days already in the database are collected again and upserted,
+        # so that corrections made by the source are picked up (only for DAOs whose table has a unique key).
+        # watermarks: most recent dates of all the entities (see WatermarkDao.get_watermarks), read before running the
+        # updaters; if None, the DAO is queried.
 
-    def run(self) -> int:
         # Check date of most recent data
-        latest_date = self.dao.get_most_recent_timestamp()
+        if watermarks is not None:
+            latest_date = watermarks[self.entity].get(self.watermark_key)
+        else:
+            latest_date = self.dao.get_most_recent_timestamp()
+        refetch = refetch_days > 0 and latest_date is not None and hasattr(self.dao, "UNIQUE_KEY")
         latest_date, _ = validate_dates(latest_date, None)
 
-        # Collect new data from day after latest_date
-        data = self.collector.search(date_from=latest_date + Timedelta(days=1))
+        # Collect new data from day after latest_date (or from the beginning of the trailing window)
+        date_from = latest_date + Timedelta(days=1)
+        if refetch:
+            date_from -= Timedelta(days=refetch_days)
+        data = self.collector.search(date_from=date_from)
 
-        # Insert new data
+        # Insert new data (update existing records in the trailing window)
+        self.insert_status = None
         if len(data) > 0:
-            self.dao.save(data)
+            self.insert_status = self.dao.save(data, upsert=True) if refetch else self.dao.save(data)
 
         # Return the number of processed records
         return len(data)
 
 
 class MunicipalityDataUpdater(DataUpdater):
+    entity = "MunicipalityData"
+
     def __init__(self, storage="default"):
         dao = None
         assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
         if storage == "default":
             dao = MunicipalityDataMySqlDao()
+        elif storage == "local":
+            dao = MunicipalityDataLocalDao()
         assert dao is not None, "DAO has not been instantiated"
         collector = MunicipalityDataCollector()
         super().__init__(dao, collector)
 
 
 class ProvinceDataUpdater(DataUpdater):
+    entity = "ProvinceData"
+    watermark_key = "PAT"
 
     def __init__(self, storage="default"):
         dao = None
         assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
         if storage == "default":
             dao = ProvinceDataMySqlDao()
+        elif storage == "local":
+            dao = ProvinceDataLocalDao()
         assert dao is not None, "DAO has not been instantiated"
         collector = ProvinceDataCollector()
         super().__init__(dao, collector)
 
 
 class VaccinesDeliveryDataUpdater(DataUpdater):
+    entity = "VaccinesDeliveryData"
+    watermark_key = "PAT"
 
     def __init__(self, storage="default"):
         dao = None
         assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
         if storage == "default":
             dao = VaccinesDeliveryDataMySqlDao()
+        elif storage == "local":
+            dao = VaccinesDeliveryDataLocalDao()
         assert dao is not None, "DAO has not been instantiated"
         collector = VaccinesDeliveryDataCollector()
         super().__init__(dao, collector)
 
 
 class VaccinesAdministrationDataUpdater(DataUpdater):
+    entity = "VaccinesAdministrationData"
+    watermark_key = "PAT"
 
     def __init__(self, storage="default"):
         dao = None
         assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
         if storage == "default":
             dao = VaccinesAdministrationDataMySqlDao()
+        elif storage == "local":
+            dao = VaccinesAdministrationDataLocalDao()
         assert dao is not None, "DAO has not been instantiated"
         collector = VaccinesAdministrationDataCollector()
         super().__init__(dao, collector)
 
 
 class HolidayUpdater(DataUpdater):
+    entity = "Holiday"
 
     def __init__(self, storage="default"):
         dao = None
         assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
         if storage == "default":
             dao = HolidayMySqlDao()
+        elif storage == "local":
+            dao = HolidayLocalDao()
         assert dao is not None, "DAO has not been instantiated"
         collector = HolidayCollector()
         super().__init__(dao, collector)
 
 
 class RegionRiskUpdater(DataUpdater):
+    entity = "RegionRisk"
+    watermark_key = "PAT"
 
     def __init__(self, storage="default"):
         dao = None
         assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
         if storage == "default":
             dao = RegionRiskMySqlDao()
+        elif storage == "local":
+            dao = RegionRiskLocalDao()
         assert dao is not None, "DAO has not been instantiated"
         collector = RegionRiskCollector()
         super().__init__(dao, collector)
 
 
 class StringencyIndexUpdater(DataUpdater):
+    entity = "StringencyIndex"
 
     def __init__(self, storage="default"):
         dao = None
         assert storage in ALLOWED_STORAGE, "Unrecognised storage option"
         if storage == "default":
             dao = StringencyIndexMySqlDao()
+        elif storage == "local":
+            dao = StringencyIndexLocalDao()
         assert dao is not None, "DAO has not been instantiated"
         collector = StringencyIndexCollector()
         super().__init__(dao, collector)
@@ -1,48 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
 
 from data import dao
+from data.batches import WeatherDataBatch
+from data.station_weights import StationWeights
 from collectors import WeatherDataCollector
+from collectors.rate_limit import HostRateLimiter
+
+DEFAULT_CONCURRENCY = 1  # stations fetched at the same time (1: one after another)
+DEFAULT_SAVE_BATCH_ROWS = 50000  # records collected before they are saved with a single bulk insert
 
 
 class WeatherDataUpdater:
+    entity = "WeatherData"
 
-    def __init__(self, storage="default"):
+    def __init__(self, storage="default", concurrency=DEFAULT_CONCURRENCY, requests_per_second=None,
+                 save_batch_rows=DEFAULT_SAVE_BATCH_ROWS):
+        # concurrency: stations fetched concurrently by a pool of threads; requests_per_second: limit of the requests
+        # to the weather data server, shared by the threads (None: no limit)
         self.wsdao = None
         self.wdatadao = None
+        self.dwdao = None
+        self.wwdao = None
+        self.weights = None
         assert storage in dao.ALLOWED_STORAGE, "Unrecognised storage option"
         if storage == "default":
             self.wsdao = dao.WeatherStationMySqlDao()
             self.wdatadao = dao.WeatherDataMySqlDao()
-        assert self.wsdao is not None and self.wdatadao is not None, "DAO has not been instantiated"
+            self.dwdao = dao.DailyWeatherMySqlDao()
+            self.wwdao = dao.WeightedWeatherMySqlDao()
+            self.weights = StationWeights(dao.MunicipalityMySqlDao(), dao.MunicipalityWeatherStationLinkMySqlDao())
+        elif storage == "local":
+            self.wsdao = dao.WeatherStationLocalDao()
+            self.wdatadao = dao.WeatherDataLocalDao()
+            self.dwdao = dao.DailyWeatherLocalDao()
+            self.wwdao = dao.WeightedWeatherLocalDao()
+            self.weights = StationWeights(dao.MunicipalityLocalDao(), dao.MunicipalityWeatherStationLinkLocalDao())
+        assert self.wsdao is not None and self.wdatadao is not None and self.dwdao is not None and \
+            self.wwdao is not None, "DAO has not been instantiated"
+        assert concurrency >= 1, "concurrency must be at least 1"
+        self.concurrency = concurrency
+        self.save_batch_rows = save_batch_rows
+        rate_limiter = HostRateLimiter(requests_per_second) if requests_per_second is not None else None
+        self.collector = WeatherDataCollector(rate_limiter=rate_limiter)
+        self.insert_status = None  # insertion status of the last run, summed over bulk inserts
+
+    def fetch(self, stations_dates: dict, refetch_days=0):
+        # Yield the WeatherDataBatch of each station as soon as it has been collected, fetching self.concurrency
+        # stations at a time. stations_dates: station_id -> most recent date stored (None for stations without data)
+        def search(station):
+            # Search from the day after the most recent date
+            date_from = None
+            if stations_dates[station] is not None:
+                date_from = stations_dates[station] + pd.Timedelta(days=1) - pd.Timedelta(days=refetch_days)
+            return self.collector.search(station, date_from=date_from)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(search, station) for station in stations_dates]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                # On errors (or if the caller stops early) the stations not yet started are not fetched
+                for future in futures:
+                    future.cancel()
+
+    def save(self, batches: list, upsert=False):
+        # Save the batches of several stations with a single bulk insert, adding its status to self.insert_status
+        status = self.wdatadao.save(WeatherDataBatch.concat(batches), upsert=upsert)
+        if status is not None:
+            for k in status:
+                if k != "rows_per_second":
+                    self.insert_status[k] = self.insert_status.get(k, 0) + status[k]
+
+    def run(self, refetch_days=0, watermarks=None):
+        # If refetch_days > 0, the last refetch_days days of each station are collected again and upserted.
+        # watermarks: most recent dates of all the entities (see WatermarkDao.get_watermarks); if None, the most recent
+        # dates of the stations are read with a single query.
 
-    def run(self):
         # Get List[WeatherStation] of stations to be processed (custom query via WeatherStationDao) --> checks Links
         ws = self.wsdao.read_linked_stations()
 
-        # For each station, find most recent date in the db (custom query via WeatherDataDao) --> returns Date
+        # For each station, find most recent date in the db (None for stations without data)
+        latest_dates = watermarks[self.entity] if watermarks is not None else \
+            self.wdatadao.get_most_recent_timestamps()
         stations_dates = {}
         for station in ws:
-            stations_dates[station.station_id] = self.wdatadao.get_most_recent_timestamp(station.station_id)
+            stations_dates[station.station_id] = latest_dates.get(station.station_id)
 
-        # For each station, call WeatherDataCollector.search(...) with that station and latest date + 1 (search
-        # from day after)
-        wdc = WeatherDataCollector()
+        # Collect the data of the stations (concurrently if self.concurrency > 1); the data of several stations are
+        # written to DB together with WeatherDataDao, while the next stations are being fetched
         n_records = 0
+        first_saved = None  # oldest date saved, from which the daily aggregate is refreshed
+        self.insert_status = {"inserted": 0, "statements": 0, "seconds": 0.}
+        pending, n_pending = [], 0
         i = 1
-        for station in stations_dates:
-            print(f"\rFetching data for station {i} of {len(stations_dates)}", end="")
-
-            data = wdc.search(station,
-                              date_from=stations_dates[station] + pd.Timedelta(days=1) if stations_dates[
-                                                                                              station] is not None else None)
+        try:
+            for data in self.fetch(stations_dates, refetch_days=refetch_days):
+                print(f"\rFetched data for station {i} of {len(stations_dates)}", end="")
+                n_records += len(data)
+                if len(data) > 0:
+                    oldest = min(d.date for d in data)
+                    first_saved = oldest if first_saved is None else min(first_saved, oldest)
+                    pending.append(data)
+                    n_pending += len(data)
+                if n_pending >= self.save_batch_rows:
+                    # Batches are taken out of pending before saving, so that a failed save is not retried below
+                    batches, pending, n_pending = pending, [], 0
+                    self.save(batches, upsert=refetch_days > 0)
+                i += 1
+        finally:
+            # If a station fails (e.g. a page that cannot be parsed), the stations already fetched are saved and the
+            # daily aggregates refreshed before the error propagates
+            if n_pending > 0:
+                self.save(pending, upsert=refetch_days > 0)
 
-            # Write List[WeatherData] to DB with WeatherDataDao
-            self.wdatadao.save(data)
-            n_records += len(data)
+            print()
 
-            i += 1
+            # Days with new data are aggregated and weighted again (the previous days are unchanged)
+            if first_saved is not None:
+                self.dwdao.refresh(date_from=first_saved)
+                self.wwdao.refresh(self.weights, date_from=first_saved)
 
-        print()
+        seconds = self.insert_status["seconds"]
+        rows = sum(self.insert_status.get(k, 0) for k in ["inserted", "updated", "unchanged", "upserted"])
+        self.insert_status["rows_per_second"] = rows / seconds if seconds > 0 else None
 
         return n_records
 